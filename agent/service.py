@@ -1,4 +1,7 @@
 import asyncio
+import secrets
+from contextlib import nullcontext
+from urllib.parse import urlencode
 from agents import Agent, Runner
 from agents.mcp import MCPServer, MCPServerSse
 from agents.model_settings import ModelSettings
@@ -6,6 +9,11 @@ import requests
 from dotenv import load_dotenv
 load_dotenv()
 
+try:
+    from opentelemetry import propagate, trace
+except ImportError:  # tracing is optional
+    trace = None
+
 
 prompt = """
 Bạn là một trợ lý AI, có thể trả lời các câu hỏi và thực hiện các tác vụ theo yêu cầu của người dùng.
@@ -38,18 +46,46 @@ async def run(question, mcp_server: MCPServer):
     
     return result.final_output
 
-async def main(question):
+def trace_headers():
+    """W3C trace context for the MCP connection of one question.
+
+    The server continues this trace, so its SSE session, tool call, upstream
+    and database spans share the question's trace id. With OpenTelemetry
+    installed the current span is propagated; otherwise a new sampled trace
+    id is generated.
+    """
+    headers = {}
+    if trace is not None:
+        propagate.inject(headers)
+    if "traceparent" not in headers:
+        headers["traceparent"] = f"00-{secrets.token_hex(16)}-{secrets.token_hex(8)}-01"
+    return headers
+
+
+async def main(question, top_k=None):
     # Perform login first to get and cache the JWT token
 
-    async with MCPServerSse(
-        name="SSE Python Server",
-        params={
-            "url": "http://localhost:8000/sse"
-        },
-        client_session_timeout_seconds=30
-    ) as server:
-        result = await run(question, server)
-        
+    url = "http://localhost:8000/sse"
+    if top_k:
+        # Only expose the tools most relevant to the question to the model
+        url = "http://localhost:8000/retrieval/sse?" + urlencode({"q": question, "k": top_k})
+
+    span = (
+        trace.get_tracer(__name__).start_as_current_span("agent.question")
+        if trace is not None
+        else nullcontext()
+    )
+    with span:
+        async with MCPServerSse(
+            name="SSE Python Server",
+            params={
+                "url": url,
+                "headers": trace_headers(),
+            },
+            client_session_timeout_seconds=30
+        ) as server:
+            result = await run(question, server)
+
     return result
 
 def get_access_token(username, password, x_tenant_id):
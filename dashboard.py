@@ -16,9 +16,17 @@ def list_tools(prefix: str) -> list[str]:
     if not prefix:
         return []
     try:
-        resp = client.get(f"{API_URL}/list-tools", params={"prefix": prefix})
-        resp.raise_for_status()
-        return resp.json().get("tools", [])
+        tools = []
+        params = {"prefix": prefix}
+        # follow next_cursor, each page holds at most 500 tools
+        while True:
+            resp = client.get(f"{API_URL}/list-tools", params=params)
+            resp.raise_for_status()
+            data = resp.json()
+            tools.extend(data.get("tools", []))
+            if not data.get("next_cursor"):
+                return tools
+            params = {"prefix": prefix, "cursor": data["next_cursor"]}
     except Exception:
         return []
 
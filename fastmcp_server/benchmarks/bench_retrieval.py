@@ -0,0 +1,70 @@
+"""Measure /retrieve-tools query latency for a large number of tools.
+
+Usage::
+
+    python benchmarks/bench_retrieval.py --tools 10000 --queries 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_spec  # noqa: E402
+from registry import ToolRegistry  # noqa: E402
+from utils.catalog_utils import build_sub_server  # noqa: E402
+
+
+async def run(tools: int, queries: int, k: int) -> dict:
+    async with httpx.AsyncClient(base_url="http://mock") as client:
+        build_start = time.perf_counter()
+        sub_server = build_sub_server(make_spec(tools), client, "synthetic")
+        registry = ToolRegistry()
+        registry.register("synthetic", await sub_server.get_tools())
+        build_seconds = time.perf_counter() - build_start
+
+    embed_start = time.perf_counter()
+    registry.sync_embedding_index()
+    embed_seconds = time.perf_counter() - embed_start
+
+    latencies: list[float] = []
+    for i in range(queries):
+        question = f"fetch resource {i * 37 % tools} in verbose mode"
+        start = time.perf_counter()
+        registry.retrieve(question, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    return {
+        "tools": len(registry.embedding_index),
+        "queries": queries,
+        "k": k,
+        "build_seconds": build_seconds,
+        "embed_seconds": embed_seconds,
+        "query_ms_p50": statistics.median(latencies),
+        "query_ms_p95": latencies[int(len(latencies) * 0.95) - 1],
+        "query_ms_max": latencies[-1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    result = asyncio.run(run(args.tools, args.queries, args.k))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
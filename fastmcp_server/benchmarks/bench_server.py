@@ -0,0 +1,303 @@
+"""Benchmark the server end to end against a local mock backend.
+
+For each spec size (``--spec simple`` or ``realistic``, see
+:mod:`benchmarks.synthetic`) the server is built with ``server.create_app`` (cold,
+then warm from the tool catalog), served in process by uvicorn and measured
+over HTTP: ``/list-tools`` and ``/search`` latency, bulk toggle throughput,
+opening concurrent SSE sessions, and tool-call throughput and latency on
+those sessions. The report is printed (or written with ``--output``) as
+JSON so runs on different commits can be compared.
+
+Usage::
+
+    python benchmarks/bench_server.py --operations 10 100 1000 10000 --output bench.json
+    python benchmarks/bench_server.py --spec realistic --operations 500 \\
+        --latency 0.05 --jitter 0.1 --payload-size 20000 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import routes  # noqa: E402
+import server  # noqa: E402
+from benchmarks.mock_backend import MockBackend  # noqa: E402
+from benchmarks.synthetic import make_realistic_spec, make_spec  # noqa: E402
+
+PREFIX = "bench"
+# Spec generator and the GET tool called on the SSE sessions for each --spec
+SPECS = {
+    "simple": (make_spec, "getResource0", "id"),
+    "realistic": (make_realistic_spec, "getCustomer", "customerId"),
+}
+SEARCH_QUERIES = ["fetch resource", "create", "resource 42", "group3", "verbose"]
+
+
+def latency_summary(samples: list[float]) -> dict:
+    """Count, p50, p99 and max of ``samples`` (seconds) in milliseconds."""
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+
+    def percentile(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _boot(cfg: dict, rebuild: bool):
+    cfg = {**cfg, "catalog": {**cfg["catalog"], "rebuild": rebuild}}
+    started = time.perf_counter()
+    app = await server.create_app(cfg)
+    return app, time.perf_counter() - started
+
+
+async def _close(app) -> None:
+    await routes.close_clients(app.state.clients, app.state.db_session)
+
+
+async def _timed_requests(
+    client: httpx.AsyncClient, requests: list[tuple[str, str, dict]]
+) -> dict:
+    latencies = []
+    for method, url, kwargs in requests:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return latency_summary(latencies)
+
+
+async def _bulk_toggle(client: httpx.AsyncClient, tools: int, rounds: int) -> dict:
+    latencies = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        response = await client.post(
+            "/tools-enabled", json={"prefix": PREFIX, "enabled": i % 2 == 1}
+        )
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+    total = sum(latencies)
+    return {
+        "tools": tools,
+        **latency_summary(latencies),
+        "tools_per_second": round(tools * rounds / total, 1) if total else None,
+    }
+
+
+async def _sse_sessions(
+    url: str, sessions: int, duration: float, tool: str, argument: str
+) -> tuple[dict, dict]:
+    from fastmcp import Client
+
+    connects: list[float] = []
+    calls: list[float] = []
+    errors = 0
+    ready = asyncio.Event()
+    opened = 0
+
+    async def session(index: int) -> None:
+        nonlocal errors, opened
+        started = time.perf_counter()
+        async with Client(url) as client:
+            connects.append(time.perf_counter() - started)
+            opened += 1
+            if opened == sessions:
+                ready.set()
+            # calls start once every session is open
+            await ready.wait()
+            deadline = time.perf_counter() + duration
+            i = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    # distinct ids per session, so no calls are coalesced
+                    await client.call_tool(f"{PREFIX}_{tool}", {argument: i * sessions + index})
+                except Exception:
+                    errors += 1
+                calls.append(time.perf_counter() - started)
+                i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    elapsed = time.perf_counter() - started
+    sse = {"sessions": sessions, "connect": latency_summary(connects)}
+    tool_calls = {
+        **latency_summary(calls),
+        "errors": errors,
+        "calls_per_second": round(len(calls) / duration, 1),
+        "wall_seconds": round(elapsed, 3),
+    }
+    return sse, tool_calls
+
+
+async def measure(operations: int, args: argparse.Namespace, workdir: str) -> dict:
+    make, tool, argument = SPECS[args.spec]
+    spec = make(operations, title=PREFIX)
+    spec_path = os.path.join(workdir, f"spec{operations}.json")
+    with open(spec_path, "w", encoding="utf-8") as f:
+        json.dump(spec, f)
+    backend = await MockBackend(
+        spec,
+        latency=args.latency,
+        jitter=args.jitter,
+        payload_size=args.payload_size,
+        error_rate=args.error_rate,
+        seed=0,
+    ).start()
+    try:
+        return await _measure(operations, args, spec_path, backend, tool, argument, workdir)
+    finally:
+        await backend.close()
+
+
+async def _measure(
+    operations: int,
+    args: argparse.Namespace,
+    spec_path: str,
+    backend: MockBackend,
+    tool: str,
+    argument: str,
+    workdir: str,
+) -> dict:
+    cfg = {
+        "swagger": [{"path": spec_path, "apiBaseUrl": backend.url, "prefix": PREFIX}],
+        "server": {"host": "127.0.0.1", "port": 0},
+        "database": "sqlite+aiosqlite:///:memory:",
+        "catalog": {"dir": os.path.join(workdir, f"catalog{operations}")},
+        "reload": {"signal": False},
+    }
+
+    app, cold = await _boot(cfg, rebuild=True)
+    cold_phases = dict(app.state.startup_timings)
+    await _close(app)
+    app, warm = await _boot(cfg, rebuild=False)
+    warm_phases = dict(app.state.startup_timings)
+    tools = sum(count for _, count in app.state.server_info)
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on")
+    http_server = uvicorn.Server(config)
+    serving = asyncio.create_task(http_server.serve())
+    while not http_server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.01)
+    port = http_server.servers[0].sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            list_tools = await _timed_requests(
+                client, [("GET", "/list-tools", {"params": {"limit": 100}})] * args.requests
+            )
+            search = await _timed_requests(
+                client,
+                [
+                    ("GET", "/search", {"params": {"q": SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}})
+                    for i in range(args.requests)
+                ],
+            )
+            bulk_toggle = await _bulk_toggle(client, tools, args.toggle_rounds)
+            # leave every tool enabled for the tool calls
+            await client.post("/tools-enabled", json={"prefix": PREFIX, "enabled": True})
+        sse, tool_calls = await _sse_sessions(
+            f"{base_url}/sse", args.sessions, args.duration, tool, argument
+        )
+    finally:
+        http_server.should_exit = True
+        await serving
+
+    return {
+        "operations": operations,
+        "tools": tools,
+        "startup": {
+            "cold_seconds": round(cold, 4),
+            "warm_seconds": round(warm, 4),
+            "cold_phases": {phase: round(s, 4) for phase, s in cold_phases.items()},
+            "warm_phases": {phase: round(s, 4) for phase, s in warm_phases.items()},
+        },
+        "list_tools": list_tools,
+        "search": search,
+        "bulk_toggle": bulk_toggle,
+        "sse": sse,
+        "tool_calls": tool_calls,
+        "backend": backend.stats(),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [await measure(operations, args, workdir) for operations in args.operations]
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "spec": args.spec,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "payload_size": args.payload_size,
+            "error_rate": args.error_rate,
+            "requests": args.requests,
+            "toggle_rounds": args.toggle_rounds,
+            "sessions": args.sessions,
+            "duration": args.duration,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=200, help="requests per admin route")
+    parser.add_argument("--toggle-rounds", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent SSE sessions")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of tool calls")
+    parser.add_argument("--spec", choices=sorted(SPECS), default="simple")
+    parser.add_argument("--latency", type=float, default=0.0, help="backend latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform latency (s)")
+    parser.add_argument("--payload-size", type=int, default=None, help="min response bytes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500s")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
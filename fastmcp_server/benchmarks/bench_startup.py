@@ -0,0 +1,82 @@
+"""Compare cold and warm startup times with the tool catalog snapshot.
+
+Usage::
+
+    python benchmarks/bench_startup.py --specs 5 --operations 500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import routes  # noqa: E402
+import server  # noqa: E402
+from benchmarks.synthetic import make_spec  # noqa: E402
+
+
+async def _boot(cfg: dict) -> tuple[float, dict[str, float]]:
+    start = time.perf_counter()
+    app = await server.create_app(cfg)
+    elapsed = time.perf_counter() - start
+    await routes.close_clients(app.state.clients, app.state.db_session)
+    return elapsed, dict(app.state.startup_timings)
+
+
+async def run(specs: int, operations: int, rounds: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        swagger = []
+        for i in range(specs):
+            path = os.path.join(workdir, f"spec{i}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(make_spec(operations, title=f"spec{i}"), f)
+            swagger.append({"path": path, "apiBaseUrl": "http://mock", "prefix": f"spec{i}"})
+
+        catalog_dir = os.path.join(workdir, "catalog")
+        cfg = {
+            "swagger": swagger,
+            "server": {"host": "127.0.0.1", "port": 0},
+            "database": "sqlite+aiosqlite:///:memory:",
+            "catalog": {"dir": catalog_dir},
+        }
+
+        cold: list[float] = []
+        warm: list[float] = []
+        for _ in range(rounds):
+            cfg["catalog"]["rebuild"] = True
+            elapsed, cold_phases = await _boot(cfg)
+            cold.append(elapsed)
+            cfg["catalog"]["rebuild"] = False
+            elapsed, warm_phases = await _boot(cfg)
+            warm.append(elapsed)
+
+    return {
+        "specs": specs,
+        "operations_per_spec": operations,
+        "cold_seconds": min(cold),
+        "warm_seconds": min(warm),
+        "speedup": min(cold) / min(warm),
+        "cold_phases": cold_phases,
+        "warm_phases": warm_phases,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--specs", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    result = asyncio.run(run(args.specs, args.operations, args.rounds))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Compare the SSE and the streamable HTTP transports.
+
+For each transport (``sse``, and streamable HTTP with the ``stateless`` and
+the ``resumable`` session model) the server is started as ``server.py``
+against a local mock upstream. ``--sessions`` MCP client sessions are opened
+and kept open; the growth of the server's resident memory divided by the
+number of sessions is reported as the memory per session. Every session then
+calls a GET tool in a loop for ``--duration`` seconds to measure call latency.
+
+Usage::
+
+    python benchmarks/bench_transports.py --sessions 50 --duration 10 --output transports.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_server import latency_summary  # noqa: E402
+from benchmarks.bench_workers import SERVER, _free_port, _wait_ready  # noqa: E402
+from benchmarks.mock_backend import run_backend  # noqa: E402
+from benchmarks.synthetic import make_spec  # noqa: E402
+
+TRANSPORTS = ("sse", "stateless", "resumable")
+TOOL = "bench_getResource0"
+
+
+def _rss_bytes(pid: int) -> int | None:
+    """Resident set size of ``pid``, or ``None`` where ``/proc`` is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def _run_sessions(url: str, sessions: int, duration: float, pid: int) -> dict:
+    from fastmcp import Client
+
+    opened: list[float] = []
+    calls: list[float] = []
+    errors = 0
+    pending = sessions
+    all_open = asyncio.Event()
+    measured = asyncio.Event()
+
+    async def call(client, arguments: dict) -> None:
+        nonlocal errors
+        try:
+            await client.call_tool(TOOL, arguments)
+        except Exception:
+            errors += 1
+
+    def ready() -> None:
+        nonlocal pending
+        pending -= 1
+        if not pending:
+            all_open.set()
+
+    async def session(index: int) -> None:
+        started = time.perf_counter()
+        try:
+            client = Client(url)
+            await client.__aenter__()
+        except Exception:
+            ready()  # reported as a failed session
+            return
+        try:
+            # one call, so per-session state on the server is in place
+            await call(client, {"id": index})
+            opened.append(time.perf_counter() - started)
+            ready()
+            await measured.wait()
+            deadline = time.perf_counter() + duration
+            i = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                # distinct ids per session, so no calls are coalesced
+                await call(client, {"id": i * sessions + index})
+                calls.append(time.perf_counter() - started)
+                i += 1
+        finally:
+            await client.__aexit__(None, None, None)
+
+    baseline = _rss_bytes(pid)
+    tasks = [asyncio.create_task(session(index)) for index in range(sessions)]
+    await all_open.wait()
+    await asyncio.sleep(0.5)  # let the server settle before reading its memory
+    loaded = _rss_bytes(pid)
+    measured.set()
+    await asyncio.gather(*tasks)
+
+    per_session = None
+    if baseline is not None and loaded is not None:
+        per_session = round((loaded - baseline) / sessions)
+    return {
+        "memory": {
+            "baseline_bytes": baseline,
+            "with_sessions_bytes": loaded,
+            "per_session_bytes": per_session,
+        },
+        "open_session": {**latency_summary(opened), "failed": sessions - len(opened)},
+        "tool_calls": {
+            **latency_summary(calls),
+            "errors": errors,
+            "calls_per_second": round(len(calls) / duration, 1),
+        },
+    }
+
+
+def measure(transport: str, sessions: int, duration: float, upstream: str) -> dict:
+    session_model = "stateless" if transport == "sse" else transport
+    with tempfile.TemporaryDirectory() as workdir:
+        spec_path = os.path.join(workdir, "bench.json")
+        with open(spec_path, "w", encoding="utf-8") as f:
+            json.dump(make_spec(50, title="bench"), f)
+        port = _free_port()
+        cfg_path = os.path.join(workdir, "config.json")
+        with open(cfg_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "swagger": [{"path": spec_path, "apiBaseUrl": upstream, "prefix": "bench"}],
+                    "server": {"host": "127.0.0.1", "port": port},
+                    "streamable_http": {"session_model": session_model},
+                },
+                f,
+            )
+        env = {**os.environ, "DB_URL": f"sqlite+aiosqlite:///{workdir}/state.db"}
+        process = subprocess.Popen(
+            [sys.executable, SERVER, cfg_path],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_ready(port, process)
+            path = "/sse" if transport == "sse" else "/mcp"
+            result = asyncio.run(
+                _run_sessions(f"http://127.0.0.1:{port}{path}", sessions, duration, process.pid)
+            )
+        finally:
+            process.terminate()
+            process.wait(30)
+    return {"transport": transport, "sessions": sessions, **result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent client sessions")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of tool calls")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    upstream_port = _free_port()
+    upstream = multiprocessing.get_context("spawn").Process(
+        target=run_backend, args=(upstream_port,), daemon=True
+    )
+    upstream.start()
+    try:
+        results = [
+            measure(
+                transport, args.sessions, args.duration, f"http://127.0.0.1:{upstream_port}"
+            )
+            for transport in args.transports
+        ]
+    finally:
+        upstream.terminate()
+    report = {
+        "cpu_count": os.cpu_count(),
+        "settings": {"sessions": args.sessions, "duration": args.duration},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Measure tool-call throughput of the server with one and with several workers.
+
+The server is started as ``server.py --workers N`` against a SQLite file and a
+local mock upstream; client processes open MCP SSE sessions and call a GET
+tool in a loop.
+
+Usage::
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --sessions 32 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_backend import run_backend  # noqa: E402
+from benchmarks.synthetic import make_spec  # noqa: E402
+
+SERVER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server.py")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _session(url: str, deadline: float, latencies: list[float]) -> None:
+    from fastmcp import Client
+
+    async with Client(url) as client:
+        i = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await client.call_tool("bench_getResource0", {"id": i})
+            latencies.append(time.perf_counter() - started)
+            i += 1
+
+
+async def _client(url: str, sessions: int, duration: float) -> list[float]:
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(_session(url, deadline, latencies) for _ in range(sessions)))
+    return latencies
+
+
+def run_client(url: str, sessions: int, duration: float, results) -> None:
+    logging.disable(logging.INFO)
+    results.put(asyncio.run(_client(url, sessions, duration)))
+
+
+def _wait_ready(port: int, process: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("server did not start")
+
+
+def measure(
+    workers: int, sessions: int, client_processes: int, duration: float, upstream: str
+) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        spec_path = os.path.join(workdir, "bench.json")
+        with open(spec_path, "w", encoding="utf-8") as f:
+            json.dump(make_spec(50, title="bench"), f)
+        port = _free_port()
+        cfg_path = os.path.join(workdir, "config.json")
+        with open(cfg_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "swagger": [{"path": spec_path, "apiBaseUrl": upstream, "prefix": "bench"}],
+                    "server": {"host": "127.0.0.1", "port": port},
+                },
+                f,
+            )
+        env = {**os.environ, "DB_URL": f"sqlite+aiosqlite:///{workdir}/state.db"}
+        process = subprocess.Popen(
+            [sys.executable, SERVER, cfg_path, "--workers", str(workers)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_ready(port, process)
+            time.sleep(1.0 if workers > 1 else 0)  # let every worker come up
+            context = multiprocessing.get_context("spawn")
+            results = context.Queue()
+            per_process = max(1, sessions // client_processes)
+            clients = [
+                context.Process(
+                    target=run_client,
+                    args=(f"http://127.0.0.1:{port}/sse", per_process, duration, results),
+                )
+                for _ in range(client_processes)
+            ]
+            for client in clients:
+                client.start()
+            latencies = sorted(
+                latency for _ in clients for latency in results.get(timeout=duration + 120)
+            )
+            for client in clients:
+                client.join()
+        finally:
+            process.terminate()
+            process.wait(30)
+
+    def percentile(q: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2)
+
+    return {
+        "workers": workers,
+        "sessions": per_process * client_processes,
+        "calls": len(latencies),
+        "calls_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    upstream_port = _free_port()
+    upstream = multiprocessing.get_context("spawn").Process(
+        target=run_backend, args=(upstream_port,), daemon=True
+    )
+    upstream.start()
+    try:
+        results = [
+            measure(
+                workers,
+                args.sessions,
+                args.client_processes,
+                args.duration,
+                f"http://127.0.0.1:{upstream_port}",
+            )
+            for workers in args.workers
+        ]
+    finally:
+        upstream.terminate()
+    base = results[0]["calls_per_second"] or 1.0
+    for result in results:
+        result["speedup"] = round(result["calls_per_second"] / base, 2)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
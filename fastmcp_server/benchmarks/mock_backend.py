@@ -0,0 +1,247 @@
+"""Local mock of the upstream API behind the benchmarked tools.
+
+A keep-alive HTTP/1.1 server on ``asyncio`` streams that runs in the
+benchmark's own event loop (or in a process of its own with
+:func:`run_backend`). Given a spec it answers every operation with a body
+built from the operation's response schema; latency, payload size and error
+rate are configurable so a production profile can be reproduced offline.
+"""
+
+import asyncio
+import json
+import random
+import re
+
+DEFAULT_BODY = b'{"id": 1, "name": "resource"}'
+# Nesting below this depth is cut off when building example bodies
+MAX_EXAMPLE_DEPTH = 16
+# Resolved (method, path) pairs remembered before the cache is reset
+ROUTE_CACHE_SIZE = 10_000
+
+_REASONS = {
+    200: b"OK",
+    201: b"Created",
+    204: b"No Content",
+    404: b"Not Found",
+    500: b"Internal Server Error",
+}
+
+
+def _resolve(node: dict, spec: dict) -> dict:
+    """Follow the local ``$ref`` of ``node`` (if any) within ``spec``."""
+    while isinstance(node, dict) and "$ref" in node:
+        target = spec
+        for part in node["$ref"].lstrip("#/").split("/"):
+            target = target.get(part, {})
+        node = target
+    return node
+
+
+def example_from_schema(schema: dict, spec: dict, depth: int = 0):
+    """Return a value matching ``schema``, resolving ``$ref`` within ``spec``."""
+    if depth > MAX_EXAMPLE_DEPTH or not isinstance(schema, dict):
+        return None
+    if "$ref" in schema:
+        return example_from_schema(_resolve(schema, spec), spec, depth + 1)
+    if "example" in schema:
+        return schema["example"]
+    if "allOf" in schema:
+        merged: dict = {}
+        for part in schema["allOf"]:
+            value = example_from_schema(part, spec, depth + 1)
+            if isinstance(value, dict):
+                merged.update(value)
+        return merged
+    for key in ("oneOf", "anyOf"):
+        if schema.get(key):
+            return example_from_schema(schema[key][0], spec, depth + 1)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object" if "properties" in schema else None)
+    if kind == "object":
+        value = {
+            name: example_from_schema(prop, spec, depth + 1)
+            for name, prop in schema.get("properties", {}).items()
+        }
+        if isinstance(schema.get("additionalProperties"), dict):
+            value["key"] = example_from_schema(schema["additionalProperties"], spec, depth + 1)
+        return value
+    if kind == "array":
+        return [example_from_schema(schema.get("items", {}), spec, depth + 1)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.5
+    if kind == "boolean":
+        return True
+    if kind == "string":
+        return {"date-time": "2024-01-01T00:00:00Z", "date": "2024-01-01"}.get(
+            schema.get("format"), "string"
+        )
+    return None
+
+
+def _grow(value, size: int) -> bytes:
+    """Serialize ``value``, repeating its first list's items (or padding) up to ``size`` bytes."""
+    body = json.dumps(value, separators=(",", ":")).encode()
+    if len(body) >= size:
+        return body
+    items = None
+    if isinstance(value, list):
+        items = value
+    elif isinstance(value, dict):
+        items = next((v for v in value.values() if isinstance(v, list) and v), None)
+    if items:
+        item_size = len(json.dumps(items[0], separators=(",", ":"))) + 1
+        items.extend([items[0]] * ((size - len(body)) // item_size + 1))
+        return json.dumps(value, separators=(",", ":")).encode()
+    if isinstance(value, dict):
+        value["padding"] = "x" * (size - len(body))
+        return json.dumps(value, separators=(",", ":")).encode()
+    return body
+
+
+class _Operation:
+    __slots__ = ("pattern", "status", "body")
+
+    def __init__(self, pattern: re.Pattern, status: int, body: bytes):
+        self.pattern = pattern
+        self.status = status
+        self.body = body
+
+
+class MockBackend:
+    """Answer HTTP requests like the API described by ``spec``.
+
+    Without a spec every request gets :data:`DEFAULT_BODY`. Each response is
+    delayed by ``latency`` plus a uniform ``jitter`` (seconds), grown to at
+    least ``payload_size`` bytes, and replaced by a ``500`` with probability
+    ``error_rate``. Requests for paths the spec does not define get a ``404``.
+    Bodies are built once per operation, so serving costs next to nothing.
+    """
+
+    def __init__(
+        self,
+        spec: dict | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        payload_size: int | None = None,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._operations: dict[str, list[_Operation]] = {}
+        self._routes: dict[tuple[str, str], _Operation | None] = {}
+        self._default: _Operation | None = None
+        if spec is None:
+            body = _grow(json.loads(DEFAULT_BODY), payload_size or 0)
+            self._default = _Operation(re.compile(".*"), 200, body)
+        else:
+            self._load(spec, payload_size or 0)
+        self._error = json.dumps({"code": "mock_error", "message": "injected failure"}).encode()
+        self._not_found = json.dumps({"code": "not_found", "message": "no such operation"}).encode()
+        self._server: asyncio.Server | None = None
+        self.requests = 0
+        self.errors = 0
+
+    def _load(self, spec: dict, payload_size: int) -> None:
+        base = ""
+        if spec.get("servers"):
+            base = re.sub(r"^[a-z]+://[^/]+", "", spec["servers"][0].get("url", "")).rstrip("/")
+        for path, item in spec.get("paths", {}).items():
+            regex = re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(base + path))
+            pattern = re.compile(regex + "$")
+            for method, operation in item.items():
+                if method == "parameters" or not isinstance(operation, dict):
+                    continue
+                responses = operation.get("responses", {})
+                code = next((c for c in responses if str(c).startswith("2")), "200")
+                response = _resolve(responses.get(code, {}), spec)
+                schema = (
+                    (response.get("content") or {}).get("application/json", {}).get("schema")
+                )
+                body = b""
+                if int(code) != 204:
+                    body = _grow(example_from_schema(schema, spec) if schema else {}, payload_size)
+                self._operations.setdefault(method.upper(), []).append(
+                    _Operation(pattern, int(code), body)
+                )
+
+    def _respond(self, method: str, path: str) -> tuple[int, bytes]:
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            return 500, self._error
+        if self._default is not None:
+            return self._default.status, self._default.body
+        key = (method, path)
+        if key in self._routes:
+            operation = self._routes[key]
+        else:
+            operation = next(
+                (op for op in self._operations.get(method, ()) if op.pattern.match(path)), None
+            )
+            if len(self._routes) >= ROUTE_CACHE_SIZE:
+                self._routes.clear()
+            self._routes[key] = operation
+        if operation is None:
+            return 404, self._not_found
+        return operation.status, operation.body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.split(b"\r\n")
+                method, target = lines[0].split(b" ")[:2]
+                for line in lines[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        await reader.readexactly(int(value))
+                self.requests += 1
+                delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+                if delay:
+                    await asyncio.sleep(delay)
+                path = target.split(b"?", 1)[0].decode()
+                status, body = self._respond(method.decode(), path)
+                writer.write(
+                    b"HTTP/1.1 %d %s\r\ncontent-type: application/json\r\n"
+                    b"content-length: %d\r\n\r\n%s"
+                    % (status, _REASONS.get(status, b"Unknown"), len(body), body)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "MockBackend":
+        """Listen on ``host:port`` in the running loop; ``port=0`` picks a free port."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors}
+
+
+async def _serve(port: int, spec: dict | None, options: dict) -> None:
+    backend = await MockBackend(spec, **options).start(port=port)
+    await backend._server.serve_forever()
+
+
+def run_backend(port: int, spec: dict | None = None, **options) -> None:
+    """Serve a :class:`MockBackend` on ``port`` until the process is stopped."""
+    asyncio.run(_serve(port, spec, options))
@@ -0,0 +1,340 @@
+"""Synthetic OpenAPI documents for benchmarks."""
+
+import random
+
+
+def make_spec(operations: int, title: str = "synthetic") -> dict:
+    """Return an OpenAPI 3 document with ``operations`` GET/POST operations."""
+    paths: dict[str, dict] = {}
+    for i in range(operations):
+        resource = f"/resource{i // 2}"
+        if i % 2 == 0:
+            paths.setdefault(f"{resource}/{{id}}", {})["get"] = {
+                "operationId": f"getResource{i}",
+                "summary": f"Fetch resource {i}",
+                "tags": [f"group{i % 10}"],
+                "parameters": [
+                    {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}},
+                    {"name": "verbose", "in": "query", "schema": {"type": "boolean"}},
+                ],
+                "responses": {"200": {"description": "ok"}},
+            }
+        else:
+            paths.setdefault(resource, {})["post"] = {
+                "operationId": f"createResource{i}",
+                "summary": f"Create resource {i}",
+                "tags": [f"group{i % 10}"],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "name": {"type": "string"},
+                                    "size": {"type": "integer"},
+                                },
+                                "required": ["name"],
+                            }
+                        }
+                    },
+                },
+                "responses": {"201": {"description": "created"}},
+            }
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": title, "version": "1.0.0"},
+        "paths": paths,
+    }
+
+
+_DOMAINS = [
+    "accounts", "billing", "catalog", "crm", "hr", "inventory", "logistics",
+    "marketing", "orders", "payments", "payroll", "projects", "support", "timesheets",
+]
+_NOUNS = [
+    "customer", "employee", "invoice", "order", "product", "shipment", "ticket",
+    "contract", "payment", "warehouse", "supplier", "campaign", "project", "task",
+    "department", "timesheet", "leave", "asset", "vendor", "subscription",
+]
+# Operations generated per resource, see ``_resource_operations``
+_OPERATIONS_PER_RESOURCE = 7
+
+
+def _schema_name(noun: str, index: int) -> str:
+    return noun.capitalize() + (str(index) if index else "")
+
+
+def _shared_schemas() -> dict:
+    return {
+        "GeoPoint": {
+            "type": "object",
+            "properties": {"lat": {"type": "number"}, "lng": {"type": "number"}},
+            "required": ["lat", "lng"],
+        },
+        "Address": {
+            "type": "object",
+            "properties": {
+                "street": {"type": "string"},
+                "city": {"type": "string"},
+                "country": {"type": "string", "minLength": 2, "maxLength": 2},
+                "location": {"$ref": "#/components/schemas/GeoPoint"},
+            },
+        },
+        "AuditInfo": {
+            "type": "object",
+            "properties": {
+                "createdAt": {"type": "string", "format": "date-time"},
+                "createdBy": {"type": "string"},
+                "updatedAt": {"type": "string", "format": "date-time"},
+            },
+        },
+        "Metadata": {"type": "object", "additionalProperties": {"type": "string"}},
+        "Pagination": {
+            "type": "object",
+            "properties": {
+                "page": {"type": "integer"},
+                "pageSize": {"type": "integer"},
+                "total": {"type": "integer"},
+            },
+        },
+        "Error": {
+            "type": "object",
+            "properties": {"code": {"type": "string"}, "message": {"type": "string"}},
+            "required": ["code", "message"],
+        },
+    }
+
+
+def _resource_schemas(name: str, depth: int, rng) -> dict:
+    """Schemas of one resource with a ``$ref`` chain ``depth`` levels deep."""
+    ref = "#/components/schemas/"
+    schemas: dict[str, dict] = {}
+    # Name -> NameLevel1 -> ... -> NameLevel{depth}
+    chain = [name] + [f"{name}Level{level}" for level in range(1, depth + 1)]
+    for level, schema_name in enumerate(chain[1:], start=1):
+        properties = {
+            "code": {"type": "string"},
+            "value": {"type": rng.choice(["string", "integer", "number", "boolean"])},
+        }
+        if level < depth:
+            properties["children"] = {"type": "array", "items": {"$ref": ref + chain[level + 1]}}
+        schemas[schema_name] = {"type": "object", "properties": properties}
+    schemas[f"{name}Input"] = {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "maxLength": 200},
+            "status": {"type": "string", "enum": ["active", "inactive", "archived"]},
+            "address": {"$ref": ref + "Address"},
+            "metadata": {"$ref": ref + "Metadata"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["name"],
+    }
+    schemas[name] = {
+        "allOf": [
+            {"$ref": ref + f"{name}Input"},
+            {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer", "format": "int64"},
+                    "audit": {"$ref": ref + "AuditInfo"},
+                    "details": {"type": "array", "items": {"$ref": ref + chain[1]}},
+                },
+                "required": ["id"],
+            },
+        ]
+    }
+    schemas[f"{name}Page"] = {
+        "type": "object",
+        "properties": {
+            "items": {"type": "array", "items": {"$ref": ref + name}},
+            "pagination": {"$ref": ref + "Pagination"},
+        },
+    }
+    return schemas
+
+
+def _json_response(description: str, schema_ref: str) -> dict:
+    return {
+        "description": description,
+        "content": {"application/json": {"schema": {"$ref": schema_ref}}},
+    }
+
+
+def _resource_operations(
+    base: str, name: str, plural: str, id_param: str, tags: list[str]
+) -> dict[str, dict]:
+    """The paths of one resource: list, create, get, replace, update, delete, sub-item."""
+    ref = "#/components/schemas/"
+    errors = {
+        "404": {"$ref": "#/components/responses/NotFound"},
+        "default": {"$ref": "#/components/responses/Error"},
+    }
+    body = {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": ref + f"{name}Input"}}},
+    }
+    path_id = {"$ref": f"#/components/parameters/{id_param}"}
+    item = f"{base}/{{{id_param}}}"
+    return {
+        base: {
+            "get": {
+                "operationId": f"list{name}s",
+                "summary": f"List {plural}",
+                "description": f"Return a page of {plural}, filtered and sorted.",
+                "tags": tags,
+                "parameters": [
+                    {"$ref": "#/components/parameters/Page"},
+                    {"$ref": "#/components/parameters/PageSize"},
+                    {"name": "sort", "in": "query", "schema": {"type": "string"}},
+                    {
+                        "name": "status",
+                        "in": "query",
+                        "schema": {"type": "string", "enum": ["active", "inactive", "archived"]},
+                    },
+                ],
+                "responses": {"200": _json_response("A page", ref + f"{name}Page"), **errors},
+            },
+            "post": {
+                "operationId": f"create{name}",
+                "summary": f"Create a {name.lower()}",
+                "tags": tags,
+                "requestBody": body,
+                "responses": {"201": _json_response("Created", ref + name), **errors},
+            },
+        },
+        item: {
+            "parameters": [path_id],
+            "get": {
+                "operationId": f"get{name}",
+                "summary": f"Get a {name.lower()} by id",
+                "tags": tags,
+                "parameters": [
+                    {
+                        "name": "expand",
+                        "in": "query",
+                        "schema": {"type": "array", "items": {"type": "string"}},
+                    }
+                ],
+                "responses": {"200": _json_response("Found", ref + name), **errors},
+            },
+            "put": {
+                "operationId": f"replace{name}",
+                "summary": f"Replace a {name.lower()}",
+                "tags": tags,
+                "requestBody": body,
+                "responses": {"200": _json_response("Replaced", ref + name), **errors},
+            },
+            "patch": {
+                "operationId": f"update{name}",
+                "summary": f"Update fields of a {name.lower()}",
+                "tags": tags,
+                "requestBody": body,
+                "responses": {"200": _json_response("Updated", ref + name), **errors},
+            },
+            "delete": {
+                "operationId": f"delete{name}",
+                "summary": f"Delete a {name.lower()}",
+                "tags": tags,
+                "responses": {"204": {"description": "Deleted"}, **errors},
+            },
+        },
+        f"{item}/details/{{detailCode}}": {
+            "get": {
+                "operationId": f"get{name}Detail",
+                "summary": f"Get one detail of a {name.lower()}",
+                "tags": tags,
+                "parameters": [
+                    path_id,
+                    {
+                        "name": "detailCode",
+                        "in": "path",
+                        "required": True,
+                        "schema": {"type": "string"},
+                    },
+                ],
+                "responses": {
+                    "200": _json_response("Found", ref + f"{name}Level1"),
+                    **errors,
+                },
+            }
+        },
+    }
+
+
+def make_realistic_spec(
+    operations: int,
+    title: str = "synthetic",
+    tags: int | None = None,
+    depth: int = 4,
+    seed: int = 0,
+) -> dict:
+    """Return an OpenAPI 3 document shaped like a large production API.
+
+    Resources are grouped under ``/v1/{domain}/...`` and each has seven
+    operations: list, create, get, replace, update, delete and a nested
+    detail lookup, with shared path and query parameters. Their schemas use
+    ``allOf``, shared components and a ``$ref`` chain ``depth`` levels deep.
+    Operations are spread over ``tags`` tags (by default one per ten
+    operations). The output only depends on the arguments.
+    """
+    rng = random.Random(seed)
+    tag_count = tags or max(1, operations // 10)
+    tag_names = [f"{_DOMAINS[i % len(_DOMAINS)]}-{i // len(_DOMAINS)}" for i in range(tag_count)]
+    schemas = _shared_schemas()
+    parameters = {
+        "Page": {"name": "page", "in": "query", "schema": {"type": "integer", "minimum": 1}},
+        "PageSize": {
+            "name": "pageSize",
+            "in": "query",
+            "schema": {"type": "integer", "minimum": 1, "maximum": 500, "default": 50},
+        },
+    }
+    paths: dict[str, dict] = {}
+    remaining = operations
+    resource = 0
+    while remaining > 0:
+        noun = _NOUNS[resource % len(_NOUNS)]
+        name = _schema_name(noun, resource // len(_NOUNS))
+        domain = _DOMAINS[resource % len(_DOMAINS)]
+        id_param = f"{noun}Id"
+        parameters[id_param] = {
+            "name": id_param,
+            "in": "path",
+            "required": True,
+            "schema": {"type": "integer", "format": "int64"},
+        }
+        resource_tags = [tag_names[resource % tag_count]]
+        if rng.random() < 0.3:
+            resource_tags.append(rng.choice(tag_names))
+        base = f"/v1/{domain}/{name.lower()}s"
+        resource_paths = _resource_operations(base, name, f"{noun}s", id_param, resource_tags)
+        for path, item in resource_paths.items():
+            kept = {}
+            for method, operation in item.items():
+                if method == "parameters":
+                    kept[method] = operation
+                elif remaining > 0:
+                    kept[method] = operation
+                    remaining -= 1
+            if set(kept) - {"parameters"}:
+                paths[path] = kept
+        schemas.update(_resource_schemas(name, depth, rng))
+        resource += 1
+
+    return {
+        "openapi": "3.0.3",
+        "info": {"title": title, "version": "1.0.0"},
+        "servers": [{"url": "http://localhost"}],
+        "tags": [{"name": tag, "description": f"Operations of {tag}"} for tag in tag_names],
+        "paths": paths,
+        "components": {
+            "schemas": schemas,
+            "parameters": parameters,
+            "responses": {
+                "NotFound": _json_response("Not found", "#/components/schemas/Error"),
+                "Error": _json_response("Unexpected error", "#/components/schemas/Error"),
+            },
+        },
+    }
@@ -1,8 +1,31 @@
 from __future__ import annotations
 
+import json
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, JSON, Boolean, select
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    DateTime,
+    Integer,
+    String,
+    delete,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Rows per INSERT statement; keeps bound parameters below SQLite's limit
+UPSERT_BATCH_SIZE = 250
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Inserts tried by save_config when another writer takes the version number
+SAVE_CONFIG_ATTEMPTS = 5
 
 
 class Base(DeclarativeBase):
@@ -24,14 +47,88 @@ class ToolStatus(Base):
     enabled: Mapped[bool] = mapped_column(Boolean, default=True)
 
 
-async def init_db(db_url: str) -> async_sessionmaker[AsyncSession]:
+class ConfigVersion(Base):
+    """Every saved revision of a named server configuration."""
+
+    __tablename__ = "config_versions"
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    data: Mapped[dict] = mapped_column(JSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class SearchFlag(Base):
+    """Whether a mounted server takes part in ``/search``."""
+
+    __tablename__ = "search_flags"
+    prefix: Mapped[str] = mapped_column(String(100), primary_key=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+
+
+class StateChange(Base):
+    """Change to the shared tool state, replayed by the other workers."""
+
+    __tablename__ = "state_changes"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(20))
+    prefix: Mapped[str] = mapped_column(String(100))
+    data: Mapped[dict] = mapped_column(JSON)
+    origin: Mapped[str] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+def engine_options(db_url: str, pool: dict | None = None) -> dict:
+    """Translate the ``database_pool`` config section into engine arguments.
+
+    ``pool_size`` and ``max_overflow`` only apply to pooled backends; SQLite
+    keeps SQLAlchemy's default pool for its URL. ``statement_cache_size`` sets
+    SQLAlchemy's compiled query cache and, for asyncpg, the per-connection
+    prepared statement cache.
+    """
+    pool = pool or {}
+    options: dict = {"future": True}
+    if "pool_pre_ping" in pool:
+        options["pool_pre_ping"] = bool(pool["pool_pre_ping"])
+    if "pool_recycle" in pool:
+        options["pool_recycle"] = int(pool["pool_recycle"])
+    if not db_url.startswith("sqlite"):
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            if key in pool:
+                options[key] = pool[key]
+    if "statement_cache_size" in pool:
+        size = int(pool["statement_cache_size"])
+        options["query_cache_size"] = size
+        if "+asyncpg" in db_url:
+            options["connect_args"] = {"prepared_statement_cache_size": size}
+    return options
+
+
+async def init_db(db_url: str, pool: dict | None = None) -> async_sessionmaker[AsyncSession]:
     """Initialise the database and return a sessionmaker."""
-    engine = create_async_engine(db_url, future=True)
+    engine = create_async_engine(db_url, **engine_options(db_url, pool))
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     return async_sessionmaker(engine, expire_on_commit=False)
 
 
+def _upsert_statement(session: AsyncSession, model: type[Base], rows: list[dict]):
+    """Return ``INSERT ... ON CONFLICT DO UPDATE`` for ``rows``, or ``None``.
+
+    Conflicts are detected on the primary key and every other column is
+    overwritten. ``None`` is returned for dialects without native support.
+    """
+    insert = _UPSERT_INSERTS.get(session.bind.dialect.name)
+    if insert is None:
+        return None
+    table = model.__table__
+    stmt = insert(table).values(rows)
+    keys = [column.name for column in table.primary_key]
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in keys},
+    )
+
+
 async def get_specs(session: AsyncSession) -> list[dict]:
     result = await session.scalars(select(Spec))
     return [spec.config for spec in result]
@@ -41,7 +138,11 @@ async def add_spec(session: AsyncSession, spec_cfg: dict) -> None:
     prefix = spec_cfg.get("prefix")
     if not prefix:
         raise ValueError("spec config must include a prefix")
-    await session.merge(Spec(prefix=prefix, config=spec_cfg))
+    stmt = _upsert_statement(session, Spec, [{"prefix": prefix, "config": spec_cfg}])
+    if stmt is None:
+        await session.merge(Spec(prefix=prefix, config=spec_cfg))
+    else:
+        await session.execute(stmt)
     await session.commit()
 
 
@@ -49,7 +150,29 @@ async def set_tool_enabled(
     session: AsyncSession, prefix: str, name: str, enabled: bool
 ) -> None:
     """Insert or update a tool's enabled state."""
-    await session.merge(ToolStatus(prefix=prefix, name=name, enabled=enabled))
+    await set_tools_enabled(session, [(prefix, name, enabled)])
+
+
+async def set_tools_enabled(
+    session: AsyncSession, rows: list[tuple[str, str, bool]]
+) -> None:
+    """Insert or update many ``(prefix, name, enabled)`` states in one transaction.
+
+    PostgreSQL and SQLite get a multi-row ``INSERT ... ON CONFLICT DO UPDATE``;
+    other dialects fall back to ``merge``.
+    """
+    if not rows:
+        return
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        batch = rows[start : start + UPSERT_BATCH_SIZE]
+        stmt = _upsert_statement(
+            session, ToolStatus, [{"prefix": p, "name": n, "enabled": e} for p, n, e in batch]
+        )
+        if stmt is None:
+            for prefix, name, enabled in batch:
+                await session.merge(ToolStatus(prefix=prefix, name=name, enabled=enabled))
+        else:
+            await session.execute(stmt)
     await session.commit()
 
 
@@ -61,3 +184,112 @@ async def get_tool_statuses(
         stmt = stmt.where(ToolStatus.prefix == prefix)
     result = await session.scalars(stmt)
     return list(result)
+
+
+async def get_tool_status_map(session: AsyncSession) -> dict[str, dict[str, bool]]:
+    """Return all stored tool states as ``{prefix: {name: enabled}}`` in one query."""
+    result = await session.execute(
+        select(ToolStatus.prefix, ToolStatus.name, ToolStatus.enabled)
+    )
+    statuses: dict[str, dict[str, bool]] = {}
+    for prefix, name, enabled in result:
+        statuses.setdefault(prefix, {})[name] = enabled
+    return statuses
+
+
+async def get_config(session: AsyncSession, name: str = "default") -> tuple[int, dict] | None:
+    """Return ``(version, data)`` of the latest revision of config ``name``."""
+    result = await session.execute(
+        select(ConfigVersion.version, ConfigVersion.data)
+        .where(ConfigVersion.name == name)
+        .order_by(ConfigVersion.version.desc())
+        .limit(1)
+    )
+    row = result.first()
+    return (row.version, row.data) if row else None
+
+
+async def save_config(session: AsyncSession, data: dict, name: str = "default") -> int:
+    """Store ``data`` as a new revision of config ``name`` and return its version.
+
+    Nothing is written when ``data`` equals the latest revision. A concurrent
+    writer taking the same version number makes the insert retry, up to
+    :data:`SAVE_CONFIG_ATTEMPTS` times before the ``IntegrityError`` is raised.
+    """
+    for attempt in range(1, SAVE_CONFIG_ATTEMPTS + 1):
+        latest = await get_config(session, name)
+        if latest is not None and latest[1] == data:
+            return latest[0]
+        version = latest[0] + 1 if latest else 1
+        session.add(ConfigVersion(name=name, version=version, data=data))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            if attempt == SAVE_CONFIG_ATTEMPTS:
+                raise
+            continue
+        return version
+
+
+async def get_legacy_config(session: AsyncSession, name: str = "default") -> dict | None:
+    """Read config ``name`` from the unversioned ``configs`` table, if present."""
+    connection = await session.connection()
+    if not await connection.run_sync(lambda conn: inspect(conn).has_table("configs")):
+        return None
+    result = await session.execute(
+        text("SELECT data FROM configs WHERE name = :name"), {"name": name}
+    )
+    data = result.scalar()
+    if isinstance(data, str):
+        return json.loads(data)
+    return data
+
+
+async def set_search_enabled(session: AsyncSession, prefix: str, enabled: bool) -> None:
+    stmt = _upsert_statement(session, SearchFlag, [{"prefix": prefix, "enabled": enabled}])
+    if stmt is None:
+        await session.merge(SearchFlag(prefix=prefix, enabled=enabled))
+    else:
+        await session.execute(stmt)
+    await session.commit()
+
+
+async def get_search_flags(session: AsyncSession) -> dict[str, bool]:
+    result = await session.execute(select(SearchFlag.prefix, SearchFlag.enabled))
+    return {prefix: enabled for prefix, enabled in result}
+
+
+async def add_state_change(
+    session: AsyncSession, kind: str, prefix: str, data: dict, origin: str
+) -> int:
+    """Append a change to the ``state_changes`` log and return its id.
+
+    The session is not committed so the caller can notify in the same
+    transaction.
+    """
+    change = StateChange(kind=kind, prefix=prefix, data=data, origin=origin)
+    session.add(change)
+    await session.flush()
+    return change.id
+
+
+async def get_state_changes(
+    session: AsyncSession, after: int, limit: int = 1000
+) -> list[StateChange]:
+    """Return logged changes with an id above ``after`` in id order."""
+    result = await session.scalars(
+        select(StateChange).where(StateChange.id > after).order_by(StateChange.id).limit(limit)
+    )
+    return list(result)
+
+
+async def get_last_state_change_id(session: AsyncSession) -> int:
+    return await session.scalar(select(func.max(StateChange.id))) or 0
+
+
+async def prune_state_changes(session: AsyncSession, older_than: datetime) -> int:
+    """Delete logged changes created before ``older_than``; return the count."""
+    result = await session.execute(delete(StateChange).where(StateChange.created_at < older_than))
+    await session.commit()
+    return result.rowcount or 0
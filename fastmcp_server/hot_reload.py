@@ -0,0 +1,246 @@
+"""Applying configuration changes to a running server."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import os
+import signal
+import time
+
+import httpx
+from fastapi import FastAPI
+
+import db
+import routes
+from sync import StateSync
+from utils.config_utils import config_paths, load_config
+from utils.db_utils import save_config_to_db
+from utils.openapi_utils import _get_prefix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_INTERVAL = 2.0
+
+
+def diff_specs(old: list[dict], new: list[dict]) -> dict[str, list[str]]:
+    """Compare two ``swagger`` lists by prefix.
+
+    Returns the ``added``, ``removed``, ``changed`` and ``unchanged`` prefixes.
+    """
+    before = {_get_prefix(spec_cfg): spec_cfg for spec_cfg in old}
+    after = {_get_prefix(spec_cfg): spec_cfg for spec_cfg in new}
+    return {
+        "added": [prefix for prefix in after if prefix not in before],
+        "removed": [prefix for prefix in before if prefix not in after],
+        "changed": [
+            prefix for prefix in after if prefix in before and before[prefix] != after[prefix]
+        ],
+        "unchanged": [
+            prefix for prefix in after if prefix in before and before[prefix] == after[prefix]
+        ],
+    }
+
+
+def check_config(cfg: object) -> None:
+    """Raise ``ValueError`` unless ``cfg`` is a config object with a ``swagger`` list.
+
+    Every swagger entry must resolve to a prefix; checked before anything is
+    unmounted, so a malformed config cannot take the running servers down.
+    """
+    if not isinstance(cfg, dict):
+        raise ValueError("config must be a JSON object")
+    specs = cfg.get("swagger")
+    if not isinstance(specs, list):
+        raise ValueError("config must have a 'swagger' list")
+    for spec_cfg in specs:
+        if not isinstance(spec_cfg, dict) or not _get_prefix(spec_cfg):
+            raise ValueError("every 'swagger' entry needs a 'prefix' or 'path'")
+
+
+def _changed_sections(old: dict, new: dict) -> list[str]:
+    """Top-level sections other than ``swagger`` that differ."""
+
+    def settings(cfg: dict) -> dict:
+        # the worker count is set on the command line, not in the file
+        server = {k: v for k, v in (cfg.get("server") or {}).items() if k != "workers"}
+        return {**cfg, "server": server, "swagger": None}
+
+    old, new = settings(old), settings(new)
+    return sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+
+class ConfigReloader:
+    """Mount, unmount or rebuild only the prefixes whose swagger entry changed.
+
+    Entries that are configured but not mounted, because they failed to load
+    earlier, are mounted again and reported as ``added``. Servers whose entry
+    is unchanged keep their sub-server, upstream client and live SSE sessions.
+    Changes to other config sections are reported in ``restart_required`` but
+    not applied. Reloads are serialized.
+    """
+
+    def __init__(
+        self,
+        app: FastAPI,
+        cfg: dict,
+        config_source: str | list[str] | None = None,
+        state_sync: StateSync | None = None,
+    ):
+        self.app = app
+        self.cfg = cfg
+        self.config_source = config_source
+        self.state_sync = state_sync
+        self.last_report: dict | None = None
+        self._applied = copy.deepcopy(cfg)
+        self._lock = asyncio.Lock()
+        self._watch_task: asyncio.Task | None = None
+
+    async def reload(self, new_cfg: dict | None = None, propagate: bool = True) -> dict:
+        """Apply ``new_cfg`` (or the re-read config source) and return a report.
+
+        Raises ``ValueError`` for a malformed or unreadable config, leaving the
+        running config in place. With ``propagate`` the other workers are told
+        to reload as well.
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            if new_cfg is None:
+                if self.config_source is None:
+                    raise ValueError("no config source to reload from")
+                try:
+                    new_cfg = await asyncio.to_thread(load_config, self.config_source, True)
+                except (httpx.HTTPError, OSError, ValueError) as exc:
+                    # keep the running config rather than falling back to the default
+                    raise ValueError(f"cannot read config: {exc}") from exc
+            check_config(new_cfg)
+            report = await self._apply(await self._with_added_servers(new_cfg))
+            report["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self.last_report = report
+            logger.info(
+                "Reloaded config in %.1f ms: added=%s removed=%s changed=%s failed=%s",
+                report["duration_ms"],
+                report["added"],
+                report["removed"],
+                report["changed"],
+                list(report["failed"]),
+            )
+            # saved and broadcast under the lock, in the order reloads are applied
+            await save_config_to_db(self.app.state.db_session, new_cfg)
+            if propagate and self.state_sync is not None:
+                await self.state_sync.publish("reload", "*", {"config": new_cfg})
+        return report
+
+    async def _with_added_servers(self, new_cfg: dict) -> dict:
+        """Keep servers added through ``/add-server`` that ``new_cfg`` does not define."""
+        async with self.app.state.db_session() as session:
+            stored = await db.get_specs(session)
+        defined = {_get_prefix(spec_cfg) for spec_cfg in new_cfg.get("swagger", [])}
+        extra = [spec_cfg for spec_cfg in stored if _get_prefix(spec_cfg) not in defined]
+        return {**new_cfg, "swagger": list(new_cfg.get("swagger", [])) + extra}
+
+    async def _apply(self, new_cfg: dict) -> dict:
+        state = self.app.state
+        cfg = self.cfg
+        diff = diff_specs(cfg.get("swagger", []), new_cfg.get("swagger", []))
+        # an entry that failed to load is configured but not mounted: try it again
+        mounted = state.root_server._mounted_servers
+        retry = [prefix for prefix in diff["unchanged"] if prefix not in mounted]
+        diff["unchanged"] = [prefix for prefix in diff["unchanged"] if prefix in mounted]
+        diff["added"] += retry
+        restart_required = _changed_sections(self._applied, new_cfg)
+        self._applied = copy.deepcopy(new_cfg)
+        failed: dict[str, str] = {}
+        old_entries = {_get_prefix(s): s for s in cfg.get("swagger", [])}
+        new_entries = {_get_prefix(s): s for s in new_cfg.get("swagger", [])}
+        mount_args = (
+            state.root_server,
+            self.app,
+            state.server_info,
+            state.clients,
+            cfg,
+            state.spec_cache,
+            state.catalog,
+            state.tool_registry,
+        )
+
+        for prefix in diff["removed"] + diff["changed"] + retry:
+            await routes.unmount_spec(
+                prefix,
+                state.root_server,
+                self.app,
+                state.server_info,
+                state.clients,
+                cfg,
+                state.tool_registry,
+            )
+        for prefix in diff["added"] + diff["changed"]:
+            try:
+                await routes.mount_spec(dict(new_entries[prefix]), *mount_args)
+            except Exception as exc:
+                logger.error("Failed to mount %s on reload: %s", prefix, exc)
+                failed[prefix] = str(exc) or type(exc).__name__
+                if prefix in old_entries and prefix not in retry:
+                    # keep serving the previous version of a changed server
+                    try:
+                        await routes.mount_spec(dict(old_entries[prefix]), *mount_args)
+                    except Exception:
+                        logger.exception("Failed to restore %s", prefix)
+
+        # keep the order of the new config
+        order = {prefix: i for i, prefix in enumerate(new_entries)}
+        cfg["swagger"].sort(key=lambda s: order.get(_get_prefix(s), len(order)))
+        return {
+            **diff,
+            "failed": failed,
+            "restart_required": restart_required,
+        }
+
+    def install_signal_handler(self) -> bool:
+        """Reload on ``SIGHUP``; returns ``False`` where that is not supported."""
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGHUP, lambda: asyncio.create_task(self._reload_logged())
+            )
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            return False
+        return True
+
+    async def _reload_logged(self) -> None:
+        try:
+            await self.reload(propagate=False)
+        except Exception:
+            logger.exception("Config reload failed")
+
+    def watch(self, interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        """Reload whenever a local config file of the source is modified."""
+        paths = config_paths(self.config_source) if self.config_source else []
+        if paths:
+            self._watch_task = asyncio.create_task(self._watch(paths, interval))
+
+    @staticmethod
+    def _mtimes(paths: list[str]) -> tuple[float, ...] | None:
+        try:
+            return tuple(os.stat(path).st_mtime for path in paths)
+        except OSError:
+            return None  # a file is being replaced; look again later
+
+    async def _watch(self, paths: list[str], interval: float) -> None:
+        seen = self._mtimes(paths)
+        while True:
+            await asyncio.sleep(interval)
+            current = self._mtimes(paths)
+            if current is None or current == seen:
+                continue
+            seen = current
+            await self._reload_logged()
+
+    async def close(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
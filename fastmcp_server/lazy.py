@@ -0,0 +1,157 @@
+"""Lazily materialized OpenAPI sub-servers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+import httpx
+from fastmcp import FastMCP
+from fastmcp.server.openapi import FastMCPOpenAPI
+from fastmcp.tools import Tool
+from fastmcp.utilities.types import MCPContent
+
+from utils.catalog_utils import CatalogStore, build_sub_server
+
+logger = logging.getLogger(__name__)
+
+HTTP_METHODS = {"get", "put", "post", "delete", "options", "head", "patch", "trace"}
+# Seconds between eviction rounds while no lazy server has an idle timeout
+IDLE_CHECK_INTERVAL = 1.0
+
+
+def count_operations(spec: dict) -> int:
+    """Return the number of operations declared in ``spec``."""
+    return sum(
+        1
+        for item in (spec.get("paths") or {}).values()
+        if isinstance(item, dict)
+        for method in item
+        if method.lower() in HTTP_METHODS
+    )
+
+
+class LazyOpenAPIServer(FastMCP):
+    """Stand-in for a ``FastMCPOpenAPI`` server that is built on first use.
+
+    Only the spec and an operation count are kept until the tools are listed
+    or called. If ``idle_timeout`` is set the built server is dropped again by
+    :func:`evict_idle_servers` once it has not been used for that long;
+    ``on_build`` is awaited after every (re)build so persisted tool state can
+    be applied, and ``on_evict`` is called after an eviction so whatever else
+    holds the tools (the tool registry) can let go of them as well.
+    """
+
+    def __init__(
+        self,
+        spec: dict,
+        client: httpx.AsyncClient,
+        name: str,
+        catalog: CatalogStore | None = None,
+        idle_timeout: float | None = None,
+        on_build: Callable[[FastMCPOpenAPI], Awaitable[None]] | None = None,
+        on_evict: Callable[[], None] | None = None,
+    ):
+        super().__init__(name=name)
+        self.spec = spec
+        self.operation_count = count_operations(spec)
+        self.idle_timeout = idle_timeout
+        self.on_build = on_build
+        self.on_evict = on_evict
+        self.last_used = time.monotonic()
+        self._client = client
+        self._catalog = catalog
+        self._server: FastMCPOpenAPI | None = None
+        self._lock = asyncio.Lock()
+        self._in_flight = 0
+
+    @property
+    def is_built(self) -> bool:
+        return self._server is not None
+
+    async def materialize(self) -> FastMCPOpenAPI:
+        """Build the underlying server if needed and return it."""
+        self.last_used = time.monotonic()
+        if self._server is not None:
+            return self._server
+        async with self._lock:
+            if self._server is None:
+                logger.info("Materializing lazy server %s", self.name)
+                server = await asyncio.to_thread(
+                    build_sub_server, self.spec, self._client, self.name, self._catalog
+                )
+                if self.on_build is not None:
+                    await self.on_build(server)
+                self._server = server
+        return self._server
+
+    def evict_if_idle(self, now: float | None = None) -> bool:
+        """Drop the built server if it has been idle for ``idle_timeout``."""
+        if self._server is None or self.idle_timeout is None or self._in_flight:
+            return False
+        now = time.monotonic() if now is None else now
+        if now - self.last_used < self.idle_timeout:
+            return False
+        logger.info("Evicting idle lazy server %s", self.name)
+        self._server = None
+        if self.on_evict is not None:
+            self.on_evict()
+        return True
+
+    async def get_tools(self) -> dict[str, Tool]:
+        server = await self.materialize()
+        return await server.get_tools()
+
+    async def _call_tool(self, key: str, arguments: dict[str, Any]) -> list[MCPContent]:
+        server = await self.materialize()
+        self._in_flight += 1
+        try:
+            return await server._call_tool(key, arguments)
+        finally:
+            self._in_flight -= 1
+            self.last_used = time.monotonic()
+
+
+def lazy_server_for(
+    spec_cfg: dict,
+    spec: dict,
+    client: httpx.AsyncClient,
+    catalog: CatalogStore | None = None,
+    startup_cfg: dict | None = None,
+) -> LazyOpenAPIServer | None:
+    """Return a placeholder for ``spec_cfg`` if it is configured as ``lazy``."""
+    startup_cfg = startup_cfg or {}
+    if not spec_cfg.get("lazy", startup_cfg.get("lazy", False)):
+        return None
+    idle_timeout = spec_cfg.get("idle_timeout", startup_cfg.get("idle_timeout"))
+    return LazyOpenAPIServer(
+        spec,
+        client,
+        f"{spec_cfg.get('prefix', 'api')} server",
+        catalog=catalog,
+        idle_timeout=float(idle_timeout) if idle_timeout else None,
+    )
+
+
+def eviction_interval(servers: Iterable[LazyOpenAPIServer]) -> float:
+    """Half the shortest ``idle_timeout`` of ``servers``, at least one second.
+
+    Falls back to :data:`IDLE_CHECK_INTERVAL` while no server has a timeout.
+    """
+    timeouts = [server.idle_timeout for server in servers if server.idle_timeout]
+    return max(1.0, min(timeouts) / 2) if timeouts else IDLE_CHECK_INTERVAL
+
+
+async def evict_idle_servers(servers: Iterable[LazyOpenAPIServer]) -> None:
+    """Periodically evict idle lazy servers until cancelled.
+
+    ``servers`` is re-read every round, so servers mounted later are evicted
+    too and the period follows :func:`eviction_interval` of the current list.
+    """
+    while True:
+        await asyncio.sleep(eviction_interval(servers))
+        now = time.monotonic()
+        for server in list(servers):
+            server.evict_if_idle(now)
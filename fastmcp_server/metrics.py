@@ -0,0 +1,392 @@
+"""In-process metrics rendered in the Prometheus text format."""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable
+
+from fastmcp import FastMCP
+from fastmcp.exceptions import NotFoundError
+from fastmcp.utilities.types import MCPContent
+from sqlalchemy import event
+
+from utils.http_utils import UpstreamClient
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# ``tool`` label of calls to names the sub-server does not know
+UNKNOWN_TOOL = "__unknown__"
+
+# (labels, value) pairs of one metric family produced by a collector
+Samples = list[tuple[dict[str, Any], float]]
+Collector = Callable[[], Iterable[tuple[str, str, str, Samples]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def _labels(self, values: tuple) -> dict[str, Any]:
+        return dict(zip(self.labelnames, values))
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label tuple."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value per label tuple that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, *labels: Any, value: float) -> None:
+        self.values[labels] = value
+
+    def dec(self, *labels: Any, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label tuple.
+
+    Each observation increments one bucket; the cumulative counts Prometheus
+    expects are only computed when rendering.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label tuple -> [per-bucket counts (+Inf last), sum]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: Any) -> int:
+        series = self.series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in self.series.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(float(bound))})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Metrics of one app.
+
+    Hot-path metrics are plain dict updates; values that other components
+    already keep (pool, cache and queue statistics, startup timings) are read
+    by collectors only when ``/metrics`` is scraped.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Collector] = []
+        self.tool_calls = self.counter(
+            "mcp_tool_calls_total", "MCP tool calls by outcome.", ("prefix", "tool", "status")
+        )
+        self.tool_duration = self.histogram(
+            "mcp_tool_call_duration_seconds", "MCP tool call latency.", ("prefix", "tool")
+        )
+        self.http_requests = self.counter(
+            "mcp_http_requests_total", "Admin HTTP requests.", ("method", "route", "status")
+        )
+        self.http_duration = self.histogram(
+            "mcp_http_request_duration_seconds", "Admin HTTP request latency.", ("method", "route")
+        )
+        self.sse_sessions = self.gauge(
+            "mcp_sse_sessions_active", "Open SSE streams by mount path.", ("mount",)
+        )
+        self.db_duration = self.histogram(
+            "mcp_db_query_duration_seconds", "Database statement latency.", ("statement",)
+        )
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        """Register ``collector`` yielding ``(name, type, help, samples)`` at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(
+                    f"{name}{_format_labels(labels)} {_format_value(value)}"
+                    for labels, value in samples
+                )
+        return "\n".join(lines) + "\n"
+
+    def instrument_server(self, server: FastMCP, prefix: str) -> None:
+        """Time every tool call handled by the mounted ``server``.
+
+        Both the root server and the per-prefix SSE app end up in the
+        sub-server's ``_call_tool``, so each call is counted once. Calls to
+        tools the sub-server does not have are labelled :data:`UNKNOWN_TOOL`.
+        """
+        call_tool = server._call_tool
+        calls = self.tool_calls
+        duration = self.tool_duration
+
+        async def timed_call_tool(key: str, arguments: dict[str, Any]) -> list[MCPContent]:
+            started = time.perf_counter()
+            status = "error"
+            tool = key
+            try:
+                result = await call_tool(key, arguments)
+                status = "ok"
+                return result
+            except NotFoundError:
+                # the name comes from the client, keep made-up ones out of the labels
+                tool = UNKNOWN_TOOL
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started, prefix, tool)
+                calls.inc(prefix, tool, status)
+
+        server._call_tool = timed_call_tool
+
+    def instrument_engine(self, engine) -> None:
+        """Record the duration of every statement run on ``engine``."""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        histogram = self.db_duration
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["metrics_started"].pop()
+            verb = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+            histogram.observe(time.perf_counter() - started, verb)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def failed(context):
+            stack = context.connection.info.get("metrics_started") if context.connection else None
+            if stack:
+                stack.pop()
+
+
+def startup_collector(timings: dict[str, float]) -> Collector:
+    """Expose the startup phase wall times recorded by ``phase_timer``."""
+
+    def collect():
+        samples = [({"phase": phase}, seconds) for phase, seconds in timings.items()]
+        yield "mcp_startup_phase_seconds", "gauge", "Wall time of each startup phase.", samples
+
+    return collect
+
+
+def upstream_collector(clients: list) -> Collector:
+    """Expose the counters the upstream clients keep for ``/pool-stats``."""
+
+    def collect():
+        upstream = [client for client in clients if isinstance(client, UpstreamClient)]
+        responses, in_flight, cache, deduplicated, rejected = [], [], [], [], []
+        for client in upstream:
+            prefix = client.prefix
+            stats = client.limiter.stats
+            responses.extend(
+                ({"prefix": prefix, "code": code}, count)
+                for code, count in stats.status_codes.items()
+            )
+            in_flight.append(({"prefix": prefix}, stats.in_flight))
+            if client.cache is not None:
+                cache.extend(
+                    ({"prefix": prefix, "result": result}, getattr(client.cache, result))
+                    for result in ("hits", "stale_hits", "misses")
+                )
+            if client.single_flight is not None:
+                deduplicated.append(
+                    ({"prefix": prefix}, client.single_flight.stats()["deduplicated"])
+                )
+            if client.guard is not None:
+                rejected.extend(
+                    ({"prefix": prefix, "reason": reason}, count)
+                    for reason, count in client.guard.stats()["rejected"].items()
+                )
+        yield (
+            "mcp_upstream_responses_total",
+            "counter",
+            "Upstream responses by status code.",
+            responses,
+        )
+        yield "mcp_upstream_in_flight", "gauge", "Upstream requests in flight.", in_flight
+        yield "mcp_upstream_cache_lookups_total", "counter", "Response cache lookups.", cache
+        yield (
+            "mcp_upstream_deduplicated_total",
+            "counter",
+            "Calls served by an identical in-flight request.",
+            deduplicated,
+        )
+        yield (
+            "mcp_upstream_rejected_total",
+            "counter",
+            "Calls rejected by upstream limits.",
+            rejected,
+        )
+
+    return collect
+
+
+class MetricsMiddleware:
+    """Time admin routes and count open SSE streams.
+
+    Requests are attributed to the FastAPI route that handled them (its path
+    template), so the label set stays bounded; MCP message posts and other
+    mounted apps are not timed.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if scope["method"] == "GET" and path.endswith("/sse"):
+            mount = path[: -len("/sse")] or "/"
+            sessions = self.metrics.sse_sessions
+            sessions.inc(mount)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                sessions.dec(mount)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                method = scope["method"]
+                self.metrics.http_duration.observe(
+                    time.perf_counter() - started, method, route.path
+                )
+                self.metrics.http_requests.inc(method, route.path, status)
+
+
+def status_queue_collector(queue) -> Collector:
+    """Expose the write-behind queue figures reported by ``/status-queue``."""
+
+    def collect():
+        stats = queue.metrics()
+        yield "mcp_status_queue_depth", "gauge", "Tool states waiting to be written.", [
+            ({}, stats["depth"])
+        ]
+        for key, help in (
+            ("enqueued", "Tool state changes queued."),
+            ("coalesced", "Queued changes replaced by a newer one before the flush."),
+            ("flushes", "Batches written to the database."),
+            ("flushed_rows", "Tool states written to the database."),
+            ("errors", "Batches that failed to be written."),
+        ):
+            yield f"mcp_status_queue_{key}_total", "counter", help, [({}, stats[key])]
+        yield (
+            "mcp_status_queue_flush_seconds",
+            "gauge",
+            "Duration of the last, slowest and average flush.",
+            [
+                ({"stat": stat}, stats[f"{stat}_flush_ms"] / 1000)
+                for stat in ("last", "max", "avg")
+            ],
+        )
+
+    return collect
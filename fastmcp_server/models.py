@@ -17,15 +17,19 @@ class ListToolsResponse(BaseModel):
     """Response model for list-tools."""
 
     tools: list[str]
+    next_cursor: str | None = None  # pass as ``cursor`` to fetch the next page
 class ToolStatus(BaseModel):
     """Tool model containing name and enabled state."""
     name: str
     enabled: bool
+    prefix: str | None = None  # only included when requested with ``fields``
+    description: str | None = None
 
 class ListToolsResponseEnable(BaseModel):
     """Response model for list-tools."""
 
     tools: list[ToolStatus]  # tool name and its enabled state
+    next_cursor: str | None = None
 
 
 class AddServerRequest(BaseModel):
@@ -34,6 +38,10 @@ class AddServerRequest(BaseModel):
     path: str
     apiBaseUrl: str
     prefix: str | None = None
+    http: dict | None = None  # connection pool and timeout settings
+    cache: dict | None = None  # GET response cache settings
+    single_flight: bool | dict | None = None  # coalescing of identical calls
+    limits: dict | None = None  # rate limits, in-flight cap and circuit breaker
 
 
 class AddServerResponse(BaseModel):
@@ -58,6 +66,36 @@ class ToolEnabledResponse(BaseModel):
     enabled: bool
 
 
+class BulkToolEnabledRequest(BaseModel):
+    """Request model for toggling many tools at once.
+
+    Either list ``items`` explicitly or select tools with ``prefix`` and/or a
+    glob ``pattern`` on tool names, in which case ``enabled`` is required.
+    """
+
+    items: list[ToolEnabledRequest] = []
+    prefix: str | None = None
+    pattern: str | None = None
+    enabled: bool | None = None
+
+
+class ToolEnabledResult(BaseModel):
+    """Outcome for one tool of a bulk toggle."""
+
+    prefix: str
+    tool: str
+    enabled: bool
+    status: str  # "updated", "unchanged" or "not_found"
+
+
+class BulkToolEnabledResponse(BaseModel):
+    """Response model for tools-enabled endpoint."""
+
+    results: list[ToolEnabledResult]
+    updated: int
+    ms: float
+
+
 class SearchEnabledRequest(BaseModel):
     """Request body for enabling/disabling search for a server."""
 
@@ -77,9 +115,42 @@ class SearchResult(BaseModel):
 
     prefix: str
     tool: str
+    enabled: bool | None = None
+    score: float | None = None  # relevance, only set for full-text queries
 
 
 class SearchResponse(BaseModel):
     """Response model for search endpoint."""
 
     results: list[SearchResult]
+    total: int | None = None  # number of matches before pagination
+    ms: float | None = None  # time spent answering the query
+
+
+class RetrievedTool(BaseModel):
+    """Tool returned by the retrieval endpoint."""
+
+    prefix: str
+    tool: str
+    score: float
+    description: str | None = None
+
+
+class RetrieveToolsResponse(BaseModel):
+    """Response model for retrieve-tools endpoint."""
+
+    tools: list[RetrievedTool]
+    session_url: str  # SSE URL exposing only these tools
+    ms: float
+
+
+class ReloadResponse(BaseModel):
+    """Outcome of a configuration reload."""
+
+    added: list[str]
+    removed: list[str]
+    changed: list[str]
+    unchanged: list[str]
+    failed: dict[str, str]  # prefix -> error; changed servers keep their old version
+    restart_required: list[str]  # changed sections that are only read on startup
+    duration_ms: float
@@ -0,0 +1,220 @@
+"""In-memory index of the tools exposed by the mounted servers."""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable, Iterator
+
+import numpy as np
+from fastmcp.tools import Tool
+
+from retrieval import DEFAULT_TOP_K, EmbeddingFunction, EmbeddingIndex
+from search_index import SearchIndex, tool_fields
+
+
+class _PrefixTools:
+    """Tools of one mounted server in registration order."""
+
+    __slots__ = ("names", "tools", "enabled", "positions")
+
+    def __init__(self, tools: dict[str, Tool]):
+        self.names: list[str] = list(tools)
+        self.tools: list[Tool] = list(tools.values())
+        self.enabled = bytearray(1 if tool.enabled else 0 for tool in self.tools)
+        self.positions: dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+
+class ToolRegistry:
+    """Per-prefix tool names, enabled flags and a global name index.
+
+    Tool names are stored as exposed by the root server (``prefix_tool``).
+    The registry is updated whenever a server is mounted or a tool is toggled,
+    so the list and search endpoints never need to call ``get_tools()``.
+    Lazily mounted servers are registered with a loader that is awaited by
+    :meth:`ensure` the first time their tools are needed.
+    """
+
+    def __init__(self, embed: EmbeddingFunction | None = None) -> None:
+        self._prefixes: dict[str, _PrefixTools | None] = {}
+        self._loaders: dict[str, Callable[[], Awaitable[object]]] = {}
+        self._index: dict[str, str] = {}
+        self.search_index = SearchIndex()
+        self.embedding_index = EmbeddingIndex(embed)
+        # Prefixes whose tools changed since they were last added to each index
+        self._unindexed: set[str] = set()
+        self._unembedded: set[str] = set()
+
+    def register(self, prefix: str, tools: dict[str, Tool]) -> None:
+        """Register (or refresh) the tools of a server keyed by sub-server name."""
+        self._drop_index(prefix)
+        entry = _PrefixTools({f"{prefix}_{key}": tool for key, tool in tools.items()})
+        self._prefixes[prefix] = entry
+        self._loaders.pop(prefix, None)
+        for name in entry.names:
+            self._index[name] = prefix
+        self._unindexed.add(prefix)
+        self._unembedded.add(prefix)
+
+    def register_lazy(self, prefix: str, loader: Callable[[], Awaitable[object]]) -> None:
+        """Register a prefix whose tools are only known once ``loader`` ran.
+
+        Also used to return an evicted lazy server to that state, so its tools
+        are dropped from the search and embedding indexes right away.
+        """
+        self._drop_index(prefix)
+        self._prefixes[prefix] = None
+        self._loaders[prefix] = loader
+        self._unindexed.discard(prefix)
+        self._unembedded.discard(prefix)
+        self.search_index.remove_prefix(prefix)
+        self.embedding_index.remove_prefix(prefix)
+
+    def remove(self, prefix: str) -> None:
+        """Forget everything known about ``prefix``."""
+        self._drop_index(prefix)
+        self._prefixes.pop(prefix, None)
+        self._loaders.pop(prefix, None)
+        self._unindexed.discard(prefix)
+        self._unembedded.discard(prefix)
+        self.search_index.remove_prefix(prefix)
+        self.embedding_index.remove_prefix(prefix)
+
+    def sync_search_index(self) -> None:
+        """Add prefixes registered since the last call to the search index."""
+        for prefix in list(self._unindexed):
+            entry = self._prefixes.get(prefix)
+            if entry is not None:
+                self.search_index.add_prefix(
+                    prefix,
+                    {name: tool_fields(name, tool) for name, tool in zip(entry.names, entry.tools)},
+                )
+            else:
+                self.search_index.remove_prefix(prefix)
+            self._unindexed.discard(prefix)
+
+    def sync_embedding_index(self) -> None:
+        """Embed the tools of prefixes registered since the last call."""
+        for prefix in list(self._unembedded):
+            entry = self._prefixes.get(prefix)
+            if entry is not None:
+                self.embedding_index.add_prefix(
+                    prefix,
+                    {
+                        name: " ".join(tool_fields(name, tool).values())
+                        for name, tool in zip(entry.names, entry.tools)
+                    },
+                )
+            else:
+                self.embedding_index.remove_prefix(prefix)
+            self._unembedded.discard(prefix)
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = DEFAULT_TOP_K,
+        prefixes: set[str] | None = None,
+        enabled_only: bool = True,
+    ) -> list[tuple[str, str, float]]:
+        """Return the ``k`` tools most similar to ``query`` as ``(name, prefix, score)``."""
+        self.sync_embedding_index()
+        mask = None
+        if enabled_only:
+            blocks = [self._prefixes[pre].enabled for pre in self.embedding_index.prefixes()]
+            if blocks:
+                mask = np.frombuffer(b"".join(blocks), dtype=np.uint8).astype(bool)
+        return self.embedding_index.query(query, k, prefixes, mask)
+
+    def _drop_index(self, prefix: str) -> None:
+        entry = self._prefixes.get(prefix)
+        if entry is not None:
+            for name in entry.names:
+                self._index.pop(name, None)
+
+    def has_prefix(self, prefix: str) -> bool:
+        return prefix in self._prefixes
+
+    def prefixes(self) -> list[str]:
+        return list(self._prefixes)
+
+    async def ensure(self, prefix: str | None = None) -> None:
+        """Run pending loaders for ``prefix`` (or every prefix)."""
+        pending = [prefix] if prefix is not None else list(self._loaders)
+        for pre in pending:
+            loader = self._loaders.get(pre)
+            if loader is not None:
+                await loader()
+
+    def _entries(self, prefix: str | None) -> list[_PrefixTools]:
+        if prefix is not None:
+            entry = self._prefixes.get(prefix)
+            return [entry] if entry is not None else []
+        return [entry for entry in self._prefixes.values() if entry is not None]
+
+    def names(self, prefix: str | None = None) -> list[str]:
+        """Return the tool names of ``prefix`` or of every loaded prefix."""
+        names: list[str] = []
+        for entry in self._entries(prefix):
+            names.extend(entry.names)
+        return names
+
+    def statuses(self, prefix: str | None = None) -> list[tuple[str, bool]]:
+        """Return ``(name, enabled)`` pairs for ``prefix`` or every loaded prefix."""
+        result: list[tuple[str, bool]] = []
+        for entry in self._entries(prefix):
+            result.extend(zip(entry.names, map(bool, entry.enabled)))
+        return result
+
+    def iter_statuses(
+        self,
+        prefix: str | None = None,
+        enabled: bool | None = None,
+        start: tuple[str, int] | None = None,
+    ) -> Iterator[tuple[str, int, str, bool]]:
+        """Yield ``(prefix, position, name, enabled)`` in registration order.
+
+        ``start`` resumes at a ``(prefix, position)`` pair; ``enabled`` keeps
+        only tools in that state. Rows are produced lazily so callers can stop
+        after a page without touching the rest of the catalog.
+        """
+        prefixes = [prefix] if prefix is not None else list(self._prefixes)
+        if start is not None:
+            if start[0] not in prefixes:
+                raise KeyError(start[0])
+            prefixes = prefixes[prefixes.index(start[0]) :]
+        for pre in prefixes:
+            entry = self._prefixes.get(pre)
+            if entry is None:
+                continue
+            begin = start[1] if start is not None and pre == start[0] else 0
+            flags = entry.enabled
+            for position in range(begin, len(entry.names)):
+                flag = bool(flags[position])
+                if enabled is None or flag == enabled:
+                    yield pre, position, entry.names[position], flag
+
+    def prefix_of(self, name: str) -> str | None:
+        """Return the prefix that owns the root-level tool ``name``."""
+        return self._index.get(name)
+
+    def get(self, prefix: str, name: str) -> Tool | None:
+        entry = self._prefixes.get(prefix)
+        if entry is None or name not in entry.positions:
+            return None
+        return entry.tools[entry.positions[name]]
+
+    def is_enabled(self, prefix: str, name: str) -> bool:
+        entry = self._prefixes[prefix]
+        return bool(entry.enabled[entry.positions[name]])
+
+    def set_enabled(self, prefix: str, name: str, enabled: bool) -> Tool:
+        """Toggle a tool and record its new state; raises ``KeyError`` if unknown."""
+        entry = self._prefixes.get(prefix)
+        if entry is None or name not in entry.positions:
+            raise KeyError(name)
+        position = entry.positions[name]
+        tool = entry.tools[position]
+        if enabled:
+            tool.enable()
+        else:
+            tool.disable()
+        entry.enabled[position] = 1 if enabled else 0
+        return tool
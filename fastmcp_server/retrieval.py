@@ -0,0 +1,201 @@
+"""Embedding-based tool retrieval and the MCP server that exposes its results."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+import numpy as np
+from fastmcp import FastMCP
+from fastmcp.exceptions import NotFoundError
+from fastmcp.server.dependencies import get_http_request
+from fastmcp.tools import Tool
+from fastmcp.utilities.types import MCPContent
+
+from search_index import tokenize
+
+if TYPE_CHECKING:
+    from registry import ToolRegistry
+
+EmbeddingFunction = Callable[[Sequence[str]], np.ndarray]
+
+DEFAULT_DIM = 512
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 200
+
+
+def hashing_embedding(texts: Sequence[str], dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Embed ``texts`` with a signed hashing vectorizer over words and word pairs.
+
+    The hash is stable across processes, so the vectors do not depend on
+    ``PYTHONHASHSEED`` and no model has to be downloaded.
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        terms = tokenize(text)
+        features = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+        for feature in features:
+            value = int.from_bytes(
+                hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+            )
+            matrix[row, value % dim] += 1.0 if value >> 63 else -1.0
+    return matrix
+
+
+def embedding_from_config(cfg: dict) -> EmbeddingFunction:
+    """Return the embedding function configured in ``cfg["retrieval"]``.
+
+    ``embedding`` may name any callable as ``"module:function"`` that maps a
+    list of texts to a 2-D array; the hashing vectorizer is used otherwise.
+    """
+    section = cfg.get("retrieval") or {}
+    target = section.get("embedding")
+    if not target:
+        return partial(hashing_embedding, dim=int(section.get("dim", DEFAULT_DIM)))
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingIndex:
+    """Unit-length tool vectors stored per prefix and stacked for queries."""
+
+    def __init__(self, embed: EmbeddingFunction | None = None):
+        self.embed = embed or hashing_embedding
+        self._blocks: dict[str, tuple[list[str], np.ndarray]] = {}
+        self._stacked: tuple[np.ndarray, list[str], np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return sum(len(names) for names, _ in self._blocks.values())
+
+    def prefixes(self) -> list[str]:
+        """Return the indexed prefixes in the row order of the stacked matrix."""
+        return list(self._blocks)
+
+    def add_prefix(self, prefix: str, docs: dict[str, str]) -> None:
+        """Embed ``docs`` (``{name: text}``) for ``prefix``, replacing old ones."""
+        self._blocks.pop(prefix, None)
+        names = list(docs)
+        if names:
+            self._blocks[prefix] = (names, _normalize(self.embed(list(docs.values()))))
+        self._stacked = None
+
+    def remove_prefix(self, prefix: str) -> None:
+        if self._blocks.pop(prefix, None) is not None:
+            self._stacked = None
+
+    def _stack(self) -> tuple[np.ndarray, list[str], np.ndarray]:
+        if self._stacked is None:
+            names: list[str] = []
+            owners: list[int] = []
+            for position, (block_names, _) in enumerate(self._blocks.values()):
+                names.extend(block_names)
+                owners.extend([position] * len(block_names))
+            if self._blocks:
+                matrix = np.vstack([vectors for _, vectors in self._blocks.values()])
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            self._stacked = (matrix, names, np.asarray(owners, dtype=np.int32))
+        return self._stacked
+
+    def query(
+        self,
+        text: str,
+        k: int = DEFAULT_TOP_K,
+        prefixes: set[str] | None = None,
+        mask: np.ndarray | None = None,
+    ) -> list[tuple[str, str, float]]:
+        """Return the ``k`` most similar ``(name, prefix, score)`` tuples.
+
+        ``mask`` is a boolean array over the rows of the stacked matrix (see
+        :meth:`prefixes` for their order); rows where it is false are skipped.
+        """
+        matrix, names, owners = self._stack()
+        if not names or k <= 0:
+            return []
+        scores = matrix @ _normalize(self.embed([text]))[0]
+        keep = np.ones(len(names), dtype=bool) if mask is None else mask.copy()
+        block_prefixes = self.prefixes()
+        if prefixes is not None:
+            wanted = [i for i, pre in enumerate(block_prefixes) if pre in prefixes]
+            keep &= np.isin(owners, wanted)
+        candidates = np.flatnonzero(keep)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(names[i], block_prefixes[owners[i]], float(scores[i])) for i in top]
+
+
+class RetrievalServer(FastMCP):
+    """MCP server exposing only the tools retrieved for the connecting session.
+
+    The selection is taken from the query string of the SSE connection:
+    ``tools`` lists root-level tool names explicitly, otherwise the top ``k``
+    enabled tools for the question in ``q`` are used. Calls are forwarded to
+    the root server.
+    """
+
+    def __init__(
+        self,
+        root_server: FastMCP,
+        registry: ToolRegistry,
+        name: str = "Tool retrieval",
+        default_k: int = DEFAULT_TOP_K,
+    ):
+        super().__init__(name=name)
+        self._root = root_server
+        self._registry = registry
+        self.default_k = default_k
+
+    def _top_k(self, value: str | None) -> int:
+        """``value`` as a tool count, ``default_k`` if it is not a positive integer."""
+        try:
+            k = int(value) if value is not None else self.default_k
+        except ValueError:
+            k = self.default_k
+        if k < 1:
+            k = self.default_k
+        return min(k, MAX_TOP_K)
+
+    async def _selected_names(self) -> list[str]:
+        try:
+            request = get_http_request()
+        except RuntimeError:
+            return []
+        cached = getattr(request.state, "retrieved_tools", None)
+        if cached is not None:
+            return cached
+        params = request.query_params
+        if params.get("tools"):
+            names = [name for name in params["tools"].split(",") if self._registry.prefix_of(name)]
+        elif params.get("q"):
+            await self._registry.ensure()
+            k = self._top_k(params.get("k"))
+            names = [name for name, _, _ in self._registry.retrieve(params["q"], k)]
+        else:
+            names = []
+        request.state.retrieved_tools = names
+        return names
+
+    async def get_tools(self) -> dict[str, Tool]:
+        tools: dict[str, Tool] = {}
+        for name in await self._selected_names():
+            tool = self._registry.get(self._registry.prefix_of(name), name)
+            if tool is not None:
+                tools[name] = tool
+        return tools
+
+    async def _call_tool(self, key: str, arguments: dict[str, Any]) -> list[MCPContent]:
+        if key not in await self._selected_names():
+            raise NotFoundError(f"Unknown tool: {key}")
+        return await self._root._call_tool(key, arguments)
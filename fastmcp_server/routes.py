@@ -1,19 +1,49 @@
 """Route handlers and shared state for the Swagger server."""
 
+import asyncio
+import base64
+import json
+import time
+from fnmatch import fnmatchcase
+from functools import partial
+from itertools import islice
+from typing import Iterator
+from urllib.parse import urlencode
+
 from fastapi import FastAPI, Query, Request, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
 import models
 from fastmcp import FastMCP
-from fastmcp.server.openapi import FastMCPOpenAPI
 import httpx
 from fastapi import Query
 from fastmcp import Client
 import db
-from utils.openapi_utils import _get_prefix, _load_spec
+from utils.cache_utils import SpecCache
+from utils.catalog_utils import CatalogStore, build_sub_server
+from lazy import lazy_server_for
+from metrics import PROMETHEUS_CONTENT_TYPE, Metrics
+from registry import ToolRegistry
+from retrieval import MAX_TOP_K
+from status_queue import StatusWriteQueue
+from sync import StateSync
+from transports import StreamableHTTPTransports
+from utils.http_utils import UpstreamClient, make_upstream_client
+from utils.openapi_utils import _get_prefix, _load_spec_async, close_spec_client
 
 # Runtime storage for loaded OpenAPI specs and their configs
 spec_data: dict[str, dict] = {}
 spec_configs: dict[str, dict] = {}
 search_status: dict[str, bool] = {}
+# Persisted tool states keyed by prefix and root-level tool name
+tool_statuses: dict[str, dict[str, bool]] = {}
+
+# Paging of the list endpoints
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+NDJSON_BATCH_SIZE = 256
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+TOOL_FIELDS = ("name", "enabled", "prefix", "description")
 
 
 HealthResponse = models.HealthResponse
@@ -40,11 +70,20 @@ ListToolsResponseEnable = models.ListToolsResponseEnable
 
 
 async def close_clients(
-    clients: list[httpx.AsyncClient], session_maker: db.async_sessionmaker
+    clients: list[httpx.AsyncClient],
+    session_maker: db.async_sessionmaker,
+    status_queue: StatusWriteQueue | None = None,
+    state_sync: StateSync | None = None,
 ) -> None:
     for client in clients:
         await client.aclose()
-    await session_maker.bind.dispose()
+    await close_spec_client()
+    if state_sync is not None:
+        await state_sync.close()
+    if status_queue is not None:
+        # drain queued tool states before the engine goes away
+        await status_queue.close()
+    await session_maker.kw["bind"].dispose()
 
 
 async def health() -> HealthResponse:
@@ -60,54 +99,345 @@ def make_list_servers_handler(server_info: list[tuple[str, int]]):
     return list_servers
 
 
-def make_list_tools_handler(root_server: FastMCP):
+def _int_param(
+    request: Request, name: str, default: int | None, minimum: int = 0
+) -> int | None:
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer") from None
+    if number < minimum:
+        if minimum == 0:
+            raise HTTPException(status_code=400, detail=f"{name} must not be negative")
+        raise HTTPException(status_code=400, detail=f"{name} must be at least {minimum}")
+    return number
+
+
+def _bool_param(request: Request, name: str) -> bool | None:
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return value.lower() in {"1", "true", "yes"}
+
+
+def _encode_cursor(prefix: str, position: int) -> str:
+    raw = json.dumps([prefix, position]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        prefix, position = json.loads(raw)
+        if not isinstance(prefix, str) or not isinstance(position, int):
+            raise ValueError(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor") from None
+    return prefix, position
+
+
+def _wants_ndjson(request: Request) -> bool:
+    if request.query_params.get("format") == "ndjson":
+        return True
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _tool_rows(
+    request: Request, registry: ToolRegistry
+) -> Iterator[tuple[str, int, str, bool]]:
+    """Validate the shared list parameters and return the matching rows lazily."""
+    prefix = request.query_params.get("prefix")
+    if prefix is not None and not registry.has_prefix(prefix):
+        raise HTTPException(status_code=404, detail="prefix not found")
+    cursor = request.query_params.get("cursor")
+    start = _decode_cursor(cursor) if cursor else None
+    if start is not None and (
+        not registry.has_prefix(start[0]) or (prefix is not None and start[0] != prefix)
+    ):
+        raise HTTPException(status_code=400, detail="cursor no longer valid")
+    await registry.ensure(prefix)
+    return registry.iter_statuses(prefix, _bool_param(request, "enabled"), start)
+
+
+def _tool_fields(request: Request, default: tuple[str, ...]) -> tuple[str, ...]:
+    value = request.query_params.get("fields")
+    if not value:
+        return default
+    fields = tuple(field.strip() for field in value.split(",") if field.strip())
+    unknown = set(fields) - set(TOOL_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields: {sorted(unknown)}")
+    return fields
+
+
+def _tool_row(
+    registry: ToolRegistry, fields: tuple[str, ...], prefix: str, name: str, enabled: bool
+) -> dict:
+    row: dict = {}
+    for field in fields:
+        if field == "name":
+            row["name"] = name
+        elif field == "enabled":
+            row["enabled"] = enabled
+        elif field == "prefix":
+            row["prefix"] = prefix
+        elif field == "description":
+            row["description"] = registry.get(prefix, name).description
+    return row
+
+
+def _take_page(
+    rows: Iterator[tuple[str, int, str, bool]], limit: int
+) -> tuple[list[tuple[str, int, str, bool]], str | None]:
+    page = list(islice(rows, limit + 1))
+    if len(page) <= limit:
+        return page, None
+    prefix, position, _, _ = page[limit]
+    return page[:limit], _encode_cursor(prefix, position)
+
+
+def _ndjson_response(
+    rows: Iterator[tuple[str, int, str, bool]],
+    registry: ToolRegistry,
+    fields: tuple[str, ...],
+    limit: int | None,
+) -> StreamingResponse:
+    """Stream one JSON object per line, flushed in small batches.
+
+    When ``limit`` rows were written and more remain, a final
+    ``{"next_cursor": ...}`` line is emitted.
+    """
+
+    async def body():
+        batch: list[str] = []
+        written = 0
+        for prefix, position, name, enabled in rows:
+            if limit is not None and written == limit:
+                batch.append(json.dumps({"next_cursor": _encode_cursor(prefix, position)}))
+                break
+            batch.append(json.dumps(_tool_row(registry, fields, prefix, name, enabled)))
+            written += 1
+            if len(batch) >= NDJSON_BATCH_SIZE:
+                yield "\n".join(batch) + "\n"
+                batch = []
+                await asyncio.sleep(0)
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def make_list_tools_handler(registry: ToolRegistry):
     """Return a handler that lists available tools.
 
     If a ``prefix`` query parameter is provided only tools for that
     mounted server are returned. Otherwise all tools registered on the
-    root server are listed.
+    root server are listed. Results are paged with ``limit`` and the
+    ``next_cursor`` of the previous page, and can be streamed as NDJSON.
     """
 
     async def list_tools(request: Request) -> ListToolsResponse:
         """List tools for the given prefix or all servers."""
-        prefix = request.query_params.get("prefix")
-        server = root_server if prefix is None else root_server._mounted_servers.get(prefix)
-        if server is None:
-            raise HTTPException(status_code=404, detail="prefix not found")
-
-        tools = await server.get_tools()
-        print(tools)
-            
-        
-        return ListToolsResponse(tools=list(tools))
+        rows = await _tool_rows(request, registry)
+        if _wants_ndjson(request):
+            limit = _int_param(request, "limit", None)
+            return _ndjson_response(rows, registry, _tool_fields(request, ("name",)), limit)
+        # an empty page would point its cursor back at itself
+        limit = min(_int_param(request, "limit", DEFAULT_PAGE_SIZE, minimum=1), MAX_PAGE_SIZE)
+        page, next_cursor = _take_page(rows, limit)
+        # Build the body directly instead of validating a model per page
+        return JSONResponse(
+            {"tools": [name for _, _, name, _ in page], "next_cursor": next_cursor}
+        )
 
     return list_tools
 
-def make_list_tools_handler2(root_server: FastMCP):
+def make_list_tools_handler2(registry: ToolRegistry):
     """Return a handler that lists available tools.
 
     If a ``prefix`` query parameter is provided only tools for that
     mounted server are returned. Otherwise all tools registered on the
-    root server are listed.
+    root server are listed. Accepts the same paging, ``enabled`` and
+    NDJSON options as ``/list-tools``; ``fields`` picks the keys of each row.
     """
 
     async def list_tools(request: Request) -> ListToolsResponseEnable:
         """List tools for the given prefix or all servers."""
-        prefix = request.query_params.get("prefix")
-        server = root_server if prefix is None else root_server._mounted_servers.get(prefix)
-        if server is None:
-            raise HTTPException(status_code=404, detail="prefix not found")
+        rows = await _tool_rows(request, registry)
+        fields = _tool_fields(request, ("name", "enabled"))
+        if _wants_ndjson(request):
+            limit = _int_param(request, "limit", None)
+            return _ndjson_response(rows, registry, fields, limit)
+        # an empty page would point its cursor back at itself
+        limit = min(_int_param(request, "limit", DEFAULT_PAGE_SIZE, minimum=1), MAX_PAGE_SIZE)
+        page, next_cursor = _take_page(rows, limit)
+        tools = [
+            _tool_row(registry, fields, prefix, name, enabled)
+            for prefix, _, name, enabled in page
+        ]
+        return JSONResponse({"tools": tools, "next_cursor": next_cursor})
 
-        tools = await server.get_tools()
-        
-        results: list[models.ToolStatus] = []
-        for tool_name, tool in tools.items():
-            results.append(models.ToolStatus(name=tool_name, enabled=tool.enabled))
+    return list_tools
 
-        return ListToolsResponseEnable(tools=results)
 
-    return list_tools
+def apply_tool_statuses(prefix: str, tools: dict) -> None:
+    """Enable or disable ``tools`` of one sub-server from :data:`tool_statuses`."""
+    for name, enabled in tool_statuses.get(prefix, {}).items():
+        # /tool-enabled stores the name as exposed by the root server
+        tool = tools.get(name.removeprefix(f"{prefix}_")) or tools.get(name)
+        if tool is None:
+            continue
+        if enabled:
+            tool.enable()
+        else:
+            tool.disable()
+
+
+def tool_status_loader(prefix: str, registry: ToolRegistry):
+    """Return an ``on_build`` hook applying the stored tool state for ``prefix``."""
 
+    async def apply(sub_server: FastMCP) -> None:
+        tools = await sub_server.get_tools()
+        apply_tool_statuses(prefix, tools)
+        registry.register(prefix, tools)
+
+    return apply
+
+
+async def mount_spec(
+    spec_cfg: dict,
+    root_server: FastMCP,
+    app: FastAPI,
+    server_info: list[tuple[str, int]],
+    clients: list[httpx.AsyncClient],
+    cfg: dict,
+    spec_cache: SpecCache | None = None,
+    catalog: CatalogStore | None = None,
+    registry: ToolRegistry | None = None,
+) -> int:
+    """Load ``spec_cfg`` and mount its tools; return the number of tools.
+
+    Load errors propagate as ``httpx.HTTPError``, ``ValueError`` or ``OSError``.
+    """
+    prefix = _get_prefix(spec_cfg)
+    loaded_spec = await _load_spec_async(spec_cfg, spec_cache)
+    client = make_upstream_client(
+        spec_cfg, prefix, cfg.get("http"), loaded_spec, getattr(app.state, "tracer", None)
+    )
+    try:
+        sub_server = lazy_server_for(spec_cfg, loaded_spec, client, catalog, cfg.get("startup"))
+    except BaseException:
+        await client.aclose()
+        raise
+    if sub_server is not None:
+        tool_count = sub_server.operation_count
+        if registry is not None:
+            sub_server.on_build = tool_status_loader(prefix, registry)
+            sub_server.on_evict = partial(registry.register_lazy, prefix, sub_server.materialize)
+            registry.register_lazy(prefix, sub_server.materialize)
+        app.state.lazy_servers = getattr(app.state, "lazy_servers", [])
+        app.state.lazy_servers.append(sub_server)
+    else:
+        try:
+            # Building the tools for a large spec is CPU heavy, keep it off the loop
+            sub_server = await asyncio.to_thread(
+                build_sub_server,
+                loaded_spec,
+                client,
+                f"{spec_cfg.get('prefix', 'api')} server",
+                catalog,
+            )
+            tools = await sub_server.get_tools()
+        except BaseException:
+            await client.aclose()
+            raise
+        tool_count = len(tools)
+        apply_tool_statuses(prefix, tools)
+        if registry is not None:
+            registry.register(prefix, tools)
+    spec_data[prefix] = loaded_spec
+    spec_configs[prefix] = spec_cfg
+
+    instrument_sub_server(app, prefix, sub_server)
+    root_server.mount(prefix, sub_server)
+    mount_server_apps(app, prefix, sub_server)
+
+    server_info.append((prefix, tool_count))
+    clients.append(client)
+    cfg.setdefault("swagger", []).append(spec_cfg)
+    return tool_count
+
+
+async def unmount_spec(
+    prefix: str,
+    root_server: FastMCP,
+    app: FastAPI,
+    server_info: list[tuple[str, int]],
+    clients: list[httpx.AsyncClient],
+    cfg: dict,
+    registry: ToolRegistry | None = None,
+) -> None:
+    """Undo :func:`mount_spec` for ``prefix`` and close its upstream client."""
+    if prefix in root_server._mounted_servers:
+        mounted = root_server._mounted_servers[prefix].server
+        lazy_servers = getattr(app.state, "lazy_servers", [])
+        lazy_servers[:] = [server for server in lazy_servers if server is not mounted]
+        root_server.unmount(prefix)
+    await unmount_server_apps(app, prefix)
+    if registry is not None:
+        registry.remove(prefix)
+    spec_data.pop(prefix, None)
+    spec_configs.pop(prefix, None)
+    server_info[:] = [(p, count) for p, count in server_info if p != prefix]
+    cfg["swagger"] = [s for s in cfg.get("swagger", []) if _get_prefix(s) != prefix]
+    for client in [c for c in clients if getattr(c, "prefix", None) == prefix]:
+        clients.remove(client)
+        await client.aclose()
+
+
+def instrument_sub_server(app: FastAPI, prefix: str, sub_server: FastMCP) -> None:
+    """Apply the app's metrics and tracing to the tool calls of ``sub_server``."""
+    metrics = getattr(app.state, "metrics", None)
+    if metrics is not None:
+        metrics.instrument_server(sub_server, prefix)
+    tracer = getattr(app.state, "tracer", None)
+    if tracer is not None:
+        tracer.instrument_server(sub_server, prefix)
+
+
+def mount_server_apps(app: FastAPI, prefix: str, sub_server: FastMCP) -> None:
+    """Serve ``sub_server`` under ``/prefix``, ahead of the root catch-all mount.
+
+    SSE is served under ``/prefix/sse`` and, unless disabled, streamable
+    HTTP at ``/prefix`` plus the configured path (``/prefix/mcp``).
+    """
+    routes = app.router.routes
+    position = next(
+        (i for i, route in enumerate(routes) if isinstance(route, Mount) and route.path == ""),
+        len(routes),
+    )
+    routes.insert(position, Mount(f"/{prefix}", app=sub_server.sse_app()))
+    transports = getattr(app.state, "http_transports", None)
+    if transports is not None:
+        # ahead of the /prefix mount, which would swallow the path
+        endpoint = transports.add(prefix, sub_server)
+        routes.insert(position, Route(f"/{prefix}{transports.path}", endpoint=endpoint))
+
+
+async def unmount_server_apps(app: FastAPI, prefix: str) -> None:
+    transports = getattr(app.state, "http_transports", None)
+    http_path = f"/{prefix}{transports.path}" if transports is not None else None
+    app.router.routes[:] = [
+        route
+        for route in app.router.routes
+        if not (isinstance(route, Mount) and route.path == f"/{prefix}")
+        and not (isinstance(route, Route) and route.path == http_path)
+    ]
+    if transports is not None:
+        await transports.remove(prefix)
 
 
 def make_add_server_handler(
@@ -117,6 +447,10 @@ def make_add_server_handler(
     clients: list[httpx.AsyncClient],
     cfg: dict,
     session_maker: db.async_sessionmaker,
+    spec_cache: SpecCache | None = None,
+    catalog: CatalogStore | None = None,
+    registry: ToolRegistry | None = None,
+    state_sync: StateSync | None = None,
 ):
     async def add_server(spec: AddServerRequest) -> AddServerResponse:
         """Dynamically mount a new Swagger specification."""
@@ -127,30 +461,16 @@ def make_add_server_handler(
             raise HTTPException(status_code=400, detail="prefix already exists")
 
         try:
-            loaded_spec = _load_spec(spec_cfg)
-        except (httpx.HTTPError, ValueError) as exc:
+            tool_count = await mount_spec(
+                spec_cfg, root_server, app, server_info, clients, cfg, spec_cache, catalog, registry
+            )
+        except (httpx.HTTPError, ValueError, OSError) as exc:
             raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-        client = httpx.AsyncClient(base_url=spec_cfg["apiBaseUrl"])
-        sub_server = FastMCPOpenAPI(
-            openapi_spec=loaded_spec,
-            client=client,
-            name=f"{spec_cfg.get('prefix', 'api')} server",
-        )
-        spec_data[prefix] = spec.model_dump()
-        spec_configs[prefix] = spec_cfg
-
-        tool_count = len(await sub_server.get_tools())
-
-        root_server.mount(prefix, sub_server)
-        app.mount(f"/{prefix}", sub_server.sse_app())
-
-        server_info.append((prefix, tool_count))
-        clients.append(client)
-        cfg.setdefault("swagger", []).append(spec_cfg)
-
         async with session_maker() as session:
             await db.add_spec(session, spec_cfg)
+        if state_sync is not None:
+            await state_sync.publish("server", prefix, spec_cfg)
 
         return AddServerResponse(added=prefix, tools=tool_count)
 
@@ -165,7 +485,10 @@ async def export_server(prefix: str, _: Request) -> dict:
 
 
 def make_set_tool_enabled_handler(
-    root_server: FastMCP, session_maker: db.async_sessionmaker
+    registry: ToolRegistry,
+    session_maker: db.async_sessionmaker,
+    status_queue: StatusWriteQueue | None = None,
+    state_sync: StateSync | None = None,
 ):
     async def set_tool_enabled(data: ToolEnabledRequest) -> ToolEnabledResponse:
         """Enable or disable a specific tool by prefix and name."""
@@ -174,65 +497,314 @@ def make_set_tool_enabled_handler(
         enabled = data.enabled
         if not prefix or not name:
             raise HTTPException(status_code=400, detail="prefix and name required")
-        server = root_server._mounted_servers.get(prefix)
-        if server is None:
+        if not registry.has_prefix(prefix):
             raise HTTPException(status_code=404, detail="prefix not found")
-        tools = await server.get_tools()
-        if name not in tools:
+        await registry.ensure(prefix)
+        if registry.get(prefix, name) is None:
             raise HTTPException(status_code=404, detail="tool not found")
-        tool = tools[name]
-        if enabled:
-            tool.enable()
-            # check = await tool.enabled
-        else:
-            tool.disable()
-        async with session_maker() as session:
-            await db.set_tool_enabled(session, prefix, name, bool(enabled))
+        previous = registry.is_enabled(prefix, name)
+        registry.set_enabled(prefix, name, bool(enabled))
+        try:
+            if status_queue is not None:
+                status_queue.put(prefix, name, bool(enabled))
+            else:
+                async with session_maker() as session:
+                    await db.set_tool_enabled(session, prefix, name, bool(enabled))
+        except Exception:
+            # keep memory consistent with the database if the write failed
+            registry.set_enabled(prefix, name, previous)
+            raise
+        tool_statuses.setdefault(prefix, {})[name] = bool(enabled)
+        if state_sync is not None:
+            await state_sync.publish("tools", prefix, {"tools": [[name, bool(enabled)]]})
         return ToolEnabledResponse(tool=name, enabled=bool(enabled))
 
     return set_tool_enabled
 
 
-def make_set_search_enabled_handler():
+def make_bulk_tool_enabled_handler(
+    registry: ToolRegistry,
+    session_maker: db.async_sessionmaker,
+    status_queue: StatusWriteQueue | None = None,
+    state_sync: StateSync | None = None,
+):
+    async def set_tools_enabled(
+        data: models.BulkToolEnabledRequest,
+    ) -> models.BulkToolEnabledResponse:
+        """Enable or disable many tools and persist them in one transaction."""
+        started = time.perf_counter()
+        selector = data.prefix is not None or data.pattern is not None
+        if selector and data.enabled is None:
+            raise HTTPException(status_code=400, detail="enabled required with a selector")
+        if not selector and not data.items:
+            raise HTTPException(status_code=400, detail="items or a selector required")
+        if data.prefix is not None and not registry.has_prefix(data.prefix):
+            raise HTTPException(status_code=404, detail="prefix not found")
+
+        targets = [(item.prefix, item.name, bool(item.enabled)) for item in data.items]
+        if selector:
+            await registry.ensure(data.prefix)
+            pattern = data.pattern or "*"
+            targets.extend(
+                (pre, name, bool(data.enabled))
+                for pre, _, name, _ in registry.iter_statuses(data.prefix)
+                if fnmatchcase(name, pattern)
+            )
+
+        results: list[models.ToolEnabledResult] = []
+        changed: dict[tuple[str, str], bool] = {}
+        previous: dict[tuple[str, str], bool] = {}
+        for prefix, name, enabled in targets:
+            if registry.has_prefix(prefix):
+                await registry.ensure(prefix)
+            if registry.get(prefix, name) is None:
+                results.append(
+                    models.ToolEnabledResult(prefix=prefix, tool=name, enabled=enabled, status="not_found")
+                )
+                continue
+            current = registry.is_enabled(prefix, name)
+            if current == enabled:
+                status = "unchanged"
+            else:
+                previous.setdefault((prefix, name), current)
+                registry.set_enabled(prefix, name, enabled)
+                changed[(prefix, name)] = enabled
+                status = "updated"
+            results.append(
+                models.ToolEnabledResult(prefix=prefix, tool=name, enabled=enabled, status=status)
+            )
+
+        try:
+            if status_queue is not None:
+                for (pre, name), enabled in changed.items():
+                    status_queue.put(pre, name, enabled)
+            else:
+                async with session_maker() as session:
+                    await db.set_tools_enabled(
+                        session, [(pre, name, enabled) for (pre, name), enabled in changed.items()]
+                    )
+        except Exception:
+            # keep memory consistent with the database if the transaction failed
+            for (pre, name), enabled in previous.items():
+                registry.set_enabled(pre, name, enabled)
+            raise
+        by_prefix: dict[str, list] = {}
+        for (pre, name), enabled in changed.items():
+            tool_statuses.setdefault(pre, {})[name] = enabled
+            by_prefix.setdefault(pre, []).append([name, enabled])
+        if state_sync is not None:
+            for pre, items in by_prefix.items():
+                await state_sync.publish("tools", pre, {"tools": items})
+
+        ms = round((time.perf_counter() - started) * 1000, 3)
+        return models.BulkToolEnabledResponse(
+            results=results, updated=sum(r.status == "updated" for r in results), ms=ms
+        )
+
+    return set_tools_enabled
+
+
+def _client_stats(clients: list[httpx.AsyncClient], prefix: str | None, stats_of) -> dict:
+    stats = {
+        client.prefix: stats_of(client)
+        for client in clients
+        if isinstance(client, UpstreamClient)
+    }
+    if prefix is None:
+        return stats
+    if prefix not in stats:
+        raise HTTPException(status_code=404, detail="prefix not found")
+    return {prefix: stats[prefix]}
+
+
+def make_pool_stats_handler(clients: list[httpx.AsyncClient]):
+    async def pool_stats(prefix: str | None = None) -> dict:
+        """Return connection pool statistics of the upstream clients by prefix."""
+        return _client_stats(clients, prefix, UpstreamClient.pool_stats)
+
+    return pool_stats
+
+
+def make_cache_stats_handler(clients: list[httpx.AsyncClient]):
+    async def cache_stats(prefix: str | None = None) -> dict:
+        """Return response cache counters by prefix (``null`` if caching is off)."""
+        return _client_stats(clients, prefix, UpstreamClient.cache_stats)
+
+    return cache_stats
+
+
+def make_reload_handler(reloader):
+    async def reload_config(request: Request) -> models.ReloadResponse:
+        """Re-read the config (or apply the posted one) and remount changed servers."""
+        body = await request.body()
+        try:
+            new_cfg = json.loads(body) if body.strip() else None
+            report = await reloader.reload(new_cfg)
+        except (ValueError, OSError) as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return models.ReloadResponse(**report)
+
+    return reload_config
+
+
+def make_last_reload_handler(reloader):
+    async def last_reload() -> models.ReloadResponse:
+        """Return the report of the most recent reload."""
+        if reloader.last_report is None:
+            raise HTTPException(status_code=404, detail="no reload yet")
+        return models.ReloadResponse(**reloader.last_report)
+
+    return last_reload
+
+
+def make_sync_handler(state_sync: StateSync | None):
+    async def sync_metrics() -> dict:
+        """Return the state of the cross-worker change feed."""
+        if state_sync is None:
+            return {"enabled": False}
+        return {"enabled": True, **state_sync.metrics()}
+
+    return sync_metrics
+
+
+def make_metrics_handler(metrics: Metrics):
+    async def metrics_text() -> PlainTextResponse:
+        """Return all metrics in the Prometheus text exposition format."""
+        return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    return metrics_text
+
+
+def make_transports_handler(transports: StreamableHTTPTransports | None):
+    async def transports_stats() -> dict:
+        """Return the streamable HTTP session model and sessions per server."""
+        if transports is None:
+            return {"streamable_http": None}
+        return {"streamable_http": transports.stats()}
+
+    return transports_stats
+
+
+def make_status_queue_handler(status_queue: StatusWriteQueue | None):
+    async def status_queue_metrics() -> dict:
+        """Return depth and flush statistics of the write-behind queue."""
+        if status_queue is None:
+            return {"enabled": False}
+        return {"enabled": True, **status_queue.metrics()}
+
+    return status_queue_metrics
+
+
+def make_set_search_enabled_handler(
+    session_maker: db.async_sessionmaker | None = None,
+    state_sync: StateSync | None = None,
+):
     async def set_search_enabled(data: models.SearchEnabledRequest) -> models.SearchEnabledResponse:
         """Enable or disable search for a server."""
         prefix = data.prefix
         if prefix not in spec_data:
             raise HTTPException(status_code=404, detail="prefix not found")
         search_status[prefix] = bool(data.enabled)
+        if session_maker is not None:
+            async with session_maker() as session:
+                await db.set_search_enabled(session, prefix, bool(data.enabled))
+        if state_sync is not None:
+            await state_sync.publish("search", prefix, {"enabled": bool(data.enabled)})
         return models.SearchEnabledResponse(prefix=prefix, enabled=bool(data.enabled))
 
     return set_search_enabled
 
 
-def make_search_handler(root_server: FastMCP):
+def make_search_handler(registry: ToolRegistry):
     async def search(request: Request) -> models.SearchResponse:
-        """Search tools with optional filters."""
+        """Search tools with optional filters.
+
+        ``q`` runs a ranked full-text query over tool names, descriptions,
+        tags, HTTP paths and parameter names. ``name`` keeps the plain
+        case-insensitive substring filter on tool names. Results can be
+        paged with ``limit`` and ``offset``.
+        """
+        started = time.perf_counter()
         prefix = request.query_params.get("prefix")
         name_filter = request.query_params.get("name")
-        enabled_param = request.query_params.get("enabled")
-        enabled_filter: bool | None = None
-        if enabled_param is not None:
-            enabled_filter = enabled_param.lower() in {"1", "true", "yes"}
+        query = request.query_params.get("q")
+        fuzzy = request.query_params.get("fuzzy", "true").lower() in {"1", "true", "yes"}
+        limit = _int_param(request, "limit", None)
+        offset = _int_param(request, "offset", 0)
+        enabled_filter = _bool_param(request, "enabled")
 
-        prefixes = [prefix] if prefix else list(root_server._mounted_servers.keys())
-        results: list[models.SearchResult] = []
+        if prefix and not registry.has_prefix(prefix):
+            raise HTTPException(status_code=404, detail="prefix not found")
+        prefixes = [
+            pre
+            for pre in ([prefix] if prefix else registry.prefixes())
+            if enabled_filter is None or search_status.get(pre, True) == enabled_filter
+        ]
         for pre in prefixes:
-            server = root_server._mounted_servers.get(pre)
-            if server is None:
-                raise HTTPException(status_code=404, detail="prefix not found")
-            if enabled_filter is not None and search_status.get(pre, True) != enabled_filter:
-                continue
-            tools = await server.get_tools()
-            for tool_name in tools:
-                if name_filter and name_filter.lower() not in tool_name.lower():
-                    continue
-                results.append(models.SearchResult(prefix=pre, tool=tool_name))
-
-        return models.SearchResponse(results=results)
+            await registry.ensure(pre)
+        needle = name_filter.lower() if name_filter else None
+
+        hits: list[tuple[str, str, float | None]] = []
+        if query:
+            registry.sync_search_index()
+            # page in the index unless the name filter has to drop hits first
+            page = limit if needle is None else None
+            total, ranked = registry.search_index.search(
+                query, set(prefixes), limit=page, offset=offset if page is not None else 0, fuzzy=fuzzy
+            )
+            hits.extend(ranked)
+        else:
+            for pre in prefixes:
+                hits.extend((tool_name, pre, None) for tool_name in registry.names(pre))
+
+        if needle is not None:
+            hits = [hit for hit in hits if needle in hit[0].lower()]
+        if not query or needle is not None:
+            total = len(hits)
+            hits = hits[offset:] if limit is None else hits[offset : offset + limit]
+
+        results = [
+            models.SearchResult(
+                prefix=pre,
+                tool=tool_name,
+                enabled=registry.is_enabled(pre, tool_name),
+                score=round(score, 4) if score is not None else None,
+            )
+            for tool_name, pre, score in hits
+        ]
+        ms = round((time.perf_counter() - started) * 1000, 3)
+        return models.SearchResponse(results=results, total=total, ms=ms)
 
     return search
 
+def make_retrieve_tools_handler(registry: ToolRegistry, default_k: int):
+    async def retrieve_tools(
+        q: str,
+        k: int = Query(default_k, ge=1, le=MAX_TOP_K),
+        prefix: str | None = None,
+    ) -> models.RetrieveToolsResponse:
+        """Return the enabled tools most relevant to the question ``q``."""
+        started = time.perf_counter()
+        if prefix and not registry.has_prefix(prefix):
+            raise HTTPException(status_code=404, detail="prefix not found")
+        await registry.ensure(prefix)
+        hits = registry.retrieve(q, k, {prefix} if prefix else None)
+        tools = [
+            models.RetrievedTool(
+                prefix=pre,
+                tool=name,
+                score=round(score, 4),
+                description=registry.get(pre, name).description,
+            )
+            for name, pre, score in hits
+        ]
+        session_url = "/retrieval/sse?" + urlencode({"tools": ",".join(t.tool for t in tools)})
+        ms = round((time.perf_counter() - started) * 1000, 3)
+        return models.RetrieveToolsResponse(tools=tools, session_url=session_url, ms=ms)
+
+    return retrieve_tools
+
+
 def make_external_tools_handler():
     async def external_tools(api_base_url: str = Query(..., description="API base URL")):
         async with Client(api_base_url) as client:
@@ -0,0 +1,184 @@
+"""Full-text search over tool metadata with BM25 ranking and fuzzy matching."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from collections import Counter
+
+from fastmcp.tools import Tool
+
+_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Relative weight of a term occurrence in each field of a tool
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "path": 1.5,
+    "params": 1.5,
+    "description": 1.0,
+}
+
+FUZZY_MIN_SIMILARITY = 0.4
+FUZZY_MAX_EXPANSIONS = 5
+FUZZY_PENALTY = 0.7
+
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Split ``text`` into lower-case terms, breaking camelCase and snake_case."""
+    return [_stem(t.lower()) for t in _TOKEN_RE.findall(text)]
+
+
+def _trigrams(term: str) -> set[str]:
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def tool_fields(name: str, tool: Tool) -> dict[str, str]:
+    """Collect the searchable text of ``tool`` registered as ``name``."""
+    fields = {
+        "name": name,
+        "description": tool.description or "",
+        "tags": " ".join(sorted(tool.tags)),
+        "params": " ".join((tool.parameters or {}).get("properties", {})),
+    }
+    route = getattr(tool, "_route", None)
+    if route is not None:
+        fields["path"] = f"{route.method} {route.path}"
+    return fields
+
+
+class SearchIndex:
+    """Incremental inverted index of tools, grouped by prefix.
+
+    Documents are keyed by root-level tool name. Term frequencies are
+    weighted per field (BM25F style) and scored with BM25. Query terms that
+    are not in the vocabulary, or are misspelt, are expanded to similar
+    vocabulary terms through a trigram index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, float]] = {}
+        self._doc_len: dict[str, float] = {}
+        self._doc_prefix: dict[str, str] = {}
+        self._prefix_docs: dict[str, list[str]] = {}
+        self._trigram_terms: dict[str, set[str]] = {}
+        self._total_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add_prefix(self, prefix: str, docs: dict[str, dict[str, str]]) -> None:
+        """Index ``docs`` (``{name: fields}``) for ``prefix``, replacing old ones."""
+        self.remove_prefix(prefix)
+        self._prefix_docs[prefix] = list(docs)
+        for name, fields in docs.items():
+            weighted: Counter[str] = Counter()
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS.get(field, 1.0)
+                for term in tokenize(text):
+                    weighted[term] += weight
+            length = sum(weighted.values())
+            self._doc_len[name] = length
+            self._doc_prefix[name] = prefix
+            self._total_len += length
+            for term, tf in weighted.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    for gram in _trigrams(term):
+                        self._trigram_terms.setdefault(gram, set()).add(term)
+                postings[name] = tf
+
+    def remove_prefix(self, prefix: str) -> None:
+        """Drop every document indexed for ``prefix``."""
+        names = self._prefix_docs.pop(prefix, None)
+        if not names:
+            return
+        removed = set(names)
+        for name in names:
+            self._total_len -= self._doc_len.pop(name, 0.0)
+            self._doc_prefix.pop(name, None)
+        for term in list(self._postings):
+            postings = self._postings[term]
+            for name in removed.intersection(postings):
+                del postings[name]
+            if not postings:
+                del self._postings[term]
+                for gram in _trigrams(term):
+                    terms = self._trigram_terms.get(gram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self._trigram_terms[gram]
+
+    def _expand(self, term: str, fuzzy: bool) -> list[tuple[str, float]]:
+        """Return vocabulary terms matching ``term`` with their weights."""
+        matches: list[tuple[str, float]] = []
+        if term in self._postings:
+            matches.append((term, 1.0))
+        if not fuzzy:
+            return matches
+        grams = _trigrams(term)
+        shared: Counter[str] = Counter()
+        for gram in grams:
+            shared.update(self._trigram_terms.get(gram, ()))
+        candidates = []
+        for candidate, common in shared.items():
+            if candidate == term:
+                continue
+            similarity = common / (len(grams) + len(_trigrams(candidate)) - common)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                candidates.append((similarity, candidate))
+        for similarity, candidate in heapq.nlargest(FUZZY_MAX_EXPANSIONS, candidates):
+            matches.append((candidate, similarity * FUZZY_PENALTY))
+        return matches
+
+    def search(
+        self,
+        query: str,
+        prefixes: set[str] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        fuzzy: bool = True,
+    ) -> tuple[int, list[tuple[str, str, float]]]:
+        """Rank documents for ``query``.
+
+        Returns the total number of matches and one page of
+        ``(name, prefix, score)`` tuples ordered by descending score.
+        """
+        n_docs = len(self._doc_len)
+        if not n_docs:
+            return 0, []
+        avg_len = self._total_len / n_docs or 1.0
+        scores: dict[str, float] = {}
+        for term in dict.fromkeys(tokenize(query)):
+            for match, weight in self._expand(term, fuzzy):
+                postings = self._postings[match]
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for name, tf in postings.items():
+                    if prefixes is not None and self._doc_prefix[name] not in prefixes:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[name] / avg_len)
+                    score = weight * idf * tf * (self.k1 + 1) / (tf + norm)
+                    scores[name] = scores.get(name, 0.0) + score
+
+        total = len(scores)
+
+        def order(item: tuple[str, float]) -> tuple[float, str]:
+            return -item[1], item[0]
+
+        if limit is not None:
+            page = heapq.nsmallest(offset + limit, scores.items(), key=order)[offset:]
+        else:
+            page = sorted(scores.items(), key=order)[offset:]
+        return total, [(name, self._doc_prefix[name], score) for name, score in page]
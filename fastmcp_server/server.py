@@ -1,12 +1,13 @@
 """FastMCP server exposing OpenAPI specs as MCP tools."""
 
+import argparse
 import asyncio
 import logging
 import os
-import sys
 from functools import partial
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastmcp import FastMCP
 from fastmcp.server.openapi import FastMCPOpenAPI
 import httpx
@@ -15,25 +16,86 @@ import uvicorn
 import db
 
 import routes, models
-
+from hot_reload import DEFAULT_WATCH_INTERVAL, ConfigReloader
+from lazy import LazyOpenAPIServer, evict_idle_servers, lazy_server_for
+from metrics import (
+    Metrics,
+    MetricsMiddleware,
+    startup_collector,
+    status_queue_collector,
+    upstream_collector,
+)
+from registry import ToolRegistry
+from retrieval import DEFAULT_TOP_K, RetrievalServer, embedding_from_config
+import retrieval  # expose for tests
+from status_queue import status_queue_from_config
+from tracing import Tracer, TracingMiddleware, tracer_from_config
+from transports import streamable_http_from_config
+from workers import serve_workers
+from sync import StateSync, state_sync_from_config
+
+from utils.cache_utils import SpecCache, spec_cache_from_config
+from utils.catalog_utils import CatalogStore, build_sub_server, catalog_from_config
 from utils.config_utils import DEFAULT_CONFIG, export_config, load_config
 from utils.db_utils import (
-    load_config_from_postgres,
-    save_config_to_postgres,
+    connect_with_retries,
+    load_config_from_db,
+    save_config_to_db,
 )
-from utils.openapi_utils import _get_prefix, _load_spec
-from utils import db_utils  # expose db_utils for tests
+from utils.http_utils import make_upstream_client
+from utils.openapi_utils import _get_prefix, _load_spec, _load_spec_async
+from utils import catalog_utils, db_utils, openapi_utils  # expose utils for tests
+from utils.timing_utils import format_timings, phase_timer
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_LOAD_CONCURRENCY = 8
+
 
 async def initialize_db(cfg: dict, db_url: str | None) -> db.async_sessionmaker:
     """Return a database sessionmaker based on the provided config."""
     db_url = db_url or cfg.get("database")
-    if db_url:
-        return await db.init_db(db_url)
-    return await db.init_db("sqlite+aiosqlite:///:memory:")
+    pool = cfg.get("database_pool")
+    return await connect_with_retries(db_url or "sqlite+aiosqlite:///:memory:", pool)
+
+
+async def _prepare_spec(
+    spec_cfg: dict,
+    semaphore: asyncio.Semaphore,
+    spec_cache: SpecCache | None = None,
+    catalog: CatalogStore | None = None,
+    startup_cfg: dict | None = None,
+    http_defaults: dict | None = None,
+    tracer: Tracer | None = None,
+) -> tuple[dict, httpx.AsyncClient, FastMCP]:
+    """Fetch a spec and build its sub-server while holding ``semaphore``.
+
+    Specs configured as ``lazy`` get a :class:`LazyOpenAPIServer` placeholder
+    instead of a built ``FastMCPOpenAPI`` server.
+    """
+    startup_cfg = startup_cfg or {}
+    async with semaphore:
+        logger.info("Loading Swagger spec: %s", spec_cfg.get("path", "unknown"))
+        spec = await _load_spec_async(spec_cfg, spec_cache)
+        client = make_upstream_client(
+            spec_cfg, _get_prefix(spec_cfg), http_defaults, spec, tracer
+        )
+        try:
+            lazy_server = lazy_server_for(spec_cfg, spec, client, catalog, startup_cfg)
+            if lazy_server is not None:
+                return spec, client, lazy_server
+            sub_server = await asyncio.to_thread(
+                build_sub_server,
+                spec,
+                client,
+                f"{spec_cfg.get('prefix', 'api')} server",
+                catalog,
+            )
+        except Exception:
+            await client.aclose()
+            raise
+        return spec, client, sub_server
 
 
 async def load_specs(
@@ -42,72 +104,206 @@ async def load_specs(
     app: FastAPI,
     session_maker: db.async_sessionmaker,
 ) -> tuple[list[tuple[str, int]], list[httpx.AsyncClient]]:
-    """Load swagger specs and mount them into the root server."""
+    """Load swagger specs concurrently and mount them into the root server.
+
+    Specs are fetched and parsed in parallel, bounded by
+    ``cfg["startup"]["concurrency"]``, and mounted in config order once all of
+    them are ready. Failed specs are recorded in ``app.state.startup_failures``
+    and per-phase wall times in ``app.state.startup_timings``.
+    """
     server_info: list[tuple[str, int]] = []
     clients: list[httpx.AsyncClient] = []
+    timings: dict[str, float] = getattr(app.state, "startup_timings", {})
+    failures: list[tuple[str, str]] = []
+    lazy_servers: list[LazyOpenAPIServer] = []
+    app.state.startup_timings = timings
+    app.state.startup_failures = failures
+    app.state.lazy_servers = lazy_servers
+
+    startup_cfg = cfg.get("startup", {})
+    concurrency = int(startup_cfg.get("concurrency", DEFAULT_LOAD_CONCURRENCY))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    spec_cache = getattr(app.state, "spec_cache", None)
+    catalog = getattr(app.state, "catalog", None)
+    registry = getattr(app.state, "tool_registry", None) or ToolRegistry()
+    app.state.tool_registry = registry
+    tracer = getattr(app.state, "tracer", None)
+
+    with phase_timer(timings, "prepare"):
+        results = await asyncio.gather(
+            *(
+                _prepare_spec(
+                    spec_cfg, semaphore, spec_cache, catalog, startup_cfg, cfg.get("http"), tracer
+                )
+                for spec_cfg in cfg["swagger"]
+            ),
+            return_exceptions=True,
+        )
 
-    for spec_cfg in cfg["swagger"]:
-        logger.info("Loading Swagger spec: %s", spec_cfg.get("path", "unknown"))
-        try:
-            spec = _load_spec(spec_cfg)
-        except (httpx.HTTPError, ValueError) as exc:
-            logger.error("Failed to load spec: %s", exc)
+    prepared: list[tuple[str, dict, FastMCP]] = []
+    for spec_cfg, result in zip(cfg["swagger"], results):
+        prefix = _get_prefix(spec_cfg)
+        if isinstance(result, BaseException):
+            logger.error("Failed to load spec %s: %s", prefix, result)
+            failures.append((prefix, str(result) or type(result).__name__))
             continue
-
-        client = httpx.AsyncClient(base_url=spec_cfg["apiBaseUrl"])
+        spec, client, sub_server = result
         clients.append(client)
+        prepared.append((prefix, spec, sub_server))
 
-        sub_server = FastMCPOpenAPI(
-            openapi_spec=spec,
-            client=client,
-            name=f"{spec_cfg.get('prefix', 'api')} server",
-        )
+    with phase_timer(timings, "tool_status_load"):
+        async with session_maker() as session:
+            statuses = await db.get_tool_status_map(session)
+        routes.tool_statuses.clear()
+        routes.tool_statuses.update(statuses)
+
+    with phase_timer(timings, "mount"):
+        for prefix, spec, sub_server in prepared:
+            routes.spec_data[prefix] = spec
+
+            if isinstance(sub_server, LazyOpenAPIServer):
+                sub_server.on_build = routes.tool_status_loader(prefix, registry)
+                sub_server.on_evict = partial(
+                    registry.register_lazy, prefix, sub_server.materialize
+                )
+                lazy_servers.append(sub_server)
+                registry.register_lazy(prefix, sub_server.materialize)
+                tool_count = sub_server.operation_count
+            else:
+                tools = await sub_server.get_tools()
+                tool_count = len(tools)
+                with phase_timer(timings, "tool_status"):
+                    routes.apply_tool_statuses(prefix, tools)
+                registry.register(prefix, tools)
+            server_info.append((prefix, tool_count))
 
-        prefix = _get_prefix(spec_cfg)
-        routes.spec_data[prefix] = spec
+            routes.instrument_sub_server(app, prefix, sub_server)
+            root_server.mount(prefix, sub_server)
+            routes.mount_server_apps(app, prefix, sub_server)
 
-        tool_count = len(await sub_server.get_tools())
-        server_info.append((prefix, tool_count))
+    return server_info, clients
 
-        root_server.mount(prefix, sub_server)
-        app.mount(f"/{prefix}", sub_server.sse_app())
 
-        async with session_maker() as session:
-            for ts in await db.get_tool_statuses(session, prefix):
-                tools = await sub_server.get_tools()
-                if ts.name in tools:
-                    if ts.enabled:
-                        tools[ts.name].enable()
-                    else:
-                        tools[ts.name].disable()
+async def _load_shared_state(cfg: dict, session_maker: db.async_sessionmaker) -> None:
+    """Add servers and search flags stored by other workers to this process."""
+    async with session_maker() as session:
+        stored_specs = await db.get_specs(session)
+        flags = await db.get_search_flags(session)
+    known = {_get_prefix(spec_cfg) for spec_cfg in cfg.get("swagger", [])}
+    for spec_cfg in stored_specs:
+        if _get_prefix(spec_cfg) not in known:
+            cfg.setdefault("swagger", []).append(spec_cfg)
+    routes.search_status.update(flags)
 
-    return server_info, clients
 
+def _follow_shared_state(
+    state_sync: StateSync,
+    app: FastAPI,
+    server_info: list[tuple[str, int]],
+    clients: list[httpx.AsyncClient],
+    cfg: dict,
+) -> None:
+    """Apply tool, server and search-flag changes made by other workers."""
+    registry = app.state.tool_registry
+
+    async def apply_tools(prefix: str, data: dict) -> None:
+        for name, enabled in data["tools"]:
+            routes.tool_statuses.setdefault(prefix, {})[name] = enabled
+            if registry.get(prefix, name) is not None:
+                registry.set_enabled(prefix, name, enabled)
+
+    async def apply_server(prefix: str, data: dict) -> None:
+        if any(p == prefix for p, _ in server_info):
+            return
+        await routes.mount_spec(
+            data,
+            app.state.root_server,
+            app,
+            server_info,
+            clients,
+            cfg,
+            app.state.spec_cache,
+            app.state.catalog,
+            registry,
+        )
 
+    async def apply_search(prefix: str, data: dict) -> None:
+        routes.search_status[prefix] = bool(data["enabled"])
 
+    async def apply_reload(prefix: str, data: dict) -> None:
+        await app.state.reloader.reload(data.get("config"), propagate=False)
 
-async def create_app(cfg: dict, db_url: str | None = None) -> FastAPI:
-    """Build and return the FastAPI application for the given config."""
+    state_sync.on("tools", apply_tools)
+    state_sync.on("server", apply_server)
+    state_sync.on("search", apply_search)
+    state_sync.on("reload", apply_reload)
+
+
+async def create_app(
+    cfg: dict,
+    db_url: str | None = None,
+    session_maker: db.async_sessionmaker | None = None,
+    config_source: str | list[str] | None = None,
+) -> FastAPI:
+    """Build and return the FastAPI application for the given config.
+
+    An existing ``session_maker`` (e.g. the one the config was loaded with)
+    is reused instead of opening another engine. ``config_source`` is
+    re-read by config reloads.
+    """
     root_server = FastMCP(name="Swagger MCP Server")
     app = FastAPI()
 
-    session_maker = await initialize_db(cfg, db_url)
-    app.state.db_session = session_maker
-    app.state.root_server = root_server
-
-    server_info, clients = await load_specs(cfg, root_server, app, session_maker)
+    timings: dict[str, float] = {}
+    app.state.startup_timings = timings
+    app.state.spec_cache = spec_cache_from_config(cfg)
+    app.state.catalog = catalog_from_config(cfg)
+    registry = ToolRegistry(embed=embedding_from_config(cfg))
+    app.state.tool_registry = registry
+    metrics = Metrics()
+    app.state.metrics = metrics
+    tracer = tracer_from_config(cfg)
+    app.state.tracer = tracer
+    http_transports = streamable_http_from_config(cfg)
+    app.state.http_transports = http_transports
+
+    with phase_timer(timings, "total"):
+        with phase_timer(timings, "database"):
+            if session_maker is None:
+                session_maker = await initialize_db(cfg, db_url)
+        metrics.instrument_engine(session_maker.kw["bind"])
+        if tracer is not None:
+            tracer.instrument_engine(session_maker.kw["bind"])
+        app.state.db_session = session_maker
+        app.state.status_queue = status_queue_from_config(cfg, session_maker)
+        app.state.state_sync = state_sync_from_config(cfg, session_maker)
+        app.state.root_server = root_server
+        if app.state.state_sync is not None:
+            with phase_timer(timings, "shared_state"):
+                await _load_shared_state(cfg, session_maker)
+
+        server_info, clients = await load_specs(cfg, root_server, app, session_maker)
+        app.state.clients = clients
+        app.state.server_info = server_info
+    metrics.add_collector(startup_collector(timings))
+    metrics.add_collector(upstream_collector(clients))
+    if app.state.status_queue is not None:
+        metrics.add_collector(status_queue_collector(app.state.status_queue))
     logger.info("Loaded %d Swagger servers:", len(server_info))
     for prefix, count in server_info:
         logger.info("  - %s: %d tools", prefix, count)
-    try:
-        total_tools = len(await root_server.get_tools())
-        # logger.info("------------------------")
-        total_tools_name = await root_server.get_tools()
-        logger.info("Total tools loaded: %s", total_tools_name)
-        # logger.info("------------------------")
-        logger.info("Total tools available: %d", total_tools)
-    except Exception as exc:  # noqa: BLE001
-        logger.error("Failed to count tools: %s", exc)
+    if app.state.startup_failures:
+        logger.warning("Failed to load %d Swagger servers:", len(app.state.startup_failures))
+        for prefix, reason in app.state.startup_failures:
+            logger.warning("  - %s: %s", prefix, reason)
+    logger.info("Total tools available: %d", sum(count for _, count in server_info))
+    logger.info("Startup phases: %s", format_timings(timings))
+    state_sync = app.state.state_sync
+    reloader = ConfigReloader(app, cfg, config_source, state_sync)
+    app.state.reloader = reloader
+    if state_sync is not None:
+        _follow_shared_state(state_sync, app, server_info, clients, cfg)
+        await state_sync.start()
 
     app.add_api_route(
         "/health",
@@ -123,14 +319,14 @@ async def create_app(cfg: dict, db_url: str | None = None) -> FastAPI:
     )
     app.add_api_route(
         "/list-tools",
-        routes.make_list_tools_handler(root_server),
+        routes.make_list_tools_handler(registry),
         methods=["GET"],
         response_model=models.ListToolsResponse,
     )
     
     app.add_api_route(
         "/list-tools-enabled",
-        routes.make_list_tools_handler2(root_server),
+        routes.make_list_tools_handler2(registry),
         methods=["GET"],
         response_model=models.ListToolsResponseEnable,
     )
@@ -145,6 +341,10 @@ async def create_app(cfg: dict, db_url: str | None = None) -> FastAPI:
             clients,
             cfg,
             session_maker,
+            app.state.spec_cache,
+            app.state.catalog,
+            registry,
+            state_sync,
         ),
         methods=["POST"],
         response_model=models.AddServerResponse,
@@ -158,19 +358,71 @@ async def create_app(cfg: dict, db_url: str | None = None) -> FastAPI:
     )
     app.add_api_route(
         "/tool-enabled",
-        routes.make_set_tool_enabled_handler(root_server, session_maker),
+        routes.make_set_tool_enabled_handler(
+            registry, session_maker, app.state.status_queue, state_sync
+        ),
         methods=["POST"],
         response_model=models.ToolEnabledResponse,
     )
+    app.add_api_route(
+        "/tools-enabled",
+        routes.make_bulk_tool_enabled_handler(
+            registry, session_maker, app.state.status_queue, state_sync
+        ),
+        methods=["POST"],
+        response_model=models.BulkToolEnabledResponse,
+    )
+    app.add_api_route(
+        "/pool-stats",
+        routes.make_pool_stats_handler(clients),
+        methods=["GET"],
+        response_model=dict,
+    )
+    app.add_api_route(
+        "/cache-stats",
+        routes.make_cache_stats_handler(clients),
+        methods=["GET"],
+        response_model=dict,
+    )
+    app.add_api_route(
+        "/status-queue",
+        routes.make_status_queue_handler(app.state.status_queue),
+        methods=["GET"],
+        response_model=dict,
+    )
+    app.add_api_route(
+        "/reload",
+        routes.make_reload_handler(reloader),
+        methods=["POST"],
+        response_model=models.ReloadResponse,
+    )
+    app.add_api_route(
+        "/reload",
+        routes.make_last_reload_handler(reloader),
+        methods=["GET"],
+        response_model=models.ReloadResponse,
+    )
+    app.add_api_route(
+        "/sync",
+        routes.make_sync_handler(state_sync),
+        methods=["GET"],
+        response_model=dict,
+    )
+    app.add_api_route(
+        "/metrics",
+        routes.make_metrics_handler(metrics),
+        methods=["GET"],
+        response_class=PlainTextResponse,
+    )
     app.add_api_route(
         "/search-enabled",
-        routes.make_set_search_enabled_handler(),
+        routes.make_set_search_enabled_handler(session_maker, state_sync),
         methods=["POST"],
         response_model=models.SearchEnabledResponse,
     )
     app.add_api_route(
         "/search",
-        routes.make_search_handler(root_server),
+        routes.make_search_handler(registry),
         methods=["GET"],
         response_model=models.SearchResponse,
     )
@@ -182,17 +434,84 @@ async def create_app(cfg: dict, db_url: str | None = None) -> FastAPI:
         response_model=dict,  # hoặc response_model phù hợp nếu bạn có model
     )
 
+    top_k = int((cfg.get("retrieval") or {}).get("top_k", DEFAULT_TOP_K))
+    app.add_api_route(
+        "/retrieve-tools",
+        routes.make_retrieve_tools_handler(registry, top_k),
+        methods=["GET"],
+        response_model=models.RetrieveToolsResponse,
+    )
+    # Sessions opened on /retrieval/sse only see the tools retrieved for them
+    app.state.retrieval_server = RetrievalServer(root_server, registry, default_k=top_k)
+    app.mount("/retrieval", app.state.retrieval_server.sse_app())
+
+    app.add_api_route(
+        "/transports",
+        routes.make_transports_handler(http_transports),
+        methods=["GET"],
+        response_model=dict,
+    )
+    if http_transports is not None:
+        # streamable HTTP next to SSE: /mcp for the root, /{prefix}/mcp per server
+        app.add_route(http_transports.path, http_transports.add(None, root_server))
+
     # Mount shared server at root (after /health route)
     app.mount("/", root_server.sse_app())
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    if tracer is not None:
+        # added last so it wraps the metrics middleware
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+        app.add_event_handler("startup", tracer.start)
+
+    # always started: /add-server and reloads can mount lazy servers later
+    async def start_eviction() -> None:
+        app.state.eviction_task = asyncio.create_task(
+            evict_idle_servers(app.state.lazy_servers)
+        )
+
+    async def stop_eviction() -> None:
+        app.state.eviction_task.cancel()
+
+    app.add_event_handler("startup", start_eviction)
+    app.add_event_handler("shutdown", stop_eviction)
+
+    reload_cfg = cfg.get("reload") or {}
+
+    async def start_reload_triggers() -> None:
+        if reload_cfg.get("signal", True):
+            reloader.install_signal_handler()
+        if reload_cfg.get("watch", False):
+            reloader.watch(float(reload_cfg.get("interval", DEFAULT_WATCH_INTERVAL)))
 
+    app.add_event_handler("startup", start_reload_triggers)
+    app.add_event_handler("shutdown", reloader.close)
+    if http_transports is not None:
+        app.add_event_handler("shutdown", http_transports.close)
+    if tracer is not None:
+        app.add_event_handler("shutdown", tracer.close)
     app.add_event_handler(
         "shutdown",
-        partial(routes.close_clients, clients=clients, session_maker=session_maker),
+        partial(
+            routes.close_clients,
+            clients=clients,
+            session_maker=session_maker,
+            status_queue=app.state.status_queue,
+            state_sync=state_sync,
+        ),
     )
     return app
 
-async def main(config_source: str | None = None) -> None:
-    """Start the FastMCP server with configuration from a file or URL."""
+async def main(
+    config_source: str | None = None,
+    rebuild_catalog: bool = False,
+    workers: int | None = None,
+) -> None:
+    """Start the FastMCP server with configuration from a file or URL.
+
+    With more than one worker (``workers``, ``WORKERS`` or
+    ``cfg["server"]["workers"]``) the app is served by that many processes
+    sharing tool state through ``DB_URL``.
+    """
     if config_source is None:
         # default to config.json in the same directory or CONFIG_URL env var
         config_source = os.environ.get(
@@ -218,17 +537,37 @@ async def main(config_source: str | None = None) -> None:
     logger.info("Loaded configuration: %s", cfg)
     
     db_url = os.environ.get("DB_URL")
+    session_maker = None
     if db_url:
-        db_cfg = load_config_from_postgres(db_url)
+        session_maker = await connect_with_retries(db_url, cfg.get("database_pool"))
+        db_cfg = await load_config_from_db(session_maker)
         if db_cfg:
             cfg = db_cfg
         else:
-            save_config_to_postgres(cfg, db_url)
+            await save_config_to_db(session_maker, cfg)
+
+    if rebuild_catalog:
+        cfg.setdefault("catalog", {})["rebuild"] = True
 
     export_path = os.environ.get("EXPORT_CONFIG")
     if export_path:
         export_config(cfg, export_path)
-    app = await create_app(cfg)
+
+    workers = int(workers or os.environ.get("WORKERS") or cfg["server"].get("workers", 1))
+    if workers > 1:
+        shared_url = db_url or cfg.get("database")
+        if not shared_url or ":memory:" in shared_url:
+            raise SystemExit("Running several workers needs a shared database: set DB_URL")
+        try:
+            streamable_http_from_config(cfg, workers)
+        except ValueError as exc:
+            raise SystemExit(str(exc)) from exc
+        if session_maker is not None:
+            await session_maker.kw["bind"].dispose()
+        serve_workers(cfg, shared_url, workers, sources)
+        return
+
+    app = await create_app(cfg, session_maker=session_maker, config_source=sources)
 
     config = uvicorn.Config(
         app, host=cfg["server"]["host"], port=cfg["server"]["port"]
@@ -236,7 +575,28 @@ async def main(config_source: str | None = None) -> None:
     server_uvicorn = uvicorn.Server(config)
     await server_uvicorn.serve()
 
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments for ``server.py``."""
+    parser = argparse.ArgumentParser(description="Serve OpenAPI specs as MCP tools.")
+    parser.add_argument(
+        "config",
+        nargs="?",
+        help="config file path or URL (comma separated for several)",
+    )
+    parser.add_argument(
+        "--rebuild-catalog",
+        action="store_true",
+        help="ignore stored tool catalog snapshots and rebuild them",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of worker processes (needs DB_URL when more than one)",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
     # Optional config path or URL can be provided as the first argument
-    config_arg = sys.argv[1] if len(sys.argv) > 1 else None
-    asyncio.run(main(config_arg))
+    args = parse_args()
+    asyncio.run(main(args.config, rebuild_catalog=args.rebuild_catalog, workers=args.workers))
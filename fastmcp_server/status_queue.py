@@ -0,0 +1,162 @@
+"""Write-behind persistence of tool enabled states."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+
+import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+
+class StatusWriteQueue:
+    """Coalesce tool status changes and persist them in batched transactions.
+
+    :meth:`put` only enqueues the change; a background task started on first
+    use collects changes until ``batch_size`` distinct tools are pending or
+    ``flush_interval`` seconds passed since the first one, keeps the last
+    state per ``(prefix, name)`` and writes the batch with
+    :func:`db.set_tools_enabled`. Failed batches are retried on the next
+    flush. :meth:`close` drains everything that is still pending.
+    """
+
+    def __init__(
+        self,
+        session_maker: db.async_sessionmaker,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[tuple[str, str, bool] | None] | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._pending: dict[tuple[str, str], bool] = {}
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_ms_total = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Changes not yet committed to the database."""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        if self._closing and queued:
+            queued -= 1  # wake-up sentinel
+        return queued + len(self._pending)
+
+    def put(self, prefix: str, name: str, enabled: bool) -> None:
+        """Schedule ``enabled`` to be stored for ``prefix``/``name``."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._closing = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._queue.put_nowait((prefix, name, enabled))
+        self.enqueued += 1
+
+    def _collect(self, item: tuple[str, str, bool] | None) -> None:
+        if item is None:  # wake-up sent by close()
+            return
+        prefix, name, enabled = item
+        if (prefix, name) in self._pending:
+            self.coalesced += 1
+        self._pending[(prefix, name)] = enabled
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while not self._closing or not queue.empty() or self._pending:
+            if not self._pending:
+                self._collect(await queue.get())
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.batch_size and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._collect(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            if not await self.flush() and self._closing:
+                return
+
+    async def flush(self) -> bool:
+        """Write the coalesced changes collected so far in one transaction.
+
+        Returns ``False`` if the write failed and the changes are still pending.
+        """
+        while self._queue is not None and not self._queue.empty():
+            self._collect(self._queue.get_nowait())
+        if not self._pending:
+            return True
+        batch, self._pending = self._pending, {}
+        started = time.perf_counter()
+        try:
+            async with self.session_maker() as session:
+                await db.set_tools_enabled(
+                    session, [(prefix, name, enabled) for (prefix, name), enabled in batch.items()]
+                )
+        except Exception:
+            self.errors += 1
+            logger.exception("Failed to persist %d tool states; will retry", len(batch))
+            # newer changes collected meanwhile win over the failed batch
+            self._pending = {**batch, **self._pending}
+            await asyncio.sleep(self.flush_interval)
+            return False
+        elapsed = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.flushed_rows += len(batch)
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self._flush_ms_total += elapsed
+        return True
+
+    async def close(self) -> None:
+        """Persist every pending change and stop the background task."""
+        if self._task is not None and not self._task.done():
+            self._closing = True
+            self._queue.put_nowait(None)
+            await self._task
+        self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error("Dropping %d unsaved tool states on shutdown", len(self._pending))
+
+    def metrics(self) -> dict:
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "errors": self.errors,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._flush_ms_total / self.flushes, 3) if self.flushes else 0.0,
+        }
+
+
+def status_queue_from_config(
+    cfg: dict, session_maker: db.async_sessionmaker
+) -> StatusWriteQueue | None:
+    """Return a write-behind queue if enabled in ``cfg`` or ``WRITE_BEHIND``."""
+    section = dict(cfg.get("write_behind") or {})
+    if os.getenv("WRITE_BEHIND") == "1":
+        section.setdefault("enabled", True)
+    if not section.get("enabled", False):
+        return None
+    return StatusWriteQueue(
+        session_maker,
+        batch_size=int(section.get("batch_size", DEFAULT_BATCH_SIZE)),
+        flush_interval=float(section.get("flush_interval", DEFAULT_FLUSH_INTERVAL)),
+    )
@@ -0,0 +1,205 @@
+"""Propagation of tool state changes between worker processes."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = "mcp_state_changes"
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_RETENTION = 3600.0
+# Ids below the newest one seen that are read again, because on PostgreSQL a
+# transaction holding a lower id can commit after a higher one is visible
+REREAD_WINDOW = 64
+
+ChangeHandler = Callable[[str, dict], Awaitable[None]]
+
+
+class StateSync:
+    """Share tool, server and search-flag changes through the database.
+
+    Every change is appended to the ``state_changes`` table by
+    :meth:`publish`. Each worker replays the rows written by the others in
+    id order. On PostgreSQL a ``NOTIFY`` on ``channel`` wakes the workers
+    right away; other databases are polled every ``poll_interval`` seconds
+    (PostgreSQL also polls at that interval as a safety net). Rows older than
+    ``retention`` seconds are pruned.
+    """
+
+    def __init__(
+        self,
+        session_maker: db.async_sessionmaker,
+        worker_id: str | None = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        channel: str = DEFAULT_CHANNEL,
+        retention: float = DEFAULT_RETENTION,
+    ):
+        self.session_maker = session_maker
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.poll_interval = poll_interval
+        self.channel = channel
+        self.retention = retention
+        self.last_id = 0
+        self._floor = 0  # changes up to here predate this worker
+        self._seen: set[int] = set()
+        self._seen_order: deque[int] = deque()
+        self.published = 0
+        self.applied = 0
+        self.errors = 0
+        self._handlers: dict[str, ChangeHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._listener = None  # connection kept open for LISTEN
+
+    @property
+    def engine(self):
+        return self.session_maker.kw["bind"]
+
+    @property
+    def notify(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def on(self, kind: str, handler: ChangeHandler) -> None:
+        """Call ``handler(prefix, data)`` for changes of ``kind`` from other workers."""
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Skip past existing changes and start following new ones."""
+        async with self.session_maker() as session:
+            self.last_id = self._floor = await db.get_last_state_change_id(session)
+        if self.notify:
+            await self._listen()
+        self._task = asyncio.create_task(self._run())
+
+    async def _listen(self) -> None:
+        try:
+            self._listener = await self.engine.connect()
+            raw = await self._listener.get_raw_connection()
+            await raw.driver_connection.add_listener(
+                self.channel, lambda *_: self._wakeup.set()
+            )
+        except Exception:
+            logger.exception("LISTEN %s failed; falling back to polling", self.channel)
+            if self._listener is not None:
+                await self._listener.close()
+                self._listener = None
+
+    async def publish(self, kind: str, prefix: str, data: dict) -> int:
+        """Log a change made by this worker and notify the others."""
+        async with self.session_maker() as session:
+            change_id = await db.add_state_change(session, kind, prefix, data, self.worker_id)
+            if self.notify:
+                await session.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": str(change_id)},
+                )
+            await session.commit()
+        self.published += 1
+        return change_id
+
+    def _mark_seen(self, change_id: int) -> bool:
+        if change_id in self._seen:
+            return False
+        self._seen.add(change_id)
+        self._seen_order.append(change_id)
+        while len(self._seen_order) > 4 * REREAD_WINDOW:
+            self._seen.discard(self._seen_order.popleft())
+        return True
+
+    async def poll(self) -> int:
+        """Apply the changes logged since the last call; return how many."""
+        async with self.session_maker() as session:
+            changes = await db.get_state_changes(session, max(0, self.last_id - REREAD_WINDOW))
+        count = 0
+        for change in changes:
+            if change.id <= self._floor or not self._mark_seen(change.id):
+                continue
+            self.last_id = max(self.last_id, change.id)
+            if change.origin == self.worker_id:
+                continue
+            handler = self._handlers.get(change.kind)
+            if handler is None:
+                continue
+            try:
+                await handler(change.prefix, change.data)
+            except Exception:
+                self.errors += 1
+                logger.exception("Failed to apply %s change for %s", change.kind, change.prefix)
+                continue
+            count += 1
+        self.applied += count
+        return count
+
+    async def _prune(self) -> None:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            seconds=self.retention
+        )
+        async with self.session_maker() as session:
+            await db.prune_state_changes(session, cutoff)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_prune = loop.time() + self.retention
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.poll()
+                if loop.time() >= next_prune:
+                    next_prune = loop.time() + self.retention
+                    await self._prune()
+            except Exception:
+                self.errors += 1
+                logger.exception("Failed to read shared state changes")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    def metrics(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "mode": "notify" if self._listener is not None else "poll",
+            "last_id": self.last_id,
+            "published": self.published,
+            "applied": self.applied,
+            "errors": self.errors,
+        }
+
+
+def state_sync_from_config(
+    cfg: dict, session_maker: db.async_sessionmaker
+) -> StateSync | None:
+    """Return a :class:`StateSync` if ``cfg["sync"]`` or more than one worker asks for it."""
+    section = dict(cfg.get("sync") or {})
+    workers = int((cfg.get("server") or {}).get("workers", 1))
+    if not section.get("enabled", workers > 1):
+        return None
+    return StateSync(
+        session_maker,
+        poll_interval=float(section.get("poll_interval", DEFAULT_POLL_INTERVAL)),
+        channel=section.get("channel", DEFAULT_CHANNEL),
+        retention=float(section.get("retention", DEFAULT_RETENTION)),
+    )
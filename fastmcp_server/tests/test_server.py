@@ -109,48 +109,63 @@ def test_load_multiple_configs(tmp_path):
     assert len(cfg["swagger"]) == 2
 
 
-def test_save_and_load_config_postgres(monkeypatch):
-    executed = {}
-
-    class FakeCursor:
-        def __init__(self):
-            self._result = [json.dumps({"swagger": [], "server": {"port": 5}})]
-
-        def execute(self, query, params=None):
-            executed.setdefault("queries", []).append((query, params))
-
-        def fetchone(self):
-            return [self._result[0]]
-
-        def __enter__(self):
-            return self
+def test_save_and_load_config_db(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path / 'config.db'}"
+
+    async def run() -> tuple[list[int], dict, dict]:
+        session_maker = await server.connect_with_retries(db_url)
+        cfg = {"swagger": [], "server": {"port": 5}}
+        versions = [
+            await server.save_config_to_db(session_maker, cfg),
+            await server.save_config_to_db(session_maker, cfg),
+            await server.save_config_to_db(session_maker, {**cfg, "server": {"port": 6}}),
+        ]
+        loaded = await server.load_config_from_db(session_maker)
+        async with session_maker() as session:
+            await session.execute(
+                server.db.text("CREATE TABLE configs (name TEXT PRIMARY KEY, data TEXT)")
+            )
+            await session.execute(
+                server.db.text("INSERT INTO configs VALUES ('old', :data)"),
+                {"data": json.dumps({"swagger": [], "server": {"port": 7}})},
+            )
+            await session.commit()
+        legacy = await server.load_config_from_db(session_maker, "old")
+        async with session_maker() as session:
+            migrated = await server.db.get_config(session, "old")
+        await session_maker.kw["bind"].dispose()
+        assert migrated == (1, legacy)
+        return versions, loaded, legacy
 
-        def __exit__(self, exc_type, exc, tb):
-            pass
+    versions, loaded, legacy = asyncio.run(run())
+    assert versions == [1, 1, 2]
+    assert loaded["server"]["port"] == 6
+    assert legacy["server"]["port"] == 7
+    assert server.db_utils.async_db_url("postgres://u:p@db/mcp") == "postgresql+asyncpg://u:p@db/mcp"
 
-    class FakeConn:
-        def __enter__(self):
-            return self
 
-        def __exit__(self, exc_type, exc, tb):
-            pass
+def test_save_config_gives_up_on_persistent_integrity_errors(tmp_path, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
 
-        def cursor(self):
-            return FakeCursor()
+    db_url = f"sqlite+aiosqlite:///{tmp_path / 'config.db'}"
+    attempts = []
 
-        def close(self):
-            executed["closed"] = True
+    async def failing_commit(self):
+        attempts.append(1)
+        raise IntegrityError("INSERT", {}, Exception("constraint failed"))
 
-    def fake_connect(dsn):
-        executed["dsn"] = dsn
-        return FakeConn()
+    async def run() -> None:
+        session_maker = await server.connect_with_retries(db_url)
+        monkeypatch.setattr(server.db.AsyncSession, "commit", failing_commit)
+        try:
+            async with session_maker() as session:
+                await server.db.save_config(session, {"swagger": []})
+        finally:
+            await session_maker.kw["bind"].dispose()
 
-    monkeypatch.setattr(server.db_utils.psycopg2, "connect", fake_connect)
-
-    cfg = {"swagger": [], "server": {"port": 5}}
-    server.save_config_to_postgres(cfg, "db")
-    loaded = server.load_config_from_postgres("db")
-    assert loaded["server"]["port"] == 5
+    with pytest.raises(IntegrityError):
+        asyncio.run(run())
+    assert len(attempts) == server.db.SAVE_CONFIG_ATTEMPTS
 
 
 def test_tool_enable_api():
@@ -261,3 +276,1502 @@ def test_search_endpoint():
     assert resp.status_code == 200
     data = resp.json()
     assert any(r["tool"] == tool_name for r in data.get("results", []))
+
+
+def test_load_specs_reports_failures_and_keeps_order():
+    cfg = {
+        "swagger": [
+            {"path": "missing.json", "apiBaseUrl": "https://example.com", "prefix": "broken"},
+            {
+                "path": "examples/swagger-pet-store.json",
+                "apiBaseUrl": "https://example.com",
+                "prefix": "pets_a",
+            },
+            {
+                "path": "examples/swagger-pet-store.json",
+                "apiBaseUrl": "https://example.com",
+                "prefix": "pets_b",
+            },
+        ],
+        "server": {"host": "127.0.0.1", "port": 0},
+        "startup": {"concurrency": 2},
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+
+    app = asyncio.run(server.create_app(cfg))
+
+    assert [p for p, _ in app.state.startup_failures] == ["broken"]
+    assert list(app.state.root_server._mounted_servers) == ["pets_a", "pets_b"]
+    assert {"database", "prepare", "mount", "tool_status", "total"} <= set(
+        app.state.startup_timings
+    )
+
+
+def test_load_spec_async_remote(httpx_mock):
+    spec_data = {"openapi": "3.0.0", "paths": {}, "info": {"title": "t", "version": "1"}}
+    httpx_mock.add_response(url="https://example.com/pet.json", json=spec_data)
+
+    async def load() -> dict:
+        try:
+            return await server._load_spec_async({"path": "https://example.com/pet.json"})
+        finally:
+            await server.openapi_utils.close_spec_client()
+
+    assert asyncio.run(load()) == spec_data
+
+
+def test_failed_mount_closes_upstream_client(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastmcp import FastMCP
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps(make_spec(1, title="bad")))
+    created = []
+    make_client = server.routes.make_upstream_client
+
+    def spy(*args, **kwargs):
+        created.append(make_client(*args, **kwargs))
+        return created[-1]
+
+    def fail(*args, **kwargs):
+        raise ValueError("bad spec")
+
+    monkeypatch.setattr(server.routes, "make_upstream_client", spy)
+    monkeypatch.setattr(server.routes, "build_sub_server", fail)
+    clients: list = []
+    spec_cfg = {"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": "bad"}
+
+    async def mount() -> None:
+        await server.routes.mount_spec(spec_cfg, FastMCP("root"), FastAPI(), [], clients, {})
+
+    with pytest.raises(ValueError):
+        asyncio.run(mount())
+    assert clients == []
+    assert created[0].is_closed
+
+
+def test_add_server_does_not_block_other_requests(httpx_mock):
+    cfg = server.load_config()
+    cfg["database"] = "sqlite+aiosqlite:///:memory:"
+    spec_data = {"openapi": "3.0.0", "paths": {}, "info": {"title": "t", "version": "1"}}
+
+    async def slow_spec(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.5)
+        return httpx.Response(200, json=spec_data)
+
+    httpx_mock.add_callback(slow_spec, url="https://example.com/slow.json")
+
+    async def run() -> list[str]:
+        app = await server.create_app(cfg)
+        finished: list[str] = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+            async def add() -> None:
+                resp = await client.post(
+                    "/add-server",
+                    json={
+                        "path": "https://example.com/slow.json",
+                        "apiBaseUrl": "https://example.com",
+                        "prefix": "slow",
+                    },
+                )
+                assert resp.status_code == 200
+                finished.append("add-server")
+
+            async def health() -> None:
+                await asyncio.sleep(0.05)
+                resp = await client.get("/health")
+                assert resp.status_code == 200
+                finished.append("health")
+
+            await asyncio.gather(add(), health())
+        await server.openapi_utils.close_spec_client()
+        return finished
+
+    assert asyncio.run(run()) == ["health", "add-server"]
+
+
+def test_spec_cache_revalidates_and_falls_back(tmp_path, httpx_mock):
+    url = "https://example.com/cached.json"
+    spec_data = {"openapi": "3.0.0", "paths": {}, "info": {"title": "c", "version": "1"}}
+    cache = server.SpecCache(str(tmp_path))
+
+    httpx_mock.add_response(url=url, json=spec_data, headers={"ETag": '"v1"'})
+    httpx_mock.add_response(
+        url=url, status_code=304, match_headers={"If-None-Match": '"v1"'}
+    )
+    httpx_mock.add_exception(httpx.ConnectError("upstream down"), url=url)
+
+    async def load_three_times() -> list[dict]:
+        try:
+            return [
+                await server._load_spec_async({"path": url}, cache) for _ in range(3)
+            ]
+        finally:
+            await server.openapi_utils.close_spec_client()
+
+    assert asyncio.run(load_three_times()) == [spec_data, spec_data, spec_data]
+    assert cache.lookup(url)["etag"] == '"v1"'
+
+
+def test_catalog_snapshot_rehydrates_tools(tmp_path):
+    cfg = server.load_config()
+    cfg["database"] = "sqlite+aiosqlite:///:memory:"
+    cfg["catalog"] = {"dir": str(tmp_path)}
+    prefix = cfg["swagger"][0]["prefix"]
+
+    async def tool_names(app) -> list[str]:
+        srv = app.state.root_server._mounted_servers[prefix]
+        return sorted(await srv.get_tools())
+
+    cold = asyncio.run(server.create_app(cfg))
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    warm = asyncio.run(server.create_app(cfg))
+    assert asyncio.run(tool_names(warm)) == asyncio.run(tool_names(cold))
+
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json=[])
+
+    spec = server._load_spec(cfg["swagger"][0])
+    snapshot = server.catalog_utils.snapshot_tools(
+        server.FastMCPOpenAPI(openapi_spec=spec, client=httpx.AsyncClient())
+    )
+    client = httpx.AsyncClient(
+        base_url="https://example.com", transport=httpx.MockTransport(handler)
+    )
+    rebuilt = server.catalog_utils.server_from_snapshot(snapshot, client)
+
+    async def call_first() -> None:
+        tools = await rebuilt.get_tools()
+        name = next(iter(tools))
+        await rebuilt._call_tool(name, {"status": ["available"]})
+        await client.aclose()
+
+    asyncio.run(call_first())
+    assert calls == ["/pet/findByStatus"]
+
+
+def test_lazy_mount_materializes_on_first_use():
+    cfg = server.load_config()
+    cfg["database"] = "sqlite+aiosqlite:///:memory:"
+    cfg["startup"] = {"lazy": True, "idle_timeout": 60}
+    prefix = cfg["swagger"][0]["prefix"]
+
+    app = asyncio.run(server.create_app(cfg))
+    lazy = app.state.root_server._mounted_servers[prefix].server
+    assert isinstance(lazy, server.LazyOpenAPIServer)
+    assert not lazy.is_built
+
+    async def run() -> bool:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            servers = (await client.get("/list-server")).json()["servers"]
+            assert prefix in servers
+            assert not lazy.is_built
+
+            tools = (await client.get(f"/list-tools?prefix={prefix}")).json()["tools"]
+            assert lazy.is_built
+            resp = await client.post(
+                "/tool-enabled",
+                json={"prefix": prefix, "name": tools[0], "enabled": False},
+            )
+            assert resp.status_code == 200
+
+            registry = app.state.tool_registry
+            registry.sync_search_index()
+            assert registry.get(prefix, tools[0]) is not None
+            assert lazy.evict_if_idle(now=lazy.last_used + 61)
+            assert not lazy.is_built
+            # the registry and search index let go of the tools too
+            assert registry.get(prefix, tools[0]) is None
+            assert registry.prefix_of(tools[0]) is None
+            assert registry.names(prefix) == []
+            assert prefix not in registry.search_index._prefix_docs
+
+            data = (await client.get(f"/list-tools-enabled?prefix={prefix}")).json()
+            return {t["name"]: t["enabled"] for t in data["tools"]}[tools[0]]
+
+    assert asyncio.run(run()) is False
+
+
+def test_prepare_spec_closes_client_when_lazy_setup_fails(monkeypatch):
+    spec_cfg = server.load_config()["swagger"][0]
+    clients = []
+
+    def make_client(*args, **kwargs):
+        clients.append(httpx.AsyncClient())
+        return clients[-1]
+
+    def broken_lazy_server_for(*args, **kwargs):
+        raise ValueError("bad lazy settings")
+
+    monkeypatch.setattr(server, "make_upstream_client", make_client)
+    monkeypatch.setattr(server, "lazy_server_for", broken_lazy_server_for)
+
+    with pytest.raises(ValueError):
+        asyncio.run(server._prepare_spec(spec_cfg, asyncio.Semaphore(1)))
+    assert clients[0].is_closed
+
+
+def test_tool_status_restored_after_restart(tmp_path):
+    cfg = server.load_config()
+    cfg["database"] = f"sqlite+aiosqlite:///{tmp_path / 'state.db'}"
+    prefix = cfg["swagger"][0]["prefix"]
+
+    async def disable_first_tool() -> str:
+        app = await server.create_app(cfg)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            name = (await client.get(f"/list-tools?prefix={prefix}")).json()["tools"][0]
+            await client.post(
+                "/tool-enabled", json={"prefix": prefix, "name": name, "enabled": False}
+            )
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return name
+
+    async def enabled_after_restart(name: str) -> bool:
+        app = await server.create_app(cfg)
+        tools = await app.state.root_server._mounted_servers[prefix].get_tools()
+        assert "tool_status_load" in app.state.startup_timings
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return tools[name].enabled
+
+    tool_name = asyncio.run(disable_first_tool())
+    assert asyncio.run(enabled_after_restart(tool_name)) is False
+
+
+def test_list_endpoints_served_from_registry(monkeypatch):
+    cfg = server.load_config()
+    cfg["database"] = "sqlite+aiosqlite:///:memory:"
+    prefix = cfg["swagger"][0]["prefix"]
+
+    app = asyncio.run(server.create_app(cfg))
+    registry = app.state.tool_registry
+    tool_name = registry.names(prefix)[0]
+    assert registry.prefix_of(tool_name) == prefix
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("get_tools should not be called")
+
+    monkeypatch.setattr(server.FastMCPOpenAPI, "get_tools", fail)
+
+    async def run() -> tuple[dict, dict, dict]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post(
+                "/tool-enabled", json={"prefix": prefix, "name": tool_name, "enabled": False}
+            )
+            listed = (await client.get("/list-tools")).json()
+            statuses = (await client.get(f"/list-tools-enabled?prefix={prefix}")).json()
+            found = (await client.get(f"/search?name={tool_name[-5:]}")).json()
+            return listed, statuses, found
+
+    listed, statuses, found = asyncio.run(run())
+    assert tool_name in listed["tools"]
+    assert {"name": tool_name, "enabled": False} in statuses["tools"]
+    assert {"prefix": prefix, "tool": tool_name, "enabled": False, "score": None} in found["results"]
+    assert registry.is_enabled(prefix, tool_name) is False
+
+
+def test_search_ranks_full_text_and_fuzzy_matches(tmp_path):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    cfg = server.load_config()
+    cfg["database"] = "sqlite+aiosqlite:///:memory:"
+    prefix = cfg["swagger"][0]["prefix"]
+    spec_path = tmp_path / "inventory.json"
+    spec_path.write_text(json.dumps(make_spec(20, title="inventory")))
+
+    app = asyncio.run(server.create_app(cfg))
+
+    async def run() -> tuple[dict, dict, dict, dict]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            typo = (await client.get("/search?q=find+pets+by+statsu")).json()
+            await client.post(
+                "/add-server",
+                json={"path": str(spec_path), "apiBaseUrl": "http://mock", "prefix": "inventory"},
+            )
+            ranked = (await client.get("/search?q=create+resource&limit=3&offset=1")).json()
+            exact = (await client.get(f"/search?q=status&fuzzy=false&prefix={prefix}")).json()
+            bad = await client.get("/search?q=x&limit=-1")
+            return typo, ranked, exact, {"status": bad.status_code}
+
+    typo, ranked, exact, bad = asyncio.run(run())
+    assert typo["results"][0]["prefix"] == prefix
+    assert typo["results"][0]["score"] > 0
+    assert "ms" in typo
+    assert ranked["total"] >= 10
+    assert len(ranked["results"]) == 3
+    assert all(r["prefix"] == "inventory" for r in ranked["results"])
+    scores = [r["score"] for r in ranked["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert exact["total"] == 1
+    assert bad["status"] == 400
+
+
+def test_retrieve_tools_ranks_and_filters_session_tools():
+    from fastmcp.server.http import _current_http_request
+    from starlette.requests import Request
+
+    cfg = server.load_config()
+    cfg["database"] = "sqlite+aiosqlite:///:memory:"
+    cfg["retrieval"] = {"dim": 256, "top_k": 3}
+    prefix = cfg["swagger"][0]["prefix"]
+
+    app = asyncio.run(server.create_app(cfg))
+    registry = app.state.tool_registry
+    tool_name = registry.names(prefix)[0]
+
+    async def run() -> tuple[dict, dict, list[str], list[str]]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            found = (await client.get("/retrieve-tools?q=pets+with+status")).json()
+            await client.post(
+                "/tool-enabled", json={"prefix": prefix, "name": tool_name, "enabled": False}
+            )
+            after = (await client.get("/retrieve-tools?q=pets+with+status")).json()
+
+        retrieval = app.state.retrieval_server
+        sessions = []
+        for query in (b"q=pets+with+status", found["session_url"].split("?")[1].encode()):
+            scope = {"type": "http", "query_string": query, "headers": []}
+            token = _current_http_request.set(Request(scope))
+            try:
+                sessions.append(list(await retrieval.get_tools()))
+            finally:
+                _current_http_request.reset(token)
+        return found, after, sessions[0], sessions[1]
+
+    found, after, by_query, by_names = asyncio.run(run())
+    assert found["tools"][0]["tool"] == tool_name
+    assert found["tools"][0]["score"] > 0
+    assert "ms" in found
+    assert all(t["tool"] != tool_name for t in after["tools"])
+    assert tool_name not in by_query
+    assert by_names == [tool_name]
+
+    vectors = server.retrieval.hashing_embedding(["find pets", "find pets"], dim=64)
+    assert vectors.shape == (2, 64)
+    assert (vectors[0] == vectors[1]).all()
+
+
+def test_retrieval_sse_session_lists_top_k_tools(tmp_path):
+    import uvicorn
+    from fastmcp import Client
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(8, title="syn")))
+    cfg = {
+        "swagger": [
+            {"path": str(spec_path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}
+        ],
+        "database": "sqlite+aiosqlite:///:memory:",
+        "retrieval": {"dim": 256, "top_k": 3},
+        "reload": {"signal": False},
+    }
+
+    async def run() -> dict[str, int]:
+        app = await server.create_app(cfg)
+        config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+        http_server = uvicorn.Server(config)
+        serving = asyncio.create_task(http_server.serve())
+        while not http_server.started:
+            await asyncio.sleep(0.01)
+        port = http_server.servers[0].sockets[0].getsockname()[1]
+        counts = {}
+        try:
+            for k in ("2", "abc", "-3", "100000"):
+                url = f"http://127.0.0.1:{port}/retrieval/sse?q=fetch+resource&k={k}"
+                async with Client(url) as client:
+                    counts[k] = len(await client.list_tools())
+        finally:
+            http_server.should_exit = True
+            await serving
+            await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return counts
+
+    # bad values fall back to top_k, huge ones are capped by the tool count
+    assert asyncio.run(run()) == {"2": 2, "abc": 3, "-3": 3, "100000": 8}
+
+
+def test_list_tools_cursor_pagination_and_ndjson(tmp_path):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "bulk.json"
+    spec_path.write_text(json.dumps(make_spec(25, title="bulk")))
+    cfg = {
+        "swagger": [{"path": str(spec_path), "apiBaseUrl": "http://mock", "prefix": "bulk"}],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    app = asyncio.run(server.create_app(cfg))
+    registry = app.state.tool_registry
+    expected = registry.names("bulk")
+    registry.set_enabled("bulk", expected[3], False)
+
+    async def run() -> tuple[list[str], list[dict], list[dict], int]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            names: list[str] = []
+            cursor = None
+            while True:
+                params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+                page = (await client.get("/list-tools", params=params)).json()
+                names.extend(page["tools"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            disabled = (
+                await client.get("/list-tools-enabled?enabled=false&fields=name,prefix")
+            ).json()["tools"]
+            resp = await client.get(
+                "/list-tools-enabled?prefix=bulk&limit=20", headers={"Accept": "application/x-ndjson"}
+            )
+            lines = [json.loads(line) for line in resp.text.splitlines()]
+            bad = [
+                (await client.get(url)).status_code
+                for url in (
+                    "/list-tools?cursor=not-a-cursor",
+                    "/list-tools?limit=0",
+                    "/list-tools-enabled?limit=0",
+                )
+            ]
+            return names, disabled, lines, bad
+
+    names, disabled, lines, bad = asyncio.run(run())
+    assert names == expected
+    assert disabled == [{"name": expected[3], "prefix": "bulk"}]
+    assert [row["name"] for row in lines[:20]] == expected[:20]
+    assert lines[3]["enabled"] is False
+    assert set(lines[-1]) == {"next_cursor"}
+    assert bad == [400, 400, 400]
+
+
+def test_bulk_tools_enabled_persists_in_one_transaction(tmp_path):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "bulk.json"
+    spec_path.write_text(json.dumps(make_spec(1000, title="bulk")))
+    cfg = {
+        "swagger": [{"path": str(spec_path), "apiBaseUrl": "http://mock", "prefix": "bulk"}],
+        "database": f"sqlite+aiosqlite:///{tmp_path / 'state.db'}",
+    }
+
+    async def toggle() -> tuple[dict, dict]:
+        app = await server.create_app(cfg)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            selected = (
+                await client.post("/tools-enabled", json={"prefix": "bulk", "enabled": False})
+            ).json()
+            items = (
+                await client.post(
+                    "/tools-enabled",
+                    json={
+                        "items": [
+                            {"prefix": "bulk", "name": "bulk_getResource0", "enabled": True},
+                            {"prefix": "bulk", "name": "bulk_createResource1", "enabled": False},
+                            {"prefix": "bulk", "name": "bulk_missing", "enabled": True},
+                        ]
+                    },
+                )
+            ).json()
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return selected, items
+
+    async def stored() -> dict[str, bool]:
+        session_maker = await server.db.init_db(cfg["database"])
+        async with session_maker() as session:
+            statuses = await server.db.get_tool_status_map(session)
+        await session_maker.kw["bind"].dispose()
+        return statuses["bulk"]
+
+    selected, items = asyncio.run(toggle())
+    assert selected["updated"] == 1000
+    assert [r["status"] for r in items["results"]] == ["updated", "unchanged", "not_found"]
+    statuses = asyncio.run(stored())
+    assert len(statuses) == 1000
+    assert statuses["bulk_getResource0"] is True
+    assert statuses["bulk_getResource2"] is False
+
+
+def test_tool_toggle_rolls_back_when_the_write_fails(tmp_path, monkeypatch):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(2, title="syn")))
+    cfg = {
+        "swagger": [{"path": str(spec_path), "apiBaseUrl": "http://mock", "prefix": "syn"}],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    async def toggle() -> bool:
+        app = await server.create_app(cfg)
+        monkeypatch.setattr(server.routes.db, "set_tool_enabled", fail)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with pytest.raises(RuntimeError):
+                await client.post(
+                    "/tool-enabled",
+                    json={"prefix": "syn", "name": "syn_getResource0", "enabled": False},
+                )
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return app.state.tool_registry.is_enabled("syn", "syn_getResource0")
+
+    assert asyncio.run(toggle()) is True
+
+
+def test_write_behind_queue_coalesces_and_drains_on_shutdown(tmp_path):
+    cfg = server.load_config()
+    cfg["database"] = f"sqlite+aiosqlite:///{tmp_path / 'state.db'}"
+    cfg["write_behind"] = {"enabled": True, "batch_size": 100, "flush_interval": 5}
+    prefix = cfg["swagger"][0]["prefix"]
+
+    async def toggle() -> tuple[dict, dict, str]:
+        app = await server.create_app(cfg)
+        name = app.state.tool_registry.names(prefix)[0]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for enabled in (False, True, False):
+                resp = await client.post(
+                    "/tool-enabled", json={"prefix": prefix, "name": name, "enabled": enabled}
+                )
+                assert resp.status_code == 200
+            listed = (await client.get(f"/list-tools-enabled?prefix={prefix}")).json()
+            pending = (await client.get("/status-queue")).json()
+        await server.routes.close_clients(
+            app.state.clients, app.state.db_session, app.state.status_queue
+        )
+        assert {"name": name, "enabled": False} in listed["tools"]
+        return pending, app.state.status_queue.metrics(), name
+
+    async def stored() -> dict[str, bool]:
+        session_maker = await server.db.init_db(cfg["database"])
+        async with session_maker() as session:
+            statuses = await server.db.get_tool_status_map(session)
+        await session_maker.kw["bind"].dispose()
+        return statuses.get(prefix, {})
+
+    pending, drained, name = asyncio.run(toggle())
+    assert pending["enabled"] is True
+    assert pending["depth"] >= 1
+    assert pending["flushes"] == 0
+    assert drained["depth"] == 0
+    assert drained["flushes"] == 1
+    assert drained["flushed_rows"] == 1
+    assert drained["coalesced"] == 2
+    assert asyncio.run(stored()) == {name: False}
+
+
+def test_engine_options_and_native_upserts(tmp_path):
+    options = server.db.engine_options(
+        "postgresql+asyncpg://u:p@h/db",
+        {"pool_size": 20, "max_overflow": 5, "pool_pre_ping": True, "statement_cache_size": 200},
+    )
+    assert options["pool_size"] == 20
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"prepared_statement_cache_size": 200}
+    assert "pool_size" not in server.db.engine_options("sqlite+aiosqlite:///x.db", {"pool_size": 20})
+
+    async def run() -> tuple[list[dict], list]:
+        session_maker = await server.db.init_db(
+            f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}", {"pool_recycle": 60}
+        )
+        async with session_maker() as session:
+            await server.db.add_spec(session, {"prefix": "a", "path": "one.json"})
+            await server.db.add_spec(session, {"prefix": "a", "path": "two.json"})
+            await server.db.set_tool_enabled(session, "a", "a_tool", False)
+            await server.db.set_tool_enabled(session, "a", "a_tool", True)
+            specs = await server.db.get_specs(session)
+            statuses = await server.db.get_tool_statuses(session, "a")
+        await session_maker.kw["bind"].dispose()
+        return specs, [(s.name, s.enabled) for s in statuses]
+
+    specs, statuses = asyncio.run(run())
+    assert specs == [{"prefix": "a", "path": "two.json"}]
+    assert statuses == [("a_tool", True)]
+
+
+def test_upstream_pool_settings_and_stats(tmp_path, httpx_mock):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    cfg = {
+        "swagger": [
+            {
+                "path": str(spec_path),
+                "apiBaseUrl": "http://upstream.test",
+                "prefix": "syn",
+                "http": {"max_concurrency_per_host": 1, "read_timeout": 7, "max_connections": 4},
+            }
+        ],
+        "http": {"connect_timeout": 2},
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    active = 0
+    peak = 0
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return httpx.Response(200, json={"id": 1})
+
+    httpx_mock.add_callback(upstream, url="http://upstream.test/resource0/1", is_reusable=True)
+
+    async def run() -> tuple[dict, object]:
+        app = await server.create_app(cfg)
+        root = app.state.root_server
+        await asyncio.gather(*(root._call_tool("syn_getResource0", {"id": 1}) for _ in range(3)))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            stats = (await client.get("/pool-stats?prefix=syn")).json()["syn"]
+        tool = (await root.get_tools())["syn_getResource0"]
+        client = app.state.clients[0]
+        pool, client.pool = client.pool, httpx.MockTransport(lambda request: None)
+        fallback = client.pool_stats()  # no httpcore pool to inspect
+        client.pool = pool
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return stats, tool._timeout, fallback
+
+    stats, timeout, fallback = asyncio.run(run())
+    assert peak == 1
+    assert stats["requests"] == 3
+    assert stats["max_in_flight"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["max_connections"] == 4
+    assert stats["single_flight"] is None  # off unless configured
+    assert stats["connections"] == stats["idle_connections"] == 0  # requests are mocked
+    assert fallback["connections"] == fallback["idle_connections"] == "unavailable"
+    assert timeout.read == 7
+    assert timeout.connect == 2
+
+
+def test_upstream_pool_uses_http2_when_configured():
+    from utils.http_utils import make_upstream_client
+
+    async def run() -> list[bool]:
+        clients = [
+            make_upstream_client({"apiBaseUrl": "https://upstream.test", **extra}, "syn")
+            for extra in ({"http": {"http2": True}}, {})
+        ]
+        enabled = [client.pool._pool._http2 for client in clients]
+        for client in clients:
+            await client.aclose()
+        return enabled
+
+    assert asyncio.run(run()) == [True, False]
+
+
+def test_response_cache_serves_hits_and_revalidates_stale(tmp_path, httpx_mock):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    cfg = {
+        "swagger": [
+            {
+                "path": str(spec_path),
+                "apiBaseUrl": "http://upstream.test",
+                "prefix": "syn",
+                "cache": {
+                    "ttl": 0.2,
+                    "stale_while_revalidate": 30,
+                    "operations": {"getResource2": {"ttl": 0}},
+                },
+            }
+        ],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    calls: dict[str, int] = {}
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        calls[request.url.path] = calls.get(request.url.path, 0) + 1
+        return httpx.Response(200, json={"version": calls[request.url.path]})
+
+    httpx_mock.add_callback(upstream, url="http://upstream.test/resource0/1", is_reusable=True)
+    httpx_mock.add_callback(upstream, url="http://upstream.test/resource1/1", is_reusable=True)
+
+    async def run() -> tuple[list[str], dict]:
+        app = await server.create_app(cfg)
+        root = app.state.root_server
+
+        async def call(name: str) -> str:
+            return (await root._call_tool(name, {"id": 1}))[0].text
+
+        seen = [await call("syn_getResource0"), await call("syn_getResource0")]
+        await asyncio.sleep(0.25)
+        seen.append(await call("syn_getResource0"))  # stale, refreshed in background
+        await asyncio.sleep(0.05)
+        seen.append(await call("syn_getResource0"))
+        await call("syn_getResource2")
+        await call("syn_getResource2")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            stats = (await client.get("/cache-stats?prefix=syn")).json()["syn"]
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return seen, stats
+
+    seen, stats = asyncio.run(run())
+    versions = [json.loads(text)["version"] for text in seen]
+    assert versions == [1, 1, 1, 2]
+    assert calls == {"/resource0/1": 2, "/resource1/1": 2}
+    assert stats["hits"] == 2
+    assert stats["stale_hits"] == 1
+    assert stats["revalidations"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_and_single_flight_accept_true():
+    from utils.http_utils import cache_settings, single_flight_settings
+
+    spec_cfg = {"cache": True, "single_flight": True}
+    assert cache_settings(spec_cfg)["enabled"] is True
+    assert single_flight_settings(spec_cfg)["enabled"] is True
+    assert cache_settings({})["enabled"] is False
+
+
+def test_single_flight_coalesces_identical_concurrent_calls(tmp_path, httpx_mock):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    cfg = {
+        "swagger": [
+            {
+                "path": str(spec_path),
+                "apiBaseUrl": "http://upstream.test",
+                "prefix": "syn",
+                "single_flight": True,
+            }
+        ],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    calls: list[str] = []
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1]})
+
+    httpx_mock.add_callback(upstream, is_reusable=True)
+
+    async def run() -> tuple[list[str], dict]:
+        app = await server.create_app(cfg)
+        root = app.state.root_server
+        results = await asyncio.gather(
+            *(root._call_tool("syn_getResource0", {"id": 1}) for _ in range(5)),
+            root._call_tool("syn_getResource0", {"id": 2}),
+            *(root._call_tool("syn_createResource1", {"name": "a"}) for _ in range(2)),
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            stats = (await client.get("/pool-stats?prefix=syn")).json()["syn"]
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return [result[0].text for result in results[:6]], stats
+
+    texts, stats = asyncio.run(run())
+    assert [json.loads(text)["id"] for text in texts] == ["1"] * 5 + ["2"]
+    # POSTs are never coalesced
+    assert sorted(calls) == [
+        "http://upstream.test/resource0",
+        "http://upstream.test/resource0",
+        "http://upstream.test/resource0/1",
+        "http://upstream.test/resource0/2",
+    ]
+    assert stats["requests"] == 4
+    assert stats["single_flight"] == {
+        "upstream_requests": 2,
+        "deduplicated": 4,
+        "in_flight_keys": 0,
+    }
+
+
+def test_upstream_limits_and_circuit_breaker(tmp_path, httpx_mock):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    cfg = {
+        "swagger": [
+            {
+                "path": str(spec_path),
+                "apiBaseUrl": "http://upstream.test",
+                "prefix": "syn",
+                "limits": {
+                    "rate": 0.01,
+                    "burst": 10,
+                    "operations": {"getResource2": {"rate": 1, "burst": 1}},
+                    "circuit_breaker": {"failure_threshold": 2, "recovery_timeout": 1},
+                },
+            }
+        ],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    statuses = [503, 503, 200]
+    calls: list[str] = []
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/resource0/1":
+            return httpx.Response(statuses.pop(0), json={})
+        return httpx.Response(200, json={})
+
+    httpx_mock.add_callback(upstream, is_reusable=True)
+
+    async def run() -> tuple[list[str], dict]:
+        app = await server.create_app(cfg)
+        root = app.state.root_server
+        errors = []
+
+        async def call(name: str) -> None:
+            try:
+                await root._call_tool(name, {"id": 1})
+            except Exception as exc:
+                errors.append(str(exc))
+
+        await call("syn_getResource2")
+        await call("syn_getResource2")  # over the operation rate limit
+        # the rejected call did not use up a token of the prefix limit
+        prefix_tokens = int(app.state.clients[0].guard.guard.bucket.tokens)
+        for _ in range(3):  # two failures open the circuit, the third is rejected
+            await call("syn_getResource0")
+        await asyncio.sleep(1.05)
+        await call("syn_getResource0")  # half-open probe succeeds
+        stats = app.state.clients[0].pool_stats()["limits"]
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return errors, stats, prefix_tokens
+
+    errors, stats, prefix_tokens = asyncio.run(run())
+    assert prefix_tokens == 9
+    assert calls == ["/resource1/1", "/resource0/1", "/resource0/1", "/resource0/1"]
+    assert "rate limit of 1/s exceeded" in errors[0]
+    assert "circuit open" in errors[3]
+    assert len(errors) == 4
+    assert stats["circuit"] == "closed"
+    assert stats["circuit_opened"] == 1
+    assert stats["rejected"] == {"rate": 1, "in_flight": 0, "circuit": 1}
+
+
+def test_state_sync_propagates_changes_between_workers(tmp_path):
+    import copy
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    extra_path = tmp_path / "extra.json"
+    extra_path.write_text(json.dumps(make_spec(2, title="extra")))
+    cfg = {
+        "swagger": [
+            {"path": str(spec_path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}
+        ],
+        "database": f"sqlite+aiosqlite:///{tmp_path / 'shared.db'}",
+        "sync": {"enabled": True, "poll_interval": 0.05},
+    }
+
+    async def run() -> tuple[dict, dict, bool]:
+        first = await server.create_app(copy.deepcopy(cfg))
+        second = await server.create_app(copy.deepcopy(cfg))
+        transport = httpx.ASGITransport(app=first)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post(
+                "/tool-enabled",
+                json={"prefix": "syn", "name": "syn_getResource0", "enabled": False},
+            )
+            resp = await client.post(
+                "/add-server",
+                json={"path": str(extra_path), "apiBaseUrl": "http://upstream.test", "prefix": "extra"},
+            )
+            assert resp.status_code == 200
+        await asyncio.sleep(0.3)
+        registry = second.state.tool_registry
+        seen = {
+            "syn_getResource0": registry.is_enabled("syn", "syn_getResource0"),
+            "extra": registry.has_prefix("extra"),
+        }
+        transport = httpx.ASGITransport(app=second)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            metrics = (await client.get("/sync")).json()
+        # a worker started later loads the added server and the tool state
+        third = await server.create_app(copy.deepcopy(cfg))
+        late = third.state.tool_registry.has_prefix("extra") and not (
+            third.state.tool_registry.is_enabled("syn", "syn_getResource0")
+        )
+        for app in (first, second, third):
+            await server.routes.close_clients(
+                app.state.clients, app.state.db_session, state_sync=app.state.state_sync
+            )
+        return seen, metrics, late
+
+    seen, metrics, late = asyncio.run(run())
+    assert seen == {"syn_getResource0": False, "extra": True}
+    assert metrics["enabled"] is True
+    assert metrics["mode"] == "poll"
+    assert metrics["applied"] == 2
+    assert late
+
+
+def test_reload_remounts_only_changed_servers(tmp_path):
+    import copy
+    from starlette.routing import Mount
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    def entry(prefix: str, operations: int = 2, **extra) -> dict:
+        path = tmp_path / f"{prefix}.json"
+        path.write_text(json.dumps(make_spec(operations, title=prefix)))
+        return {"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": prefix, **extra}
+
+    cfg = {
+        "swagger": [entry("syn", 4), entry("keep"), entry("gone"), entry("broken")],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    new_cfg = copy.deepcopy(cfg)
+    new_cfg["swagger"] = [
+        {**cfg["swagger"][0], "apiBaseUrl": "http://other.test"},
+        cfg["swagger"][1],
+        {**cfg["swagger"][3], "path": str(tmp_path / "missing.json")},
+        entry("extra"),
+    ]
+    new_cfg["http"] = {"max_connections": 10}
+
+    async def run():
+        app = await server.create_app(copy.deepcopy(cfg))
+        root = app.state.root_server
+        kept = root._mounted_servers["keep"].server
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            report = (await client.post("/reload", json=new_cfg)).json()
+            last = (await client.get("/reload")).json()
+            exported = (await client.get("/export-server/extra")).json()
+        mounts = [r.path for r in app.router.routes if isinstance(r, Mount)]
+        state = {
+            "kept_same": root._mounted_servers["keep"].server is kept,
+            "prefixes": sorted(root._mounted_servers),
+            "registry": sorted(app.state.tool_registry.prefixes()),
+            "syn_base": str(root._mounted_servers["syn"].server._client.base_url),
+            "extra_before_root": mounts.index("/extra") < mounts.index(""),
+            "gone_mounted": "/gone" in mounts,
+            "extra_exported": exported.get("info", {}).get("title"),
+        }
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return report, last, state
+
+    report, last, state = asyncio.run(run())
+    assert report["added"] == ["extra"]
+    assert report["removed"] == ["gone"]
+    assert report["changed"] == ["syn", "broken"]
+    assert report["unchanged"] == ["keep"]
+    assert list(report["failed"]) == ["broken"]
+    assert report["restart_required"] == ["http"]
+    assert last == report
+    assert state == {
+        "kept_same": True,
+        "prefixes": ["broken", "extra", "keep", "syn"],
+        "registry": ["broken", "extra", "keep", "syn"],
+        "syn_base": "http://other.test",
+        "extra_before_root": True,
+        "gone_mounted": False,
+        "extra_exported": "extra",
+    }
+
+
+def test_reload_rejects_malformed_configs(tmp_path):
+    import copy
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    path = tmp_path / "syn.json"
+    path.write_text(json.dumps(make_spec(2, title="syn")))
+    cfg = {
+        "swagger": [{"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+
+    async def run():
+        app = await server.create_app(copy.deepcopy(cfg))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            codes = [
+                (await client.post("/reload", json=body)).status_code
+                for body in ({}, [], 1, {"swagger": {}}, {"swagger": [{"apiBaseUrl": "x"}]})
+            ]
+            last = (await client.get("/reload")).status_code
+        prefixes = sorted(app.state.root_server._mounted_servers)
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return codes, last, prefixes
+
+    codes, last, prefixes = asyncio.run(run())
+    assert codes == [400] * 5
+    assert last == 404  # nothing was applied
+    assert prefixes == ["syn"]
+
+
+def test_reload_keeps_the_config_when_the_source_cannot_be_read(tmp_path, monkeypatch):
+    import copy
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    path = tmp_path / "syn.json"
+    path.write_text(json.dumps(make_spec(2, title="syn")))
+    cfg = {
+        "swagger": [{"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+
+    def failing_get(url):
+        raise httpx.ConnectError("unreachable")
+
+    monkeypatch.setattr(httpx, "get", failing_get)
+
+    async def run():
+        app = await server.create_app(copy.deepcopy(cfg))
+        reloader = app.state.reloader
+        errors = []
+        for source in ("https://example.com/config.json", str(tmp_path / "missing.json")):
+            reloader.config_source = source
+            try:
+                await reloader.reload()
+            except ValueError as exc:
+                errors.append(str(exc))
+        prefixes = sorted(app.state.root_server._mounted_servers)
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return errors, prefixes
+
+    errors, prefixes = asyncio.run(run())
+    assert len(errors) == 2
+    assert prefixes == ["syn"]
+
+
+def test_reload_retries_servers_that_failed_to_load(tmp_path):
+    import copy
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    path = tmp_path / "late.json"
+    cfg = {
+        "swagger": [{"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": "late"}],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+
+    async def run():
+        app = await server.create_app(copy.deepcopy(cfg))
+        before = sorted(app.state.root_server._mounted_servers)
+        path.write_text(json.dumps(make_spec(2, title="late")))
+        report = await app.state.reloader.reload(copy.deepcopy(cfg))
+        after = sorted(app.state.root_server._mounted_servers)
+        configured = [spec_cfg["prefix"] for spec_cfg in app.state.reloader.cfg["swagger"]]
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return before, report, after, configured
+
+    before, report, after, configured = asyncio.run(run())
+    assert before == []
+    assert report["added"] == ["late"]
+    assert report["unchanged"] == []
+    assert after == ["late"]
+    assert configured == ["late"]
+
+
+def test_concurrent_reloads_save_configs_in_the_order_applied(tmp_path, monkeypatch):
+    import copy
+    import hot_reload
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    path = tmp_path / "syn.json"
+    path.write_text(json.dumps(make_spec(2, title="syn")))
+    cfg = {
+        "swagger": [{"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    saved: list[str] = []
+
+    async def slow_first_save(db_session, new_cfg: dict) -> None:
+        if not saved and new_cfg["swagger"][0]["apiBaseUrl"] == "http://first.test":
+            await asyncio.sleep(0.05)
+        saved.append(new_cfg["swagger"][0]["apiBaseUrl"])
+
+    monkeypatch.setattr(hot_reload, "save_config_to_db", slow_first_save)
+
+    def with_base(base: str) -> dict:
+        new_cfg = copy.deepcopy(cfg)
+        new_cfg["swagger"][0]["apiBaseUrl"] = base
+        return new_cfg
+
+    async def run():
+        app = await server.create_app(copy.deepcopy(cfg))
+        reloader = app.state.reloader
+        await asyncio.gather(
+            reloader.reload(with_base("http://first.test")),
+            reloader.reload(with_base("http://second.test")),
+        )
+        base = str(app.state.root_server._mounted_servers["syn"].server._client.base_url)
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return base
+
+    assert asyncio.run(run()) == "http://second.test"
+    assert saved == ["http://first.test", "http://second.test"]
+
+
+def test_reload_keeps_lazy_servers_lazy(tmp_path):
+    import copy
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    def entry(prefix: str, **extra) -> dict:
+        path = tmp_path / f"{prefix}.json"
+        path.write_text(json.dumps(make_spec(3, title=prefix)))
+        return {"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": prefix, **extra}
+
+    cfg = {
+        "swagger": [entry("lazy", lazy=True), entry("gone", lazy=True)],
+        "database": "sqlite+aiosqlite:///:memory:",
+    }
+    new_cfg = copy.deepcopy(cfg)
+    new_cfg["swagger"] = [
+        {**cfg["swagger"][0], "apiBaseUrl": "http://other.test"},
+        entry("added", lazy=True),
+    ]
+
+    async def run():
+        app = await server.create_app(copy.deepcopy(cfg))
+        await app.state.reloader.reload(new_cfg)
+        root = app.state.root_server
+        lazy_servers = app.state.lazy_servers
+        state = {
+            prefix: (
+                isinstance(root._mounted_servers[prefix].server, server.LazyOpenAPIServer),
+                root._mounted_servers[prefix].server.is_built,
+                root._mounted_servers[prefix].server in lazy_servers,
+            )
+            for prefix in ("lazy", "added")
+        }
+        state["lazy_servers"] = len(lazy_servers)
+        state["registered"] = sorted(app.state.tool_registry._loaders)
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return state
+
+    assert asyncio.run(run()) == {
+        "lazy": (True, False, True),
+        "added": (True, False, True),
+        "lazy_servers": 2,
+        "registered": ["added", "lazy"],
+    }
+
+
+
+def test_lazy_server_mounted_at_runtime_is_evicted(tmp_path):
+    import copy
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    def entry(prefix: str, **extra) -> dict:
+        path = tmp_path / f"{prefix}.json"
+        path.write_text(json.dumps(make_spec(3, title=prefix)))
+        return {"path": str(path), "apiBaseUrl": "http://upstream.test", "prefix": prefix, **extra}
+
+    cfg = {"swagger": [entry("eager")], "database": "sqlite+aiosqlite:///:memory:"}
+    new_cfg = copy.deepcopy(cfg)
+    new_cfg["swagger"].append(entry("added", lazy=True, idle_timeout=0.5))
+
+    async def run() -> tuple[bool, bool]:
+        app = await server.create_app(copy.deepcopy(cfg))
+        await app.router.startup()
+        try:
+            await app.state.reloader.reload(new_cfg)
+            added = app.state.root_server._mounted_servers["added"].server
+            await added.materialize()
+            built = added.is_built
+            await asyncio.sleep(2.0)  # idle for 0.5s, the loop checks every second
+            return built, added.is_built
+        finally:
+            await app.router.shutdown()
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_metrics_endpoint_reports_tool_upstream_and_admin_metrics(tmp_path, httpx_mock):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    cfg = {
+        "swagger": [
+            {"path": str(spec_path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}
+        ],
+        "database": "sqlite+aiosqlite:///:memory:",
+        "write_behind": {"enabled": True},
+    }
+    httpx_mock.add_response(url="http://upstream.test/resource0/1", json={"id": 1})
+    httpx_mock.add_response(url="http://upstream.test/resource0/2", status_code=503)
+
+    async def run() -> str:
+        app = await server.create_app(cfg)
+        root = app.state.root_server
+        await root._call_tool("syn_getResource0", {"id": 1})
+        with pytest.raises(Exception):
+            await root._call_tool("syn_getResource0", {"id": 2})
+        for name in ("syn_madeUp1", "syn_madeUp2"):
+            with pytest.raises(Exception):
+                await root._call_tool(name, {})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/list-tools")
+            await client.post(
+                "/tool-enabled",
+                json={"prefix": "syn", "name": "syn_getResource0", "enabled": True},
+            )
+            await app.state.status_queue.close()
+            response = await client.get("/metrics")
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        return response.text
+
+    text = asyncio.run(run())
+    assert 'mcp_tool_calls_total{prefix="syn",tool="getResource0",status="ok"} 1' in text
+    assert 'mcp_tool_calls_total{prefix="syn",tool="getResource0",status="error"} 1' in text
+    assert 'mcp_tool_call_duration_seconds_count{prefix="syn",tool="getResource0"} 2' in text
+    assert 'mcp_tool_calls_total{prefix="syn",tool="__unknown__",status="error"} 2' in text
+    assert "madeUp" not in text
+    assert 'mcp_upstream_responses_total{prefix="syn",code="503"} 1' in text
+    assert 'mcp_http_requests_total{method="GET",route="/list-tools",status="200"} 1' in text
+    assert 'mcp_http_request_duration_seconds_bucket{method="POST",route="/tool-enabled",le="+Inf"} 1' in text
+    assert 'mcp_db_query_duration_seconds_count{statement="SELECT"}' in text
+    assert 'mcp_startup_phase_seconds{phase="mount"}' in text
+    assert "mcp_status_queue_enqueued_total 1" in text
+    assert "mcp_status_queue_flushes_total 1" in text
+    assert "mcp_status_queue_depth 0" in text
+    assert 'mcp_status_queue_flush_seconds{stat="max"}' in text
+
+
+def test_tracing_propagates_w3c_context_and_exports_spans(tmp_path, httpx_mock):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+    from fastmcp_server import tracing
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    trace_file = tmp_path / "traces.jsonl"
+    cfg = {
+        "swagger": [
+            {"path": str(spec_path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}
+        ],
+        "database": "sqlite+aiosqlite:///:memory:",
+        "tracing": {"exporter": "file", "path": str(trace_file)},
+    }
+    upstream_headers: list[str] = []
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        upstream_headers.append(request.headers["traceparent"])
+        return httpx.Response(200, json={"id": 1})
+
+    httpx_mock.add_callback(upstream, is_reusable=True)
+    incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+    async def run() -> None:
+        app = await server.create_app(cfg)
+        tracer = app.state.tracer
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post(
+                "/tool-enabled",
+                json={"prefix": "syn", "name": "syn_getResource0", "enabled": True},
+                headers={"traceparent": incoming},
+            )
+        with tracer.span("mcp.sse_session", "server"):
+            await app.state.root_server._call_tool("syn_getResource0", {"id": 1})
+        await tracer.close()
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+
+    asyncio.run(run())
+    spans = [
+        span
+        for line in trace_file.read_text().splitlines()
+        for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    by_name = {span["name"]: span for span in spans}
+    admin = by_name["POST /tool-enabled"]
+    assert admin["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert admin["parentSpanId"] == "00f067aa0ba902b7"
+    db_spans = [
+        span
+        for span in spans
+        if span["name"].startswith("db.") and span["traceId"] == admin["traceId"]
+    ]
+    assert db_spans and all(span["parentSpanId"] == admin["spanId"] for span in db_spans)
+
+    session, call, http = by_name["mcp.sse_session"], by_name["mcp.call_tool"], by_name["HTTP GET"]
+    assert call["parentSpanId"] == session["spanId"]
+    assert http["parentSpanId"] == call["spanId"]
+    assert {"key": "mcp.tool", "value": {"stringValue": "getResource0"}} in call["attributes"]
+    assert upstream_headers == [f"00-{http['traceId']}-{http['spanId']}-01"]
+
+    unsampled = tracing.Tracer(tracing.FileSpanExporter(str(trace_file)), sample_ratio=0.0)
+    with unsampled.span("root") as root:
+        assert not root.is_recording
+    assert unsampled.stats()["queued_spans"] == 0
+    assert tracing.parse_traceparent(incoming).sampled
+    assert tracing.parse_traceparent("00-xyz-00f067aa0ba902b7-01") is None
+
+
+def test_bench_server_reports_every_measurement(monkeypatch):
+    import argparse
+    from sse_starlette.sse import AppStatus
+    from fastmcp_server.benchmarks import bench_server
+
+    assert bench_server.latency_summary([]) == {
+        "count": 0, "p50_ms": None, "p99_ms": None, "max_ms": None
+    }
+    assert bench_server.latency_summary([0.003, 0.001, 0.002]) == {
+        "count": 3, "p50_ms": 2.0, "p99_ms": 3.0, "max_ms": 3.0
+    }
+    args = argparse.Namespace(
+        operations=[6],
+        requests=3,
+        toggle_rounds=2,
+        sessions=2,
+        duration=0.2,
+        spec="simple",
+        latency=0.0,
+        jitter=0.0,
+        payload_size=None,
+        error_rate=0.0,
+    )
+
+    # sse-starlette keeps an event bound to the loop of an earlier SSE test
+    monkeypatch.setattr(AppStatus, "should_exit_event", None)
+    report = asyncio.run(bench_server.run(args))
+    assert report["settings"]["sessions"] == 2
+    [result] = report["results"]
+    assert result["operations"] == result["tools"] == 6
+    assert result["startup"]["cold_seconds"] > 0
+    assert "mount" in result["startup"]["warm_phases"]
+    assert result["list_tools"]["count"] == result["search"]["count"] == 3
+    assert result["bulk_toggle"]["count"] == 2
+    assert result["sse"]["connect"]["count"] == 2
+    assert result["tool_calls"]["count"] > 0
+    assert result["tool_calls"]["errors"] == 0
+    assert result["backend"]["requests"] == result["tool_calls"]["count"]
+
+
+def test_realistic_spec_against_mock_backend(tmp_path):
+    from fastmcp_server.benchmarks.mock_backend import MockBackend
+    from fastmcp_server.benchmarks.synthetic import make_realistic_spec
+
+    spec = make_realistic_spec(30, title="syn", depth=3)
+    assert make_realistic_spec(30, title="syn", depth=3) == spec
+    schemas = spec["components"]["schemas"]
+    assert schemas["CustomerLevel2"]["properties"]["children"]["items"] == {
+        "$ref": "#/components/schemas/CustomerLevel3"
+    }
+    assert "/v1/accounts/customers/{customerId}/details/{detailCode}" in spec["paths"]
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(spec))
+
+    async def run(error_rate: float):
+        backend = await MockBackend(spec, payload_size=4000, error_rate=error_rate).start()
+        cfg = {
+            "swagger": [{"path": str(spec_path), "apiBaseUrl": backend.url, "prefix": "syn"}],
+            "database": "sqlite+aiosqlite:///:memory:",
+        }
+        app = await server.create_app(cfg)
+        try:
+            tools = await app.state.root_server.get_tools()
+            result = await app.state.root_server._call_tool("syn_getCustomer", {"customerId": 7})
+            return len(tools), json.loads(result[0].text), backend.stats()
+        finally:
+            await server.routes.close_clients(app.state.clients, app.state.db_session)
+            await backend.close()
+
+    count, body, stats = asyncio.run(run(0.0))
+    assert count == 30
+    assert body["address"]["location"] == {"lat": 1.5, "lng": 1.5}
+    assert len(json.dumps(body)) >= 4000
+    assert stats == {"requests": 1, "errors": 0}
+    with pytest.raises(Exception):
+        asyncio.run(run(1.0))
+
+
+def test_streamable_http_serves_root_and_prefix(tmp_path, httpx_mock):
+    from fastmcp_server.benchmarks.synthetic import make_spec
+
+    spec_path = tmp_path / "syn.json"
+    spec_path.write_text(json.dumps(make_spec(4, title="syn")))
+    httpx_mock.add_response(json={"id": 7}, is_reusable=True)
+    headers = {"accept": "application/json, text/event-stream"}
+    initialize = {
+        "jsonrpc": "2.0",
+        "id": 0,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2025-03-26",
+            "capabilities": {},
+            "clientInfo": {"name": "test", "version": "1"},
+        },
+    }
+
+    initialized = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+    def call(tool: str) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tools/call",
+            "params": {"name": tool, "arguments": {"id": 7}},
+        }
+
+    async def run(session_model: str) -> dict:
+        cfg = {
+            "swagger": [
+                {"path": str(spec_path), "apiBaseUrl": "http://upstream.test", "prefix": "syn"}
+            ],
+            "database": "sqlite+aiosqlite:///:memory:",
+            "streamable_http": {"session_model": session_model, "json_response": True},
+        }
+        app = await server.create_app(cfg)
+        transport = httpx.ASGITransport(app=app)
+        results = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post(
+                "/tool-enabled",
+                json={"prefix": "syn", "name": "syn_getResource0", "enabled": True},
+            )
+            for path, tool in (("/mcp", "syn_getResource0"), ("/syn/mcp", "getResource0")):
+                response = await client.post(path, json=initialize, headers=headers)
+                assert response.status_code == 200
+                session_id = response.headers.get("mcp-session-id")
+                session = headers
+                if session_id:
+                    session = {**headers, "mcp-session-id": session_id}
+                    await client.post(path, json=initialized, headers=session)
+                response = await client.post(path, json=call(tool), headers=session)
+                assert response.status_code == 200
+                results[path] = (session_id, response.json()["result"])
+            results["stats"] = (await client.get("/transports")).json()["streamable_http"]
+        await app.state.http_transports.close()
+        await server.routes.close_clients(app.state.clients, app.state.db_session)
+        return results
+
+    stateless = asyncio.run(run("stateless"))
+    for path in ("/mcp", "/syn/mcp"):
+        session_id, result = stateless[path]
+        assert session_id is None
+        assert json.loads(result["content"][0]["text"]) == {"id": 7}
+    assert stateless["stats"]["servers"]["syn"]["sessions"] == 0
+
+    resumable = asyncio.run(run("resumable"))
+    assert all(resumable[path][0] for path in ("/mcp", "/syn/mcp"))
+    assert resumable["stats"]["servers"][""]["sessions"] == 1
+    assert resumable["stats"]["servers"]["syn"]["sessions"] == 1
+
+    # resumable sessions are not shared between workers
+    several = {"server": {"workers": 2}, "streamable_http": {"session_model": "resumable"}}
+    with pytest.raises(ValueError):
+        server.streamable_http_from_config(several)
+    several["streamable_http"]["session_model"] = "stateless"
+    assert server.streamable_http_from_config(several) is not None
@@ -0,0 +1,525 @@
+"""Request tracing with W3C trace context, exported in the OTLP JSON format.
+
+Spans follow the OpenTelemetry data model (trace and span ids, kind,
+attributes, status) and are exported as OTLP/JSON ``ExportTraceServiceRequest``
+documents, either appended to a local file (one document per line, like the
+collector's file exporter) or POSTed to an OTLP/HTTP endpoint.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, NamedTuple
+
+import httpx
+from fastmcp import FastMCP
+from fastmcp.utilities.types import MCPContent
+from mcp.server.lowlevel.server import request_ctx
+from sqlalchemy import event
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+DEFAULT_SERVICE_NAME = "swagger-mcp-server"
+DEFAULT_TRACE_FILE = "traces.jsonl"
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318"
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_MAX_QUEUE_SIZE = 2048
+DEFAULT_FLUSH_INTERVAL = 5.0
+# Longest db.statement attribute kept on a span
+MAX_STATEMENT_LENGTH = 1000
+
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+
+class SpanContext(NamedTuple):
+    trace_id: str  # 32 hex digits
+    span_id: str  # 16 hex digits
+    sampled: bool
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    """Parse a W3C ``traceparent`` header; return ``None`` if it is invalid."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    if version == "00" and len(parts) != 4:
+        return None
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id.lower(), span_id.lower(), sampled)
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+class Span:
+    """A timed operation; recorded only when its trace is sampled."""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "context",
+        "parent_id",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+        "status_message",
+    )
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        name: str,
+        context: SpanContext,
+        parent_id: str | None,
+        kind: str,
+        attributes: dict[str, Any] | None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = "unset"
+        self.status_message = ""
+
+    @property
+    def is_recording(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.context.sampled:
+            self.attributes[key] = value
+
+    def set_status(self, status: str, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        if self.context.sampled:
+            self.attributes["exception.type"] = type(exc).__name__
+            self.attributes["exception.message"] = str(exc)
+            self.set_status("error", str(exc))
+
+    def end(self) -> None:
+        if self.end_ns or not self.context.sampled:
+            return
+        self.end_ns = time.time_ns()
+        self.tracer._on_end(self)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def otlp_request(spans: list[Span], service_name: str) -> dict:
+    """Encode ``spans`` as an OTLP/JSON ``ExportTraceServiceRequest``."""
+    encoded = []
+    for span in spans:
+        item = {
+            "traceId": span.context.trace_id,
+            "spanId": span.context.span_id,
+            "name": span.name,
+            "kind": SPAN_KINDS[span.kind],
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "status": {"code": STATUS_CODES[span.status]},
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        if span.status_message:
+            item["status"]["message"] = span.status_message
+        encoded.append(item)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": encoded}],
+            }
+        ]
+    }
+
+
+class FileSpanExporter:
+    """Append one OTLP/JSON document per export to ``path``."""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE):
+        self.path = path
+
+    def _write(self, line: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def export(self, document: dict) -> None:
+        await asyncio.to_thread(self._write, json.dumps(document, separators=(",", ":")))
+
+    async def close(self) -> None:
+        pass
+
+
+class OTLPHttpExporter:
+    """POST OTLP/JSON documents to ``{endpoint}/v1/traces``."""
+
+    def __init__(
+        self,
+        endpoint: str = DEFAULT_OTLP_ENDPOINT,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10.0,
+    ):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self._client = httpx.AsyncClient(headers=headers, timeout=timeout)
+
+    async def export(self, document: dict) -> None:
+        response = await self._client.post(self.url, json=document)
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class Tracer:
+    """Create spans, decide sampling and export finished spans in batches.
+
+    Sampling is parent based: a span follows the decision of its parent
+    (local or from an incoming ``traceparent``), and new traces are sampled
+    with probability ``sample_ratio`` based on their trace id, so every
+    service that uses the same rule keeps or drops a trace as a whole.
+    Unsampled spans only carry ids for propagation and are never buffered.
+    Finished spans are buffered (at most ``max_queue_size``, oldest dropped)
+    and exported every ``flush_interval`` seconds or once ``batch_size`` are
+    waiting.
+    """
+
+    def __init__(
+        self,
+        exporter: FileSpanExporter | OTLPHttpExporter,
+        sample_ratio: float = 1.0,
+        service_name: str = DEFAULT_SERVICE_NAME,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.exporter = exporter
+        self.sample_ratio = min(1.0, max(0.0, sample_ratio))
+        self._sample_bound = int(self.sample_ratio * (1 << 64))
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque[Span] = deque(maxlen=max_queue_size)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.started_spans = 0
+        self.exported_spans = 0
+        self.dropped_spans = 0
+        self.export_errors = 0
+
+    def _sampled(self, trace_id: str) -> bool:
+        # the lower 64 bits of the trace id, as OpenTelemetry's ratio sampler does
+        return int(trace_id[16:], 16) < self._sample_bound
+
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: dict[str, Any] | None = None,
+        parent: SpanContext | None = None,
+    ) -> Span:
+        """Start a span under ``parent`` or the current span without activating it."""
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        if parent is None:
+            trace_id = secrets.token_hex(16)
+            sampled = self._sampled(trace_id)
+            parent_id = None
+        else:
+            trace_id, parent_id, sampled = parent
+        self.started_spans += 1
+        context = SpanContext(trace_id, secrets.token_hex(8), sampled)
+        return Span(self, name, context, parent_id, kind, attributes)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: dict[str, Any] | None = None,
+        parent: SpanContext | None = None,
+    ) -> Iterator[Span]:
+        """Run the block in a new current span, recording any exception."""
+        span = self.start_span(name, kind, attributes, parent)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _on_end(self, span: Span) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped_spans += 1
+        self._queue.append(span)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Export every buffered span."""
+        while self._queue:
+            count = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(count)]
+            try:
+                await self.exporter.export(otlp_request(batch, self.service_name))
+            except Exception as exc:
+                self.export_errors += 1
+                self.dropped_spans += len(batch)
+                logger.warning("Failed to export %d spans: %s", len(batch), exc)
+                return
+            self.exported_spans += len(batch)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await self.exporter.close()
+
+    def stats(self) -> dict:
+        return {
+            "sample_ratio": self.sample_ratio,
+            "started_spans": self.started_spans,
+            "queued_spans": len(self._queue),
+            "exported_spans": self.exported_spans,
+            "dropped_spans": self.dropped_spans,
+            "export_errors": self.export_errors,
+        }
+
+    def instrument_server(self, server: FastMCP, prefix: str) -> None:
+        """Trace every tool call handled by the mounted ``server``.
+
+        The parent is the ``traceparent`` in the request's ``_meta``, else
+        the one sent with the HTTP request that carried the call (an SSE
+        message post or a streamable HTTP request), else the current span,
+        which for SSE is the session span.
+        """
+        call_tool = server._call_tool
+
+        async def traced_call_tool(key: str, arguments: dict[str, Any]) -> list[MCPContent]:
+            parent = None
+            try:
+                context = request_ctx.get()
+            except LookupError:
+                context = None
+            if context is not None:
+                value = getattr(context.meta, TRACEPARENT, None) if context.meta else None
+                if value is None and context.request is not None:
+                    value = context.request.headers.get(TRACEPARENT)
+                parent = parse_traceparent(value)
+            with self.span(
+                "mcp.call_tool",
+                attributes={"mcp.prefix": prefix, "mcp.tool": key},
+                parent=parent,
+            ):
+                return await call_tool(key, arguments)
+
+        server._call_tool = traced_call_tool
+
+    def instrument_engine(self, engine) -> None:
+        """Record a client span for every statement run on ``engine``."""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        system = sync_engine.dialect.name
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+            span = self.start_span(
+                f"db.{operation}",
+                kind="client",
+                attributes={
+                    "db.system": system,
+                    "db.operation": operation,
+                    "db.statement": statement[:MAX_STATEMENT_LENGTH],
+                },
+            )
+            conn.info.setdefault("trace_spans", []).append(span)
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            conn.info["trace_spans"].pop().end()
+
+        @event.listens_for(sync_engine, "handle_error")
+        def failed(context):
+            spans = context.connection.info.get("trace_spans") if context.connection else None
+            if spans:
+                span = spans.pop()
+                span.record_exception(context.original_exception)
+                span.end()
+
+
+class TracingMiddleware:
+    """Open a server span for each HTTP request, continuing an incoming ``traceparent``.
+
+    A ``GET .../sse`` span lasts as long as the MCP session, so the tool
+    calls of the session become its children. Other requests are named after
+    the FastAPI route that handled them.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        path = scope["path"]
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        session = method == "GET" and path.endswith("/sse")
+        name = "mcp.sse_session" if session else f"{method} {path}"
+        attributes = {"http.request.method": method, "url.path": path}
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with self.tracer.span(name, "server", attributes, parent) as span:
+            await self.app(scope, receive, send_with_status)
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{method} {route.path}"
+                span.set_attribute("http.route", route.path)
+            span.set_attribute("http.response.status_code", status)
+            if status >= 500:
+                span.set_status("error")
+
+
+def collector_app(exporter: FileSpanExporter) -> Starlette:
+    """OTLP/HTTP receiver that hands every JSON export to ``exporter``.
+
+    Stands in for an OpenTelemetry collector in local runs and benchmarks.
+    """
+
+    async def receive_traces(request: Request) -> JSONResponse:
+        if not request.headers.get("content-type", "").startswith("application/json"):
+            return JSONResponse({"error": "only OTLP/JSON is supported"}, status_code=415)
+        await exporter.export(await request.json())
+        return JSONResponse({"partialSuccess": {}})
+
+    return Starlette(routes=[Route("/v1/traces", receive_traces, methods=["POST"])])
+
+
+def tracer_from_config(cfg: dict) -> Tracer | None:
+    """Return a :class:`Tracer` for ``cfg["tracing"]``, or ``None`` if tracing is off.
+
+    The section enables tracing unless it sets ``"enabled": false``.
+    """
+    section = cfg.get("tracing")
+    if not section or not section.get("enabled", True):
+        return None
+    exporter_name = section.get("exporter", "file")
+    if exporter_name == "otlp":
+        exporter = OTLPHttpExporter(
+            section.get("endpoint")
+            or os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", DEFAULT_OTLP_ENDPOINT),
+            section.get("headers"),
+        )
+    elif exporter_name == "file":
+        exporter = FileSpanExporter(section.get("path", DEFAULT_TRACE_FILE))
+    else:
+        raise ValueError(f"unknown tracing exporter: {exporter_name}")
+    return Tracer(
+        exporter,
+        sample_ratio=float(section.get("sample_ratio", 1.0)),
+        service_name=section.get("service_name", DEFAULT_SERVICE_NAME),
+        batch_size=int(section.get("batch_size", DEFAULT_BATCH_SIZE)),
+        max_queue_size=int(section.get("max_queue_size", DEFAULT_MAX_QUEUE_SIZE)),
+        flush_interval=float(section.get("flush_interval", DEFAULT_FLUSH_INTERVAL)),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Receive OTLP/JSON traces into a file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--path", default=DEFAULT_TRACE_FILE)
+    args = parser.parse_args()
+    uvicorn.run(collector_app(FileSpanExporter(args.path)), host=args.host, port=args.port)
@@ -0,0 +1,237 @@
+"""Streamable HTTP transport for the root server and each mounted prefix."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import uuid
+from collections import OrderedDict, deque
+
+from fastmcp import FastMCP
+from mcp.server.streamable_http import (
+    EventCallback,
+    EventId,
+    EventMessage,
+    EventStore,
+    StreamId,
+)
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from mcp.types import JSONRPCMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_PATH = "/mcp"
+SESSION_MODELS = ("stateless", "resumable")
+DEFAULT_MAX_EVENTS = 100  # per stream
+DEFAULT_MAX_STREAMS = 10_000
+
+DEFAULT_STREAMABLE_HTTP_SETTINGS = {
+    "enabled": True,
+    "path": DEFAULT_HTTP_PATH,
+    "session_model": "stateless",
+    "json_response": False,
+    "max_events": DEFAULT_MAX_EVENTS,
+    "max_streams": DEFAULT_MAX_STREAMS,
+}
+
+
+class InMemoryEventStore(EventStore):
+    """Keep the last ``max_events`` messages of each stream for resumption.
+
+    A client that reconnects with ``Last-Event-ID`` gets the messages it
+    missed replayed. At most ``max_streams`` streams are kept; the least
+    recently written one is dropped first.
+    """
+
+    def __init__(
+        self, max_events: int = DEFAULT_MAX_EVENTS, max_streams: int = DEFAULT_MAX_STREAMS
+    ):
+        self.max_events = max_events
+        self.max_streams = max_streams
+        self._streams: OrderedDict[StreamId, deque[tuple[EventId, JSONRPCMessage]]]
+        self._streams = OrderedDict()
+        self._index: dict[EventId, StreamId] = {}
+
+    async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
+        event_id = uuid.uuid4().hex
+        events = self._streams.get(stream_id)
+        if events is None:
+            events = self._streams[stream_id] = deque()
+            while len(self._streams) > self.max_streams:
+                _, dropped = self._streams.popitem(last=False)
+                for dropped_id, _ in dropped:
+                    self._index.pop(dropped_id, None)
+        else:
+            self._streams.move_to_end(stream_id)
+        if len(events) >= self.max_events:
+            dropped_id, _ = events.popleft()
+            self._index.pop(dropped_id, None)
+        events.append((event_id, message))
+        self._index[event_id] = stream_id
+        return event_id
+
+    async def replay_events_after(
+        self, last_event_id: EventId, send_callback: EventCallback
+    ) -> StreamId | None:
+        stream_id = self._index.get(last_event_id)
+        if stream_id is None:
+            return None
+        found = False
+        for event_id, message in list(self._streams.get(stream_id, ())):
+            if found:
+                await send_callback(EventMessage(message, event_id))
+            elif event_id == last_event_id:
+                found = True
+        return stream_id
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class StreamableHTTPApp:
+    """ASGI app serving one FastMCP server over the streamable HTTP transport.
+
+    With the ``stateless`` session model every request is handled on its
+    own and nothing is kept between requests. ``resumable`` keeps a session
+    per ``Mcp-Session-Id`` and stores the messages of its streams in an
+    :class:`InMemoryEventStore`, so a dropped stream can be resumed.
+
+    The session manager is started on the first request, in a context of its
+    own so its sessions do not inherit the state of that request.
+    """
+
+    def __init__(
+        self,
+        server: FastMCP,
+        session_model: str = "stateless",
+        json_response: bool = False,
+        max_events: int = DEFAULT_MAX_EVENTS,
+        max_streams: int = DEFAULT_MAX_STREAMS,
+    ):
+        if session_model not in SESSION_MODELS:
+            raise ValueError(f"unknown session model: {session_model}")
+        self.session_model = session_model
+        self.event_store = (
+            InMemoryEventStore(max_events, max_streams) if session_model == "resumable" else None
+        )
+        self.manager = StreamableHTTPSessionManager(
+            app=server._mcp_server,
+            event_store=self.event_store,
+            json_response=json_response,
+            stateless=session_model == "stateless",
+        )
+        self.requests = 0
+        self._lock = asyncio.Lock()
+        self._stop: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self._task is None:
+            await self.start()
+        self.requests += 1
+        await self.manager.handle_request(scope, receive, send)
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._task is not None:
+                return
+            loop = asyncio.get_running_loop()
+            started = loop.create_future()
+            self._stop = asyncio.Event()
+            self._task = asyncio.create_task(self._run(started), context=contextvars.Context())
+            # fails here if the manager could not be started
+            await asyncio.wait({started, self._task}, return_when=asyncio.FIRST_COMPLETED)
+            if not started.done():
+                task, self._task = self._task, None
+                task.result()
+
+    async def _run(self, started: asyncio.Future) -> None:
+        async with self.manager.run():
+            started.set_result(None)
+            await self._stop.wait()
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await self._task
+        except Exception:
+            logger.exception("Streamable HTTP session manager failed")
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "session_model": self.session_model,
+            "running": self._task is not None,
+            "requests": self.requests,
+            "sessions": len(self.manager._server_instances),
+            "stored_events": len(self.event_store) if self.event_store is not None else 0,
+        }
+
+
+class StreamableHTTPTransports:
+    """The :class:`StreamableHTTPApp` of the root server and of each prefix."""
+
+    def __init__(self, settings: dict):
+        self.settings = settings
+        self.path = settings["path"]
+        self.apps: dict[str | None, StreamableHTTPApp] = {}
+
+    def add(self, prefix: str | None, server: FastMCP) -> StreamableHTTPApp:
+        """Create the app for ``prefix`` (``None`` for the root server)."""
+        app = StreamableHTTPApp(
+            server,
+            self.settings["session_model"],
+            bool(self.settings["json_response"]),
+            int(self.settings["max_events"]),
+            int(self.settings["max_streams"]),
+        )
+        self.apps[prefix] = app
+        return app
+
+    async def remove(self, prefix: str) -> None:
+        app = self.apps.pop(prefix, None)
+        if app is not None:
+            await app.close()
+
+    async def close(self) -> None:
+        for app in self.apps.values():
+            await app.close()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "session_model": self.settings["session_model"],
+            "servers": {prefix or "": app.stats() for prefix, app in self.apps.items()},
+        }
+
+
+def streamable_http_from_config(
+    cfg: dict, workers: int | None = None
+) -> StreamableHTTPTransports | None:
+    """Return the transports for ``cfg["streamable_http"]``, or ``None`` if disabled.
+
+    ``resumable`` sessions live in the process that created them and
+    requests are not forwarded between workers, so that session model is
+    rejected with more than one worker (``workers`` or
+    ``cfg["server"]["workers"]``).
+    """
+    section = cfg.get("streamable_http")
+    if isinstance(section, bool):
+        section = {"enabled": section}
+    settings = {**DEFAULT_STREAMABLE_HTTP_SETTINGS, **(section or {})}
+    if not settings["enabled"]:
+        return None
+    if settings["session_model"] not in SESSION_MODELS:
+        raise ValueError(f"unknown streamable_http session_model: {settings['session_model']}")
+    if workers is None:
+        workers = int((cfg.get("server") or {}).get("workers") or 1)
+    if settings["session_model"] == "resumable" and workers > 1:
+        raise ValueError(
+            "streamable_http session_model 'resumable' needs a single worker; "
+            "use 'stateless' with several workers"
+        )
+    settings["path"] = "/" + settings["path"].strip("/")
+    return StreamableHTTPTransports(settings)
@@ -0,0 +1,198 @@
+"""Caches used by the FastMCP Swagger server."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write ``data`` to ``path`` so readers never observe a partial file."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class SpecCache:
+    """Content-addressed on-disk cache for downloaded OpenAPI specs.
+
+    Specs are stored once per content hash under ``blobs/`` in compact JSON
+    form. A small index entry per URL under ``index/`` records the content
+    hash together with the ``ETag``/``Last-Modified`` validators returned by
+    the upstream so the next fetch can be revalidated with a conditional
+    request. Several processes may share one directory.
+    """
+
+    def __init__(self, directory: str, max_age: float = 0.0):
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(os.path.join(directory, "index"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self.directory, "index", f"{_sha256(url.encode())}.json")
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, "blobs", f"{content_hash}.json")
+
+    def lookup(self, url: str) -> dict | None:
+        """Return the index entry for ``url`` if its blob is still present."""
+        try:
+            with open(self._index_path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._blob_path(entry.get("hash", ""))):
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Return whether ``entry`` can be used without revalidation."""
+        return self.max_age > 0 and time.time() - entry.get("checked", 0) < self.max_age
+
+    def conditional_headers(self, entry: dict) -> dict[str, str]:
+        """Build ``If-None-Match``/``If-Modified-Since`` headers for ``entry``."""
+        headers: dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, content_hash: str) -> dict:
+        """Return the parsed spec stored under ``content_hash``."""
+        with open(self._blob_path(content_hash), "rb") as f:
+            return json.loads(f.read())
+
+    def touch(self, url: str, entry: dict) -> None:
+        """Record that ``entry`` was successfully revalidated just now."""
+        entry = dict(entry, checked=time.time())
+        _atomic_write(self._index_path(url), json.dumps(entry).encode())
+
+    def store(
+        self,
+        url: str,
+        content: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> tuple[str, dict]:
+        """Parse and cache ``content`` downloaded from ``url``.
+
+        Returns the content hash and the parsed spec.
+        """
+        spec = json.loads(content)
+        content_hash = _sha256(content)
+        blob_path = self._blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            compact = json.dumps(spec, separators=(",", ":")).encode()
+            _atomic_write(blob_path, compact)
+        entry = {
+            "url": url,
+            "hash": content_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked": time.time(),
+        }
+        _atomic_write(self._index_path(url), json.dumps(entry).encode())
+        return content_hash, spec
+
+
+def spec_cache_from_config(cfg: dict) -> SpecCache | None:
+    """Create the spec cache configured by ``cfg["spec_cache"]`` or ``SPEC_CACHE_DIR``."""
+    cache_cfg = cfg.get("spec_cache") or {}
+    directory = os.environ.get("SPEC_CACHE_DIR") or cache_cfg.get("dir")
+    if not directory or cache_cfg.get("enabled", True) is False:
+        return None
+    if not os.path.isabs(directory):
+        directory = os.path.join(os.path.dirname(__file__), "../" + directory)
+    return SpecCache(directory, max_age=float(cache_cfg.get("max_age", 0)))
+
+
+class CachedResponse:
+    """Upstream response kept by :class:`ResponseCache` (body as received)."""
+
+    __slots__ = ("status_code", "headers", "content", "fresh_until", "stale_until")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: list[tuple[bytes, bytes]],
+        content: bytes,
+        fresh_until: float,
+        stale_until: float,
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """In-memory LRU of upstream responses with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self.bypassed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float | None = None) -> CachedResponse | None:
+        """Return the entry for ``key`` unless it is past its stale window."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic() if now is None else now
+        if now > entry.stale_until:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "revalidations": self.revalidations,
+            "bypassed": self.bypassed,
+        }
@@ -0,0 +1,140 @@
+"""Tool catalog snapshots for fast warm starts.
+
+Turning an OpenAPI document into ``OpenAPITool`` objects is the most expensive
+part of mounting a spec. A snapshot records the derived tool definitions
+(name, description, input schema, tags and the parsed HTTP route) keyed by the
+hash of the spec so the sub-server can be rebuilt without parsing the spec
+again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import httpx
+from fastmcp.server.openapi import FastMCPOpenAPI, OpenAPITool
+from fastmcp.utilities.openapi import HTTPRoute
+
+from utils.cache_utils import _atomic_write
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the snapshot layout changes so stale snapshots are ignored
+CATALOG_VERSION = 1
+
+_EMPTY_SPEC = {"openapi": "3.0.0", "info": {"title": "catalog", "version": "0"}, "paths": {}}
+
+
+def spec_hash(spec: dict) -> str:
+    """Return a stable hash of ``spec`` used to key catalog snapshots."""
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def snapshot_tools(server: FastMCPOpenAPI) -> list[dict]:
+    """Serialize the OpenAPI tools registered on ``server``."""
+    snapshot: list[dict] = []
+    for tool in server._tool_manager._tools.values():
+        if not isinstance(tool, OpenAPITool):
+            continue
+        snapshot.append(
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters,
+                "tags": sorted(tool.tags),
+                "route": tool._route.model_dump(mode="json", by_alias=True),
+            }
+        )
+    return snapshot
+
+
+def server_from_snapshot(
+    snapshot: list[dict],
+    client: httpx.AsyncClient,
+    name: str | None = None,
+    timeout: float | httpx.Timeout | None = None,
+) -> FastMCPOpenAPI:
+    """Rehydrate a ``FastMCPOpenAPI`` server from a tool snapshot."""
+    server = FastMCPOpenAPI(openapi_spec=_EMPTY_SPEC, client=client, name=name, timeout=timeout)
+    for entry in snapshot:
+        tool = OpenAPITool(
+            client=client,
+            route=HTTPRoute.model_validate(entry["route"]),
+            name=entry["name"],
+            description=entry["description"],
+            parameters=entry["parameters"],
+            tags=set(entry["tags"]),
+            timeout=timeout,
+        )
+        server._tool_manager._tools[tool.name] = tool
+        server._used_names["tool"][tool.name] += 1
+    return server
+
+
+class CatalogStore:
+    """Directory of tool snapshots, one JSON file per spec hash."""
+
+    def __init__(self, directory: str, rebuild: bool = False):
+        self.directory = directory
+        self.rebuild = rebuild
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> list[dict] | None:
+        """Return the snapshot stored for ``key`` unless a rebuild was requested."""
+        if self.rebuild:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != CATALOG_VERSION:
+            return None
+        return data["tools"]
+
+    def save(self, key: str, tools: list[dict]) -> None:
+        """Persist the snapshot for ``key``."""
+        data = {"version": CATALOG_VERSION, "tools": tools}
+        _atomic_write(self._path(key), json.dumps(data, separators=(",", ":")).encode())
+
+
+def catalog_from_config(cfg: dict) -> CatalogStore | None:
+    """Create the catalog store configured by ``cfg["catalog"]`` or ``CATALOG_DIR``."""
+    catalog_cfg = cfg.get("catalog") or {}
+    directory = os.environ.get("CATALOG_DIR") or catalog_cfg.get("dir")
+    if not directory or catalog_cfg.get("enabled", True) is False:
+        return None
+    if not os.path.isabs(directory):
+        directory = os.path.join(os.path.dirname(__file__), "../" + directory)
+    rebuild = bool(catalog_cfg.get("rebuild")) or os.environ.get("REBUILD_CATALOG") == "1"
+    return CatalogStore(directory, rebuild=rebuild)
+
+
+def build_sub_server(
+    spec: dict,
+    client: httpx.AsyncClient,
+    name: str,
+    catalog: CatalogStore | None = None,
+) -> FastMCPOpenAPI:
+    """Build the sub-server for ``spec``, going through ``catalog`` if given.
+
+    This is synchronous and CPU bound; callers run it in a worker thread.
+    """
+    # Tools pass their timeout to every request, so hand them the client's own
+    timeout = client.timeout
+    if catalog is None:
+        return FastMCPOpenAPI(openapi_spec=spec, client=client, name=name, timeout=timeout)
+    key = spec_hash(spec)
+    snapshot = catalog.load(key)
+    if snapshot is not None:
+        logger.info("Loaded %d tools for %s from catalog snapshot", len(snapshot), name)
+        return server_from_snapshot(snapshot, client, name=name, timeout=timeout)
+    server = FastMCPOpenAPI(openapi_spec=spec, client=client, name=name, timeout=timeout)
+    catalog.save(key, snapshot_tools(server))
+    return server
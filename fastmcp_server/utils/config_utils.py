@@ -1,5 +1,6 @@
 """Configuration helpers for the FastMCP Swagger server."""
 
+import copy
 import json
 import logging
 import os
@@ -22,26 +23,47 @@ DEFAULT_CONFIG = {
 }
 
 
-def _load_single_config(source: str) -> dict:
-    """Load a single configuration file or URL."""
-    if source.startswith("http://") or source.startswith("https://"):
+def _is_url(source: str) -> bool:
+    return source.startswith("http://") or source.startswith("https://")
+
+
+def _resolve_path(source: str) -> str:
+    if not os.path.isabs(source):
+        source = os.path.join(os.path.dirname(__file__), source)
+    return source
+
+
+def config_paths(source: str | list[str]) -> list[str]:
+    """Return the local files ``load_config(source)`` reads (URLs are skipped)."""
+    sources = source if isinstance(source, list) else [source]
+    return [_resolve_path(s) for s in sources if not _is_url(s)]
+
+
+def _load_single_config(source: str, strict: bool = False) -> dict:
+    """Load a single configuration file or URL.
+
+    Unless ``strict``, a failed fetch or a missing file yields
+    :data:`DEFAULT_CONFIG`; with ``strict`` the error is raised.
+    """
+    if _is_url(source):
         try:
             resp = httpx.get(source)
             resp.raise_for_status()
             cfg = resp.json()
         except httpx.HTTPError as exc:
+            if strict:
+                raise
             logger.error("Failed to fetch config from %s: %s", source, exc)
-            cfg = DEFAULT_CONFIG
+            cfg = copy.deepcopy(DEFAULT_CONFIG)
     else:
-        if not os.path.isabs(source):
-            source = os.path.join(os.path.dirname(__file__), source)
-        if os.path.exists(source):
+        source = _resolve_path(source)
+        if os.path.exists(source) or strict:
             with open(source, "r", encoding="utf-8") as f:
                 cfg = json.load(f)
         else:
-            cfg = DEFAULT_CONFIG
+            cfg = copy.deepcopy(DEFAULT_CONFIG)
 
-    if isinstance(cfg.get("swagger"), dict):
+    if isinstance(cfg, dict) and isinstance(cfg.get("swagger"), dict):
         cfg["swagger"] = [cfg["swagger"]]
     return cfg
 
@@ -52,20 +74,24 @@ def export_config(cfg: dict, path: str) -> None:
         json.dump(cfg, f, indent=2)
 
 
-def load_config(source: str | list[str] | None = None) -> dict:
-    """Load configuration from one or more paths or URLs."""
+def load_config(source: str | list[str] | None = None, strict: bool = False) -> dict:
+    """Load configuration from one or more paths or URLs.
+
+    With ``strict`` a source that cannot be fetched or read raises instead of
+    falling back to :data:`DEFAULT_CONFIG`.
+    """
     if source is None:
         source = os.environ.get("CONFIG_URL", "config.json")
 
     if isinstance(source, list):
         merged: dict[str, Any] = {"swagger": [], "server": {}}
         for s in source:
-            cfg = load_config(s)
+            cfg = load_config(s, strict)
             merged["swagger"].extend(cfg.get("swagger", []))
             if not merged["server"] and cfg.get("server"):
                 merged["server"] = cfg["server"]
         if not merged["server"]:
-            merged["server"] = DEFAULT_CONFIG["server"]
+            merged["server"] = dict(DEFAULT_CONFIG["server"])
         return merged
 
-    return _load_single_config(source)
+    return _load_single_config(source, strict)
@@ -1,66 +1,77 @@
-"""PostgreSQL helper functions for configuration storage."""
+"""Configuration storage on the async SQLAlchemy engine used by ``db``."""
 
-import json
+import asyncio
 import logging
 
-import psycopg2
-import time
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+import db
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CONNECT_RETRIES = 5
+CONNECT_DELAY = 0.5
+CONNECT_MAX_DELAY = 10.0
+
+
+def async_db_url(url: str) -> str:
+    """Return ``url`` with an async driver (``postgres://`` becomes asyncpg)."""
+    for scheme in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(scheme):
+            return "postgresql+asyncpg://" + url[len(scheme) :]
+    return url
 
 
-def _connect_with_retries(dsn: str, retries: int = 5, delay: float = 1.0):
-    """Try to connect to the database multiple times before failing."""
+async def connect_with_retries(
+    db_url: str,
+    pool: dict | None = None,
+    retries: int = CONNECT_RETRIES,
+    delay: float = CONNECT_DELAY,
+    max_delay: float = CONNECT_MAX_DELAY,
+) -> db.async_sessionmaker:
+    """Create the engine and schema, retrying with exponential backoff.
+
+    The schema (including the config tables) is created once here; the
+    returned sessionmaker is shared by the config store and the tool state.
+    """
     for attempt in range(1, retries + 1):
         try:
-            return psycopg2.connect(dsn)
-        except psycopg2.OperationalError as exc:  # pragma: no cover - network issue
+            return await db.init_db(async_db_url(db_url), pool)
+        except (OSError, OperationalError, InterfaceError) as exc:  # pragma: no cover - network issue
+            if attempt == retries:
+                raise
+            wait = min(delay * 2 ** (attempt - 1), max_delay)
             logger.warning(
-                "Database connection failed (attempt %d/%d): %s",
+                "Database connection failed (attempt %d/%d), retrying in %.1fs: %s",
                 attempt,
                 retries,
+                wait,
                 exc,
             )
-            if attempt == retries:
-                raise
-            time.sleep(delay)
+            await asyncio.sleep(wait)
 
 
-def save_config_to_postgres(cfg: dict, dsn: str, name: str = "default") -> None:
-    """Persist configuration JSON to a PostgreSQL database."""
-    conn = _connect_with_retries(dsn)
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "CREATE TABLE IF NOT EXISTS configs (name TEXT PRIMARY KEY, data JSONB)"
-                )
-                cur.execute(
-                    "INSERT INTO configs (name, data) VALUES (%s, %s) "
-                    "ON CONFLICT (name) DO UPDATE SET data = EXCLUDED.data",
-                    (name, json.dumps(cfg)),
-                )
-    finally:
-        conn.close()
+async def save_config_to_db(
+    session_maker: db.async_sessionmaker, cfg: dict, name: str = "default"
+) -> int:
+    """Persist ``cfg`` as a new config revision and return its version."""
+    async with session_maker() as session:
+        return await db.save_config(session, cfg, name)
 
 
-def load_config_from_postgres(dsn: str, name: str = "default") -> dict | None:
-    """Load configuration JSON from a PostgreSQL database."""
-    conn = _connect_with_retries(dsn)
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "CREATE TABLE IF NOT EXISTS configs (name TEXT PRIMARY KEY, data JSONB)"
-            )
-            cur.execute("SELECT data FROM configs WHERE name=%s", (name,))
-            row = cur.fetchone()
-            if row:
-                data = row[0]
-                if isinstance(data, str):
-                    return json.loads(data)
-                return data
-    finally:
-        conn.close()
-    return None
+async def load_config_from_db(
+    session_maker: db.async_sessionmaker, name: str = "default"
+) -> dict | None:
+    """Load the latest revision of config ``name``.
+
+    A config stored by earlier releases in the unversioned ``configs`` table
+    is copied into the versioned table on first load.
+    """
+    async with session_maker() as session:
+        latest = await db.get_config(session, name)
+        if latest is not None:
+            return latest[1]
+        legacy = await db.get_legacy_config(session, name)
+        if legacy is not None:
+            await db.save_config(session, legacy, name)
+        return legacy
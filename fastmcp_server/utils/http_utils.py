@@ -0,0 +1,850 @@
+"""HTTP clients used to call the upstream APIs behind the generated tools."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from importlib.util import find_spec
+
+import httpcore
+import httpx
+
+from tracing import TRACEPARENT, Tracer, format_traceparent
+
+from utils.cache_utils import CachedResponse, ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the ``http`` section of a swagger entry (or of the whole config)
+DEFAULT_HTTP_SETTINGS = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 5.0,
+    "max_concurrency_per_host": None,
+    "connect_timeout": 10.0,
+    "read_timeout": None,
+    "write_timeout": None,
+    "pool_timeout": None,
+    "http2": False,
+}
+
+
+# Defaults for the ``single_flight`` section of a swagger entry
+DEFAULT_SINGLE_FLIGHT_SETTINGS = {
+    "enabled": False,
+    "methods": ["GET", "HEAD"],
+    "vary_headers": ["authorization", "accept", "accept-language"],
+}
+
+# Defaults for the ``circuit_breaker`` part of the ``limits`` section
+DEFAULT_CIRCUIT_BREAKER_SETTINGS = {
+    "failure_threshold": 5,
+    "recovery_timeout": 30.0,
+    "half_open_max_calls": 1,
+}
+
+# Defaults for the ``cache`` section of a swagger entry
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": False,
+    "ttl": 60.0,
+    "max_entries": 1000,
+    "stale_while_revalidate": 0.0,
+    "vary_headers": ["authorization", "accept", "accept-language"],
+    "operations": {},
+}
+
+CACHEABLE_STATUS = {200, 203, 204, 300, 301, 404, 410}
+_HTTP_METHODS = {"get", "put", "post", "delete", "options", "head", "patch", "trace"}
+
+
+def http_settings(spec_cfg: dict, defaults: dict | None = None) -> dict:
+    """Merge the ``http`` settings of ``spec_cfg`` over ``defaults``."""
+    return {**DEFAULT_HTTP_SETTINGS, **(defaults or {}), **(spec_cfg.get("http") or {})}
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream that runs ``release`` once the response is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class PoolStats:
+    """Request counters of one upstream client."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waiting = 0
+        self.wait_ms_total = 0.0
+        self.status_codes: dict[int, int] = {}
+
+
+class HostLimitTransport(httpx.AsyncBaseTransport):
+    """Cap concurrent requests per host and record pool statistics.
+
+    A slot is held from sending the request until its response is closed,
+    so it also covers reading the body.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int | None = None):
+        self.transport = transport
+        self.max_per_host = max_per_host
+        self.stats = PoolStats()
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        semaphore = None
+        if self.max_per_host:
+            semaphore = self._hosts.get(request.url.host)
+            if semaphore is None:
+                semaphore = self._hosts[request.url.host] = asyncio.Semaphore(self.max_per_host)
+            started = time.perf_counter()
+            stats.waiting += 1
+            try:
+                await semaphore.acquire()
+            finally:
+                stats.waiting -= 1
+            stats.wait_ms_total += (time.perf_counter() - started) * 1000
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                stats.in_flight -= 1
+                if semaphore is not None:
+                    semaphore.release()
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            stats.errors += 1
+            release()
+            raise
+        codes = stats.status_codes
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _cache_control(headers: httpx.Headers) -> dict[str, str | None]:
+    directives: dict[str, str | None] = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _seconds(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def request_key(request: httpx.Request, vary_headers: list[str], body: bool = False) -> str:
+    """Identify ``request`` by method, URL, sorted query and ``vary_headers``.
+
+    The header values (and the body if ``body`` is true) are hashed so
+    credentials are not kept in memory as is.
+    """
+    url = request.url
+    query = "&".join(f"{k}={v}" for k, v in sorted(url.params.multi_items()))
+    digest = hashlib.sha256()
+    for header in vary_headers:
+        digest.update(f"{header}:{request.headers.get(header, '')}\n".encode())
+    if body:
+        digest.update(request.content)
+    return f"{request.method} {url.scheme}://{url.netloc.decode()}{url.path}?{query} {digest.hexdigest()[:32]}"
+
+
+class OperationRules:
+    """Match requests to per-operation settings of a swagger entry.
+
+    ``operations`` maps an ``operationId`` or ``"METHOD /path/{param}"`` to a
+    settings dict; ``spec`` resolves the operation ids to paths.
+    """
+
+    def __init__(self, operations: dict, base_url: str, spec: dict | None = None):
+        self._base_path = httpx.URL(base_url).path.rstrip("/")
+        self._rules: list[tuple[str, re.Pattern, str, dict]] = []
+        for method, path, operation_id in self._spec_operations(spec):
+            for key in (operation_id, f"{method} {path}"):
+                if key in operations:
+                    self._rules.append((method, self._path_pattern(path), key, operations[key]))
+                    break
+        for key, rule in operations.items():
+            method, _, path = key.partition(" ")
+            if path and method.lower() in _HTTP_METHODS:
+                self._rules.append((method.upper(), self._path_pattern(path), key, rule))
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    @staticmethod
+    def _spec_operations(spec: dict | None):
+        for path, item in ((spec or {}).get("paths") or {}).items():
+            if not isinstance(item, dict):
+                continue
+            for method, operation in item.items():
+                if method.lower() in _HTTP_METHODS and isinstance(operation, dict):
+                    yield method.upper(), path, operation.get("operationId")
+
+    def _path_pattern(self, path: str) -> re.Pattern:
+        parts = re.split(r"(\{[^}/]+\})", path)
+        regex = "".join("[^/]+" if p.startswith("{") else re.escape(p) for p in parts)
+        return re.compile(re.escape(self._base_path) + regex)
+
+    def match(self, request: httpx.Request) -> tuple[str | None, dict]:
+        """Return the ``(key, settings)`` of the operation ``request`` calls."""
+        path = request.url.path
+        for method, pattern, key, rule in self._rules:
+            if method == request.method and pattern.fullmatch(path):
+                return key, rule
+        return None, {}
+
+
+class CachePolicy:
+    """Decide whether and for how long a GET request may be served from cache.
+
+    ``operations`` maps an ``operationId`` or ``"GET /path/{param}"`` to
+    ``{"ttl": ..., "stale_while_revalidate": ...}``; a ``ttl`` of ``0``
+    disables caching for that operation.
+    """
+
+    def __init__(self, settings: dict, base_url: str, spec: dict | None = None):
+        self.ttl = float(settings["ttl"])
+        self.stale_while_revalidate = float(settings["stale_while_revalidate"])
+        self.vary_headers = [header.lower() for header in settings["vary_headers"]]
+        self.operations = OperationRules(settings.get("operations") or {}, base_url, spec)
+
+    def _rule(self, request: httpx.Request) -> dict:
+        return self.operations.match(request)[1]
+
+    def lifetimes(self, request: httpx.Request, response: httpx.Response) -> tuple[float, float]:
+        """Return ``(ttl, stale_while_revalidate)`` for storing ``response``."""
+        rule = self._rule(request)
+        ttl = float(rule.get("ttl", self.ttl))
+        swr = float(rule.get("stale_while_revalidate", self.stale_while_revalidate))
+        directives = _cache_control(response.headers)
+        if {"no-store", "no-cache", "private"} & directives.keys():
+            return 0.0, 0.0
+        max_age = _seconds(directives.get("s-maxage") or directives.get("max-age"))
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+        swr = _seconds(directives.get("stale-while-revalidate")) or swr
+        return ttl, swr
+
+    def enabled_for(self, request: httpx.Request) -> bool:
+        return request.method == "GET" and float(self._rule(request).get("ttl", self.ttl)) > 0
+
+    def key(self, request: httpx.Request) -> str:
+        """Cache key from the method, URL, sorted query and the vary headers."""
+        return request_key(request, self.vary_headers)
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """Serve repeated GET requests from a :class:`ResponseCache`.
+
+    Fresh entries are returned without touching the network. Entries within
+    their stale-while-revalidate window are returned as well while a single
+    background request refreshes them. Requests sent with
+    ``Cache-Control: no-cache`` or ``no-store`` always go upstream.
+    """
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, cache: ResponseCache, policy: CachePolicy
+    ):
+        self.transport = transport
+        self.cache = cache
+        self.policy = policy
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _response(entry: CachedResponse, request: httpx.Request, state: str) -> httpx.Response:
+        response = httpx.Response(
+            entry.status_code,
+            headers=entry.headers,
+            stream=httpx.ByteStream(entry.content),
+            request=request,
+        )
+        response.headers["x-cache"] = state
+        return response
+
+    async def _fetch(self, request: httpx.Request, key: str) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        if response.status_code not in CACHEABLE_STATUS:
+            return response
+        ttl, swr = self.policy.lifetimes(request, response)
+        if ttl <= 0 and swr <= 0:
+            return response
+        try:
+            content = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        now = time.monotonic()
+        entry = CachedResponse(
+            response.status_code, response.headers.raw, content, now + ttl, now + ttl + swr
+        )
+        self.cache.put(key, entry)
+        return self._response(entry, request, "MISS")
+
+    async def _refresh(self, request: httpx.Request, key: str) -> None:
+        try:
+            response = await self._fetch(request, key)
+            await response.aclose()
+            self.cache.revalidations += 1
+        except Exception as exc:  # keep serving the stale entry
+            logger.warning("Background revalidation of %s failed: %s", request.url, exc)
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.policy.enabled_for(request):
+            return await self.transport.handle_async_request(request)
+        key = self.policy.key(request)
+        request_directives = _cache_control(request.headers)
+        if {"no-cache", "no-store"} & request_directives.keys():
+            self.cache.bypassed += 1
+            if "no-store" in request_directives:
+                return await self.transport.handle_async_request(request)
+            return await self._fetch(request, key)
+        now = time.monotonic()
+        entry = self.cache.get(key, now)
+        if entry is not None:
+            if now <= entry.fresh_until:
+                self.cache.hits += 1
+                return self._response(entry, request, "HIT")
+            self.cache.stale_hits += 1
+            if key not in self._refreshing:
+                refresh = httpx.Request(
+                    request.method, request.url, headers=request.headers, extensions=request.extensions
+                )
+                self._refreshing[key] = asyncio.create_task(self._refresh(refresh, key))
+            return self._response(entry, request, "STALE")
+        self.cache.misses += 1
+        return await self._fetch(request, key)
+
+    async def aclose(self) -> None:
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        await self.transport.aclose()
+
+
+class UpstreamRejected(httpx.TransportError):
+    """A request refused locally to protect the upstream API."""
+
+
+class RateLimitExceeded(UpstreamRejected):
+    pass
+
+
+class ConcurrencyLimitExceeded(UpstreamRejected):
+    pass
+
+
+class CircuitOpenError(UpstreamRejected):
+    pass
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(rate, 1.0))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def available_in(self, now: float | None = None) -> float:
+        """Return ``0`` if a token is available, else the seconds until one is."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def acquire(self, now: float | None = None) -> float:
+        """Take a token; return ``0`` on success or the seconds until one is available."""
+        wait = self.available_in(now)
+        if not wait:
+            self.tokens -= 1
+        return wait
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing.
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    requests are rejected for ``recovery_timeout`` seconds. Then up to
+    ``half_open_max_calls`` probe requests are let through: a success closes
+    the circuit, a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.opened = 0
+
+    def allow(self, now: float | None = None) -> float:
+        """Return ``0`` if a request may be sent, else the seconds until a retry."""
+        now = time.monotonic() if now is None else now
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.recovery_timeout - now
+            if remaining > 0:
+                return remaining
+            self.state = self.HALF_OPEN
+            self.probes = 0
+        if self.state == self.HALF_OPEN:
+            if self.probes >= self.half_open_max_calls:
+                return self.recovery_timeout
+            self.probes += 1
+        return 0.0
+
+    def abandon(self) -> None:
+        """Give back a half-open probe whose outcome is unknown (e.g. cancelled)."""
+        if self.state == self.HALF_OPEN and self.probes:
+            self.probes -= 1
+
+    def record(self, success: bool, now: float | None = None) -> None:
+        if success:
+            self.state = self.CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic() if now is None else now
+            self.opened += 1
+
+
+class _OperationGuard:
+    __slots__ = ("bucket", "max_in_flight", "in_flight")
+
+    def __init__(self, settings: dict):
+        rate = settings.get("rate")
+        self.bucket = TokenBucket(rate, settings.get("burst")) if rate else None
+        self.max_in_flight = settings.get("max_in_flight")
+        self.in_flight = 0
+
+
+class GuardTransport(httpx.AsyncBaseTransport):
+    """Enforce rate limits, in-flight caps and a circuit breaker for one upstream.
+
+    Requests over a limit or sent while the circuit is open fail at once with
+    an :class:`UpstreamRejected` error instead of waiting for the backend.
+    Transport errors and 5xx responses count as failures for the breaker.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        prefix: str,
+        settings: dict,
+        base_url: str,
+        spec: dict | None = None,
+    ):
+        self.transport = transport
+        self.prefix = prefix
+        self.guard = _OperationGuard(settings)
+        self.operations = OperationRules(settings.get("operations") or {}, base_url, spec)
+        self._operation_guards: dict[str, _OperationGuard] = {}
+        breaker = settings.get("circuit_breaker")
+        self.breaker = None
+        if breaker:
+            breaker = {} if breaker is True else breaker
+            self.breaker = CircuitBreaker(**{**DEFAULT_CIRCUIT_BREAKER_SETTINGS, **breaker})
+        self.rejected = {"rate": 0, "in_flight": 0, "circuit": 0}
+
+    def _guards(self, request: httpx.Request) -> list[_OperationGuard]:
+        key, rule = self.operations.match(request)
+        if key is None:
+            return [self.guard]
+        guard = self._operation_guards.get(key)
+        if guard is None:
+            guard = self._operation_guards[key] = _OperationGuard(rule)
+        return [self.guard, guard]
+
+    def _reject(self, kind: str, error: type[UpstreamRejected], message: str, request):
+        self.rejected[kind] += 1
+        raise error(f"{self.prefix}: {message}", request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        guards = self._guards(request)
+        for guard in guards:
+            if guard.max_in_flight and guard.in_flight >= guard.max_in_flight:
+                self._reject(
+                    "in_flight",
+                    ConcurrencyLimitExceeded,
+                    f"too many requests in flight (limit {guard.max_in_flight})",
+                    request,
+                )
+        # check every bucket before taking from any, so a call rejected by the
+        # operation's limit does not use up the prefix's rate
+        buckets = [guard.bucket for guard in guards if guard.bucket is not None]
+        for bucket in buckets:
+            wait = bucket.available_in()
+            if wait:
+                self._reject(
+                    "rate",
+                    RateLimitExceeded,
+                    f"rate limit of {bucket.rate:g}/s exceeded, retry in {wait:.2f}s",
+                    request,
+                )
+        breaker = self.breaker
+        if breaker is not None:
+            wait = breaker.allow()
+            if wait:
+                self._reject(
+                    "circuit",
+                    CircuitOpenError,
+                    f"upstream {request.url.host} is failing, circuit open; retry in {wait:.1f}s",
+                    request,
+                )
+        for bucket in buckets:
+            bucket.acquire()
+        for guard in guards:
+            guard.in_flight += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                for guard in guards:
+                    guard.in_flight -= 1
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as exc:
+            release()
+            if breaker is not None:
+                if isinstance(exc, httpx.TransportError):
+                    breaker.record(False)
+                else:
+                    breaker.abandon()
+            raise
+        if breaker is not None:
+            breaker.record(response.status_code < 500)
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    def stats(self) -> dict:
+        breaker = self.breaker
+        return {
+            "in_flight": self.guard.in_flight,
+            "rejected": dict(self.rejected),
+            "circuit": breaker.state if breaker else None,
+            "circuit_failures": breaker.failures if breaker else 0,
+            "circuit_opened": breaker.opened if breaker else 0,
+        }
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class _SharedResponse:
+    __slots__ = ("status_code", "headers", "content", "extensions")
+
+    def __init__(self, response: httpx.Response, content: bytes):
+        self.status_code = response.status_code
+        self.headers = response.headers.raw
+        self.content = content
+        self.extensions = {
+            key: value for key, value in response.extensions.items() if key != "network_stream"
+        }
+
+
+class SingleFlightTransport(httpx.AsyncBaseTransport):
+    """Share one upstream request between identical concurrent requests.
+
+    The first request for a key is sent upstream; requests with the same key
+    that arrive while it is in flight wait for it and get their own copy of
+    its response (or its exception). Only ``methods`` are coalesced, so
+    non-idempotent calls are always sent.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        methods: list[str],
+        vary_headers: list[str],
+    ):
+        self.transport = transport
+        self.methods = {method.upper() for method in methods}
+        self.vary_headers = [header.lower() for header in vary_headers]
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.deduplicated = 0
+
+    async def _send(self, request: httpx.Request, key: str) -> _SharedResponse:
+        try:
+            response = await self.transport.handle_async_request(request)
+            try:
+                content = b"".join([chunk async for chunk in response.aiter_raw()])
+            finally:
+                await response.aclose()
+            return _SharedResponse(response, content)
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in self.methods:
+            return await self.transport.handle_async_request(request)
+        key = request_key(request, self.vary_headers, body=True)
+        task = self._in_flight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self._in_flight[key] = asyncio.create_task(self._send(request, key))
+        else:
+            self.deduplicated += 1
+        # shielded so a cancelled caller does not fail the others waiting
+        shared = await asyncio.shield(task)
+        return httpx.Response(
+            shared.status_code,
+            headers=shared.headers,
+            stream=httpx.ByteStream(shared.content),
+            request=request,
+            extensions=dict(shared.extensions),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "upstream_requests": self.leaders,
+            "deduplicated": self.deduplicated,
+            "in_flight_keys": len(self._in_flight),
+        }
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _http2_available() -> bool:
+    return find_spec("h2") is not None
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Record a client span per upstream request and propagate its ``traceparent``.
+
+    The span ends when the response is closed, so it covers reading the body.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, tracer: Tracer, prefix: str):
+        self.transport = transport
+        self.tracer = tracer
+        self.prefix = prefix
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        span = self.tracer.start_span(
+            f"HTTP {request.method}",
+            kind="client",
+            attributes={
+                "mcp.prefix": self.prefix,
+                "http.request.method": request.method,
+                "url.full": str(url.copy_with(query=None)),
+                "server.address": url.host,
+            },
+        )
+        request.headers[TRACEPARENT] = format_traceparent(span.context)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as exc:
+            span.record_exception(exc)
+            span.end()
+            raise
+        span.set_attribute("http.response.status_code", response.status_code)
+        if "x-cache" in response.headers:
+            span.set_attribute("http.cache", response.headers["x-cache"])
+        if response.status_code >= 500:
+            span.set_status("error")
+        response.stream = _ReleasingStream(response.stream, span.end)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class UpstreamClient(httpx.AsyncClient):
+    """``AsyncClient`` for one swagger entry with its own tuned connection pool."""
+
+    def __init__(
+        self,
+        prefix: str,
+        base_url: str,
+        settings: dict,
+        cache_settings: dict | None = None,
+        spec: dict | None = None,
+        single_flight: dict | None = None,
+        limits: dict | None = None,
+        tracer: Tracer | None = None,
+    ):
+        self.prefix = prefix
+        self.settings = settings
+        http2 = bool(settings["http2"])
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested for %s but 'h2' is not installed; using HTTP/1.1", prefix)
+            http2 = False
+        self.limits = httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive_connections"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        )
+        self.pool = httpx.AsyncHTTPTransport(limits=self.limits, http2=http2)
+        self.limiter = HostLimitTransport(self.pool, settings["max_concurrency_per_host"])
+        transport: httpx.AsyncBaseTransport = self.limiter
+        self.guard: GuardTransport | None = None
+        if limits:
+            self.guard = GuardTransport(transport, prefix, limits, base_url, spec)
+            transport = self.guard
+        self.single_flight: SingleFlightTransport | None = None
+        if single_flight and single_flight.get("enabled"):
+            self.single_flight = SingleFlightTransport(
+                transport, single_flight["methods"], single_flight["vary_headers"]
+            )
+            transport = self.single_flight
+        self.cache: ResponseCache | None = None
+        if cache_settings and cache_settings.get("enabled"):
+            self.cache = ResponseCache(int(cache_settings["max_entries"]))
+            policy = CachePolicy(cache_settings, base_url, spec)
+            transport = CachingTransport(transport, self.cache, policy)
+        if tracer is not None:
+            transport = TracingTransport(transport, tracer, prefix)
+        timeout = httpx.Timeout(
+            connect=settings["connect_timeout"],
+            read=settings["read_timeout"],
+            write=settings["write_timeout"],
+            pool=settings["pool_timeout"],
+        )
+        super().__init__(base_url=base_url, timeout=timeout, transport=transport)
+
+    def pool_stats(self) -> dict:
+        """Return request counters and connection pool utilization.
+
+        The connection counts are ``"unavailable"`` when the transport's
+        private ``_pool`` is missing or is not an ``httpcore`` pool.
+        """
+        stats = self.limiter.stats
+        # httpx has no public accessor for its httpcore pool, so this reads
+        # the private ``_pool`` attribute; it is guarded because httpx may
+        # rename or replace it
+        pool = getattr(self.pool, "_pool", None)
+        if isinstance(pool, httpcore.AsyncConnectionPool):
+            connections = pool.connections
+            open_connections = len(connections)
+            idle = sum(1 for connection in connections if connection.is_idle())
+        else:
+            open_connections = idle = "unavailable"
+        max_connections = self.limits.max_connections
+        return {
+            "requests": stats.requests,
+            "errors": stats.errors,
+            "in_flight": stats.in_flight,
+            "max_in_flight": stats.max_in_flight,
+            "waiting_for_host_slot": stats.waiting,
+            "avg_host_wait_ms": round(stats.wait_ms_total / stats.requests, 3) if stats.requests else 0.0,
+            "connections": open_connections,
+            "idle_connections": idle,
+            "max_connections": max_connections,
+            "utilization": round(stats.in_flight / max_connections, 3) if max_connections else None,
+            "status_codes": dict(stats.status_codes),
+            "single_flight": self.single_flight.stats() if self.single_flight else None,
+            "limits": self.guard.stats() if self.guard else None,
+        }
+
+    def cache_stats(self) -> dict | None:
+        """Return response cache counters, or ``None`` if caching is off."""
+        return self.cache.stats() if self.cache is not None else None
+
+
+def cache_settings(spec_cfg: dict) -> dict:
+    """Merge the ``cache`` section of ``spec_cfg`` over the defaults.
+
+    ``"cache": true`` turns caching on with the default settings.
+    """
+    section = spec_cfg.get("cache") or {}
+    if section is True:
+        section = {"enabled": True}
+    settings = {**DEFAULT_CACHE_SETTINGS, **section}
+    if section and "enabled" not in section:
+        settings["enabled"] = True
+    return settings
+
+
+def single_flight_settings(spec_cfg: dict) -> dict:
+    """Merge the ``single_flight`` section of ``spec_cfg`` over the defaults.
+
+    Coalescing is off unless the entry has a ``single_flight`` section;
+    ``"single_flight": true`` turns it on with the default settings.
+    """
+    section = spec_cfg.get("single_flight") or {}
+    if section is True:
+        section = {"enabled": True}
+    settings = {**DEFAULT_SINGLE_FLIGHT_SETTINGS, **section}
+    if section and "enabled" not in section:
+        settings["enabled"] = True
+    return settings
+
+
+def make_upstream_client(
+    spec_cfg: dict,
+    prefix: str,
+    defaults: dict | None = None,
+    spec: dict | None = None,
+    tracer: Tracer | None = None,
+) -> UpstreamClient:
+    """Create the client used by the tools of the swagger entry ``spec_cfg``.
+
+    ``spec`` is used to resolve the operation ids of per-operation cache rules;
+    with a ``tracer`` every upstream request is traced.
+    """
+    return UpstreamClient(
+        prefix,
+        spec_cfg["apiBaseUrl"],
+        http_settings(spec_cfg, defaults),
+        cache_settings(spec_cfg),
+        spec,
+        single_flight_settings(spec_cfg),
+        spec_cfg.get("limits"),
+        tracer,
+    )
@@ -1,11 +1,14 @@
 """OpenAPI specification helpers for the FastMCP Swagger server."""
 
+import asyncio
 import json
 import logging
 import os
 
 import httpx
 
+from utils.cache_utils import SpecCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -19,18 +22,114 @@ def _get_prefix(spec_cfg: dict) -> str:
     return os.path.splitext(base)[0]
 
 
+SPEC_FETCH_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+SPEC_FETCH_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+# Shared client used to download remote specs, bound to the loop that created it
+_spec_client: httpx.AsyncClient | None = None
+_spec_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _is_remote(path: str) -> bool:
+    return path.startswith("http://") or path.startswith("https://")
+
+
+def _resolve_local_path(path: str) -> str:
+    """Return an absolute path for a spec stored relative to the package."""
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(__file__), "../"+path)
+    return path
+
+
+def _read_spec_file(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def _load_spec(spec_cfg: dict) -> dict:
     """Load an OpenAPI specification from a path (local file or URL)."""
     path = spec_cfg.get("path")
     logger.info("Loading OpenAPI spec from: %s", path)
     if not path:
         raise ValueError("Swagger config entry must include 'path'")
-    if path.startswith("http://") or path.startswith("https://"):
+    if _is_remote(path):
         resp = httpx.get(path)
         resp.raise_for_status()
         return resp.json()
-    if not os.path.isabs(path):
-        path = os.path.join(os.path.dirname(__file__), "../"+path)
+    path = _resolve_local_path(path)
     logger.info("Loading OpenAPI spec from local file: %s", path)
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return _read_spec_file(path)
+
+
+def get_spec_client() -> httpx.AsyncClient:
+    """Return the pooled client used for spec downloads on the running loop."""
+    global _spec_client, _spec_client_loop
+    loop = asyncio.get_running_loop()
+    if _spec_client is None or _spec_client.is_closed or _spec_client_loop is not loop:
+        _spec_client = httpx.AsyncClient(
+            timeout=SPEC_FETCH_TIMEOUT,
+            limits=SPEC_FETCH_LIMITS,
+            follow_redirects=True,
+        )
+        _spec_client_loop = loop
+    return _spec_client
+
+
+async def close_spec_client() -> None:
+    """Close the shared spec download client if it is open."""
+    global _spec_client, _spec_client_loop
+    if _spec_client is not None and not _spec_client.is_closed:
+        await _spec_client.aclose()
+    _spec_client = None
+    _spec_client_loop = None
+
+
+async def _fetch_remote_spec(url: str, cache: SpecCache | None) -> dict:
+    """Download ``url``, revalidating against and updating ``cache``."""
+    entry = cache.lookup(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return await asyncio.to_thread(cache.load, entry["hash"])
+
+    headers = cache.conditional_headers(entry) if entry is not None else {}
+    try:
+        resp = await get_spec_client().get(url, headers=headers)
+        if resp.status_code == 304 and entry is not None:
+            logger.info("OpenAPI spec not modified, using cached copy: %s", url)
+            await asyncio.to_thread(cache.touch, url, entry)
+            return await asyncio.to_thread(cache.load, entry["hash"])
+        resp.raise_for_status()
+    except httpx.HTTPError as exc:
+        if entry is None:
+            raise
+        logger.warning("Failed to fetch %s (%s), using cached copy", url, exc)
+        return await asyncio.to_thread(cache.load, entry["hash"])
+
+    if cache is None:
+        return await asyncio.to_thread(json.loads, resp.content)
+    _, spec = await asyncio.to_thread(
+        cache.store,
+        url,
+        resp.content,
+        resp.headers.get("etag"),
+        resp.headers.get("last-modified"),
+    )
+    return spec
+
+
+async def _load_spec_async(spec_cfg: dict, cache: SpecCache | None = None) -> dict:
+    """Load an OpenAPI specification without blocking the event loop.
+
+    Remote specs are downloaded through the shared pooled client and decoded
+    in a worker thread; local files are read and parsed in a worker thread.
+    When ``cache`` is given remote specs are revalidated against it and the
+    cached copy is used if the upstream is unreachable.
+    """
+    path = spec_cfg.get("path")
+    logger.info("Loading OpenAPI spec from: %s", path)
+    if not path:
+        raise ValueError("Swagger config entry must include 'path'")
+    if _is_remote(path):
+        return await _fetch_remote_spec(path, cache)
+    path = _resolve_local_path(path)
+    logger.info("Loading OpenAPI spec from local file: %s", path)
+    return await asyncio.to_thread(_read_spec_file, path)
@@ -0,0 +1,20 @@
+"""Timing helpers used to instrument server startup."""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def phase_timer(timings: dict[str, float], phase: str) -> Iterator[None]:
+    """Add the wall time spent inside the block to ``timings[phase]``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def format_timings(timings: dict[str, float]) -> str:
+    """Return a compact ``phase=1.234s`` summary for log output."""
+    return ", ".join(f"{phase}={seconds:.3f}s" for phase, seconds in timings.items())
@@ -0,0 +1,220 @@
+"""Serving the app from several worker processes on one port."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+
+import httpx
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_HEADER = b"x-mcp-forwarded"
+RESTART_DELAY = 1.0
+
+
+class SessionForwardMiddleware:
+    """Route MCP messages to the worker that owns their SSE session.
+
+    Workers share the listening socket, so the ``POST .../messages/`` of a
+    session may reach a different worker than its ``GET .../sse`` stream.
+    When the local app does not know the session (404), the message is
+    replayed to the other workers over their private Unix sockets until one
+    accepts it.
+    """
+
+    def __init__(self, app, peers: list[str]):
+        self.app = app
+        self.peers = peers
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def _client(self, path: str) -> httpx.AsyncClient:
+        client = self._clients.get(path)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(uds=path)
+            client = self._clients[path] = httpx.AsyncClient(
+                transport=transport, base_url="http://worker", timeout=10.0
+            )
+        return client
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].rstrip("/").endswith("/messages")
+            or any(name == FORWARDED_HEADER for name, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                # nothing more to read; wait like a connected client would
+                await asyncio.get_running_loop().create_future()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        held: list[dict] = []
+
+        async def hold(message):
+            held.append(message)
+
+        await self.app(scope, replay, hold)
+        if held and held[0]["type"] == "http.response.start" and held[0]["status"] == 404:
+            response = await self._forward(scope, body)
+            if response is not None:
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": response.status_code,
+                        "headers": response.headers.raw,
+                    }
+                )
+                await send({"type": "http.response.body", "body": response.content})
+                return
+        for message in held:
+            await send(message)
+
+    async def _forward(self, scope, body: bytes) -> httpx.Response | None:
+        path = scope["path"]
+        if scope["query_string"]:
+            path += "?" + scope["query_string"].decode()
+        headers = [
+            (name, value)
+            for name, value in scope["headers"]
+            if name not in (b"host", b"content-length")
+        ]
+        headers.append((FORWARDED_HEADER, b"1"))
+        for peer in self.peers:
+            try:
+                response = await self._client(peer).post(path, content=body, headers=headers)
+            except httpx.TransportError:
+                continue  # worker restarting
+            if response.status_code != 404:
+                return response
+        return None
+
+
+def _bind_unix_socket(path: str) -> socket.socket:
+    if os.path.exists(path):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    return sock
+
+
+async def _serve_worker(
+    cfg: dict,
+    db_url: str,
+    sock: socket.socket,
+    private: str,
+    peers: list[str],
+    config_source: str | list[str] | None,
+) -> None:
+    import server
+    from utils.db_utils import connect_with_retries
+
+    session_maker = await connect_with_retries(db_url, cfg.get("database_pool"))
+    app = await server.create_app(cfg, session_maker=session_maker, config_source=config_source)
+    config = uvicorn.Config(SessionForwardMiddleware(app, peers), lifespan="on")
+    await uvicorn.Server(config).serve(sockets=[sock, _bind_unix_socket(private)])
+
+
+def run_worker(
+    cfg: dict,
+    db_url: str,
+    sock: socket.socket,
+    index: int,
+    sockets: list[str],
+    config_source: str | list[str] | None = None,
+) -> None:
+    """Entry point of one worker process."""
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Worker %d started (pid %d)", index, os.getpid())
+    peers = [path for i, path in enumerate(sockets) if i != index]
+    asyncio.run(_serve_worker(cfg, db_url, sock, sockets[index], peers, config_source))
+
+
+def serve_workers(
+    cfg: dict,
+    db_url: str,
+    workers: int,
+    config_source: str | list[str] | None = None,
+) -> None:
+    """Run ``workers`` processes serving ``cfg`` on one port until signalled.
+
+    Tool state is shared through ``db_url`` (see :mod:`sync`), so it must
+    point to a database every worker can reach. Workers that die are
+    restarted. ``SIGHUP`` is passed on so every worker reloads its config.
+    """
+    cfg = {**cfg, "server": {**cfg["server"], "workers": workers}}
+    sock = uvicorn.Config(None, host=cfg["server"]["host"], port=cfg["server"]["port"]).bind_socket()
+    run_dir = tempfile.mkdtemp(prefix="mcp-workers-")
+    sockets = [os.path.join(run_dir, f"worker-{i}.sock") for i in range(workers)]
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def spawn(index: int) -> multiprocessing.Process:
+        process = context.Process(
+            target=run_worker,
+            args=(cfg, db_url, sock, index, sockets, config_source),
+            name=f"mcp-worker-{index}",
+        )
+        process.start()
+        return process
+
+    def stop(*_args) -> None:
+        nonlocal stopping
+        stopping = True
+
+    processes: list[multiprocessing.Process] = []
+
+    def forward_hangup(*_args) -> None:
+        for process in processes:
+            if process.pid is not None and process.is_alive():
+                os.kill(process.pid, signal.SIGHUP)
+
+    previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    previous[signal.SIGHUP] = signal.signal(signal.SIGHUP, forward_hangup)
+    processes.extend(spawn(i) for i in range(workers))
+    logger.info("Serving on port %s with %d workers", cfg["server"]["port"], workers)
+    try:
+        while not stopping:
+            time.sleep(0.5)
+            for index, process in enumerate(processes):
+                if not process.is_alive() and not stopping:
+                    logger.warning(
+                        "Worker %d exited with %s; restarting", index, process.exitcode
+                    )
+                    time.sleep(RESTART_DELAY)
+                    processes[index] = spawn(index)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(10)
+            if process.is_alive():
+                process.kill()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        sock.close()
+        shutil.rmtree(run_dir, ignore_errors=True)
@@ -1,6 +1,6 @@
 import streamlit as st
 import requests
-from utils import fetch_list_servers, fetch_list_tools, tool_enabled
+from utils import fetch_list_servers, fetch_list_tools, tool_enabled, tools_enabled
 from math import ceil
 import logging
 import time
@@ -121,7 +121,23 @@ st.caption("Manage and monitor your Model Context Protocol (MCP) servers")
 TOOLS_PER_PAGE = 30
 COLS_PER_ROW = 3
 
-def update_all_tools_filtered(tools_list, enable_all, api_url_tools_toggle, search_query="", status_filter="All"):
+def _bulk_items(tools, enable_all):
+    """Build bulk toggle items for the tools whose state differs from ``enable_all``"""
+    items = []
+    for tool in tools:
+        name = tool.get("name", "")
+        if tool.get("enabled", False) != enable_all:
+            items.append({"prefix": tool.get("prefix", ""), "name": name, "enabled": enable_all})
+    return items
+
+def _bulk_outcome(result):
+    """Return (success_count, failed_tools) from a bulk toggle response"""
+    results = result.get("results", []) if result else []
+    success_count = sum(1 for r in results if r.get("status") == "updated")
+    failed_tools = [r.get("tool") for r in results if r.get("status") == "not_found"]
+    return success_count, failed_tools
+
+def update_all_tools_filtered(tools_list, enable_all, api_url_tools_bulk, search_query="", status_filter="All"):
     """Update all filtered tools to enabled or disabled state"""
     # Apply filters first
     filtered_tools = apply_filters(tools_list, search_query, status_filter)
@@ -129,44 +145,14 @@ def update_all_tools_filtered(tools_list, enable_all, api_url_tools_toggle, sear
     if not filtered_tools:
         return False, "No tools to update"
     
-    success_count = 0
-    failed_tools = []
-    
-    # Create progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for i, tool in enumerate(filtered_tools):
-        name = tool.get("name", "")
-        enabled = tool.get("enabled", False)
-        
-        # Only update if state is different
-        if enabled != enable_all:
-            prefix = name.split("_")[0] if "_" in name else name
-            
-            payload = {
-                "prefix": prefix,
-                "name": name,
-                "enabled": enable_all
-            }
-            
-            status_text.text(f"Updating {name}...")
-            
-            try:
-                result = tool_enabled(api_url_tools_toggle, payload)
-                if result:
-                    success_count += 1
-                else:
-                    failed_tools.append(name)
-            except Exception as e:
-                failed_tools.append(f"{name} (Error: {str(e)})")
-        
-        # Update progress
-        progress_bar.progress((i + 1) / len(filtered_tools))
+    items = _bulk_items(filtered_tools, enable_all)
+    if not items:
+        return False, "No tools to update"
     
-    # Clear progress indicators
-    progress_bar.empty()
-    status_text.empty()
+    # One request for every tool; the server persists them in one transaction
+    with st.spinner(f"Updating {len(items)} tools..."):
+        result = tools_enabled(api_url_tools_bulk, items)
+    success_count, failed_tools = _bulk_outcome(result)
     
     return success_count > 0, f"Updated {success_count} tools successfully" + (f", Failed: {failed_tools}" if failed_tools else "")
 
@@ -228,7 +214,7 @@ def apply_filters(tools_list, search_query, status_filter):
             filtered_tools = [t for t in filtered_tools if not t.get("enabled", False)]
         else:
             # Filter by prefix
-            filtered_tools = [t for t in filtered_tools if t.get("name", "").startswith(status_filter)]
+            filtered_tools = [t for t in filtered_tools if t.get("prefix") == status_filter]
     
     return filtered_tools
 
@@ -298,8 +284,7 @@ def visualize_tools(filtered_tools, api_url_tools_toggle, current_page=1):
             name = tool.get("name", "")
             enabled = tool.get("enabled", False)
             
-            # Extract prefix from tool name
-            prefix = name.split("_")[0] if "_" in name else name
+            prefix = tool.get("prefix", "")
             
             with cols[i]:
                 with st.container(border=True):
@@ -437,6 +422,10 @@ def main():
     api_tools_toggle_endpoint = "tool-enabled"  # Adjust this endpoint as needed
     api_url_tools_toggle = f"{host}{api_tools_toggle_endpoint}"
     
+    # API endpoint for toggling many tools in one request
+    api_tools_bulk_endpoint = "tools-enabled"
+    api_url_tools_bulk = f"{host}{api_tools_bulk_endpoint}"
+    
     sidebar()
     
     # Initialize session state
@@ -497,9 +486,7 @@ def main():
         all_prefixes = set()
         if 'tools_data' in st.session_state and st.session_state.tools_data:
             for tool in st.session_state.tools_data:
-                name = tool.get("name", "")
-                prefix = name.split("_")[0] if "_" in name else name
-                all_prefixes.add(prefix)
+                all_prefixes.add(tool.get("prefix", ""))
         
         # Create filter options
         filter_options = ["All"]
@@ -602,31 +589,9 @@ def main():
                     action_text = "Enabling" if enable_all else "Disabling"
                     
                     with st.spinner(f"{action_text} selected tools..."):
-                        success_count = 0
-                        failed_tools = []
-                        
-                        for tool in selected_tools_for_action:
-                            name = tool.get("name", "")
-                            enabled = tool.get("enabled", False)
-                            
-                            # Only update if state is different
-                            if enabled != enable_all:
-                                prefix = name.split("_")[0] if "_" in name else name
-                                
-                                payload = {
-                                    "prefix": prefix,
-                                    "name": name,
-                                    "enabled": enable_all
-                                }
-                                
-                                try:
-                                    result = tool_enabled(api_url_tools_toggle, payload)
-                                    if result:
-                                        success_count += 1
-                                    else:
-                                        failed_tools.append(name)
-                                except Exception as e:
-                                    failed_tools.append(f"{name} (Error: {str(e)})")
+                        items = _bulk_items(selected_tools_for_action, enable_all)
+                        result = tools_enabled(api_url_tools_bulk, items) if items else {}
+                        success_count, failed_tools = _bulk_outcome(result)
                         logger.info(f"Success count: {success_count}, Failed tools: {failed_tools}")
                         if success_count > 0:
                             st.success(f"✅ Updated {success_count} tools successfully" + (f", Failed: {failed_tools}" if failed_tools else ""))
@@ -15,12 +15,24 @@ def fetch_list_servers(url: str) -> dict:
     return {}
 
 
-def fetch_list_tools(url: str) -> dict:
-    """Fetch the list of tools from the given URL."""
+def fetch_list_tools(url: str, page_size: int = 500) -> dict:
+    """Fetch the list of tools from the given URL, following ``next_cursor``.
+
+    Each tool carries the ``prefix`` of the server it belongs to.
+    """
     try:
-        response = httpx.get(url)
-        response.raise_for_status()
-        return response.json()
+        tools = []
+        fields = "name,enabled,prefix"
+        params = {"limit": page_size, "fields": fields}
+        with httpx.Client() as client:
+            while True:
+                response = client.get(url, params=params)
+                response.raise_for_status()
+                data = response.json()
+                tools.extend(data.get("tools", []))
+                if not data.get("next_cursor"):
+                    return {"tools": tools}
+                params = {"limit": page_size, "fields": fields, "cursor": data["next_cursor"]}
     except httpx.HTTPStatusError as e:
         print(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
     except Exception as e:
@@ -41,3 +53,17 @@ def tool_enabled(url: str, payload: dict) -> dict:
     
     return {}
 
+
+
+def tools_enabled(url: str, items: list[dict]) -> dict:
+    """Enable or disable many tools with one request to the bulk endpoint."""
+    try:
+        response = httpx.post(url, json={"items": items})
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        print(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    
+    return {}
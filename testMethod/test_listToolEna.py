@@ -1,16 +1,27 @@
 
 import httpx
 
+def fetch_all_tools(url):
+    # follow next_cursor, each page holds at most 500 tools
+    tools = []
+    params = {}
+    while True:
+        response = httpx.get(url, params=params)
+        print("Status code:", response.status_code)
+        response_data = response.json()
+        tools.extend(response_data['tools'])
+        if not response_data.get('next_cursor'):
+            return tools
+        params = {"cursor": response_data['next_cursor']}
+
 def main():
     url_list_tools_enabled = "http://localhost:3000/list-tools-enabled"
-    response = httpx.get(url_list_tools_enabled)
-    print("Status code:", response.status_code)
-    response_data = response.json()
+    tools = fetch_all_tools(url_list_tools_enabled)
 
-    print("Number of tools:", len(response_data['tools']))
+    print("Number of tools:", len(tools))
     # count tool enabled True or False
-    count_enabled_true = sum(1 for tool in response_data['tools'] if tool['enabled'])
-    count_enabled_false = sum(1 for tool in response_data['tools'] if not tool['enabled'])
+    count_enabled_true = sum(1 for tool in tools if tool['enabled'])
+    count_enabled_false = sum(1 for tool in tools if not tool['enabled'])
     print("Number of tools enabled True:", count_enabled_true)
     print("Number of tools enabled False:", count_enabled_false)
 if __name__ == "__main__":
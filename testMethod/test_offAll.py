@@ -1,20 +1,29 @@
 
 import httpx
 import tqdm
+def fetch_all_tools(url):
+    # follow next_cursor, each page holds at most 500 tools
+    tools = []
+    params = {"fields": "name,enabled,prefix"}
+    while True:
+        response = httpx.get(url, params=params)
+        print("Status code:", response.status_code)
+        response_data = response.json()
+        tools.extend(response_data['tools'])
+        if not response_data.get('next_cursor'):
+            return tools
+        params = {**params, "cursor": response_data['next_cursor']}
+
 def main():
     url_list_tools_enabled = "http://localhost:3000/list-tools-enabled"
-    response = httpx.get(url_list_tools_enabled)
-    print("Status code:", response.status_code)
-    # print("Response:", response.json())
-    response_data = response.json()
-    # print("Response data:", response_data)
-    print("Number of tools:", len(response_data['tools']))
-    for tool in tqdm.tqdm(response_data['tools']):
+    tools = fetch_all_tools(url_list_tools_enabled)
+    print("Number of tools:", len(tools))
+    for tool in tqdm.tqdm(tools):
 
         if tool['enabled'] == True:
             url_tool_enabled = "http://localhost:3000/tool-enabled"
             payload = {
-                "prefix": "itv",
+                "prefix": tool['prefix'],
                 "name": tool['name'],
                 "enabled": False
             }